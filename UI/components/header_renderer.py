@@ -1,4 +1,5 @@
 import cv2
+from typing import Any, Dict, Optional
 
 class HeaderRenderer:
     
@@ -9,7 +10,14 @@ class HeaderRenderer:
     COLOR_CONNECTING = (0, 165, 255)
     
     @staticmethod
-    def draw(frame, mode: str, zmq_register_enabled: bool, zmq_recognition_enabled: bool):
+    def draw(
+        frame,
+        mode: str,
+        zmq_register_enabled: bool,
+        zmq_recognition_enabled: bool,
+        zmq_register_health: Optional[Dict[str, Any]] = None,
+        zmq_recognition_health: Optional[Dict[str, Any]] = None
+    ):
         mode_label = "REGISTRO" if mode == "register" else "RECONOCIMIENTO"
         mode_color = HeaderRenderer.COLOR_REGISTER if mode == "register" else HeaderRenderer.COLOR_RECOGNIZE
         
@@ -24,19 +32,23 @@ class HeaderRenderer:
         )
         
         if mode == "register":
-            if zmq_register_enabled:
-                status = "C++ CONECTADO"
-                status_color = HeaderRenderer.COLOR_CONNECTED
-            else:
-                status = "C++ DESCONECTADO"
-                status_color = HeaderRenderer.COLOR_DISCONNECTED
+            enabled, health = zmq_register_enabled, zmq_register_health
         else:
-            if zmq_recognition_enabled:
-                status = "C++ CONECTADO"
-                status_color = HeaderRenderer.COLOR_CONNECTED
-            else:
-                status = "C++ DESCONECTADO"
-                status_color = HeaderRenderer.COLOR_DISCONNECTED
+            enabled, health = zmq_recognition_enabled, zmq_recognition_health
+        
+        state = health.get("state") if health else None
+        if enabled and state == "degraded":
+            status = "C++ DEGRADADO"
+            status_color = HeaderRenderer.COLOR_CONNECTING
+        elif enabled:
+            status = "C++ CONECTADO"
+            status_color = HeaderRenderer.COLOR_CONNECTED
+        else:
+            status = "C++ DESCONECTADO"
+            status_color = HeaderRenderer.COLOR_DISCONNECTED
+        
+        if enabled and health and health.get("rtt_ms") is not None:
+            status = f"{status} ({health['rtt_ms']:.0f} ms)"
         
         cv2.putText(
             frame,
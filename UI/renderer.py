@@ -27,7 +27,9 @@ class UIRenderer:
             current_face_index=context.current_face_index,
             current_name=context.current_name,
             zmq_register_enabled=context.zmq_register_enabled,
-            zmq_recognition_enabled=context.zmq_recognition_enabled
+            zmq_recognition_enabled=context.zmq_recognition_enabled,
+            zmq_register_health=context.zmq_register_health,
+            zmq_recognition_health=context.zmq_recognition_health
         )
     
     def draw_preview(
@@ -42,12 +44,21 @@ class UIRenderer:
         current_face_index: int = 0,
         current_name: str = "",
         zmq_register_enabled: bool = False,
-        zmq_recognition_enabled: bool = False
+        zmq_recognition_enabled: bool = False,
+        zmq_register_health: Optional[Dict[str, Any]] = None,
+        zmq_recognition_health: Optional[Dict[str, Any]] = None
     ):
         frame_display = frame.copy()
         h, w = frame_display.shape[:2]
         
-        HeaderRenderer.draw(frame_display, mode, zmq_register_enabled, zmq_recognition_enabled)
+        HeaderRenderer.draw(
+            frame_display,
+            mode,
+            zmq_register_enabled,
+            zmq_recognition_enabled,
+            zmq_register_health,
+            zmq_recognition_health
+        )
         
         OverlayRenderer.draw_face_info(
             frame_display,
@@ -0,0 +1,105 @@
+"""
+Benchmark de codecs de crop: bytes por cara frente a CPU por cara (resize + codificacion)
+para JPEG, BGR crudo, PNG y WebP, y throughput del pool de codificacion.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_crop_codec [--iterations 2000] [--workers 4] [--image cara.jpg]
+"""
+import argparse
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from communication.crop_codec import CROP_CODECS, DEFAULT_QUALITY, CropCodec, CropEncoderPool
+from communication.zmq_transport import FACE_SIZE
+
+
+def _synthetic_crop(size: int = 160) -> np.ndarray:
+    # Crop con gradientes y ruido suave: comprime de forma parecida a una cara real
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    base = np.stack([
+        128 + 60 * np.sin(x / 17.0),
+        128 + 60 * np.cos(y / 23.0),
+        128 + 40 * np.sin((x + y) / 31.0)
+    ], axis=2)
+    noise = rng.normal(0, 6, base.shape)
+    crop = np.clip(base + noise, 0, 255).astype(np.uint8)
+    return cv2.GaussianBlur(crop, (5, 5), 0)
+
+
+def _load_crop(path: Optional[str]) -> np.ndarray:
+    if path:
+        image = cv2.imread(path)
+        if image is not None:
+            return image
+        print(f"No se pudo leer {path}, usando crop sintetico")
+    return _synthetic_crop()
+
+
+def _encode(codec: CropCodec, crop: np.ndarray):
+    return codec.encode(cv2.resize(crop, FACE_SIZE))
+
+
+def run(crop: np.ndarray, iterations: int, workers: int) -> List[Dict[str, object]]:
+    rows = []
+    pool = CropEncoderPool(workers) if workers > 0 else None
+
+    for name in CROP_CODECS:
+        qualities = [DEFAULT_QUALITY[name]]
+        if name == "jpeg":
+            qualities = [95, 85, 75]
+        elif name == "webp":
+            qualities = [90, 75]
+
+        for quality in qualities:
+            try:
+                codec = CropCodec(name, quality)
+                buffer = _encode(codec, crop)
+            except cv2.error:
+                print(f"{name} no soportado por esta build de OpenCV")
+                continue
+            if buffer is None:
+                continue
+
+            start = time.process_time()
+            for _ in range(iterations):
+                _encode(codec, crop)
+            cpu_us = (time.process_time() - start) / iterations * 1e6
+
+            pool_fps = float('nan')
+            if pool is not None:
+                start = time.perf_counter()
+                pool.map(lambda _: _encode(codec, crop), range(iterations))
+                pool_fps = iterations / (time.perf_counter() - start)
+
+            rows.append({
+                "codec": repr(codec),
+                "bytes": int(buffer.nbytes),
+                "cpu_us": cpu_us,
+                "pool_faces_s": pool_fps
+            })
+
+    if pool is not None:
+        pool.shutdown()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codecs de crop")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4, help="Hilos del pool (0 = sin pool)")
+    parser.add_argument("--image", type=str, default=None, help="Crop de cara a usar")
+    args = parser.parse_args()
+
+    rows = run(_load_crop(args.image), args.iterations, args.workers)
+
+    print(f"{'codec':<12}{'bytes/cara':>12}{'CPU us/cara':>14}{'pool caras/s':>15}")
+    for row in rows:
+        print(f"{row['codec']:<12}{row['bytes']:>12}{row['cpu_us']:>14.1f}{row['pool_faces_s']:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
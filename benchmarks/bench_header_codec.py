@@ -0,0 +1,110 @@
+"""
+Benchmark de codificacion/decodificacion de cabeceras: JSON (ruta actual)
+frente al codec binario versionado y msgpack.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_header_codec [--iterations 100000]
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+from communication.header_codec import (
+    HEADER_CODECS,
+    HEADER_CODEC_JSON,
+    HEADER_CODEC_MSGPACK,
+    encode_header,
+    decode_header,
+    encode_results,
+    decode_results,
+    msgpack
+)
+
+REQUEST_HEADER = {
+    "camera_id": "cam_1",
+    "face_id": 42,
+    "mode": "recognize",
+    "timestamp": 1760000000.123456,
+    "bbox": [120, 84, 96, 112],
+    "quality": 0.734
+}
+
+RESULT = {
+    "face_id": 42,
+    "person_id": "3f2b9c1e-7a4d-4e8b-9f1a-0c2d3e4f5a6b",
+    "person_name": "Maria Fernanda",
+    "confidence": 0.8731
+}
+
+
+def _time_per_op(fn: Callable[[], object], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _legacy_json_decode(data: bytes):
+    # Ruta original: recv_json + coercion campo a campo
+    message = json.loads(data)
+    return (
+        int(message.get("face_id", -1)),
+        str(message.get("person_id", "")),
+        str(message.get("person_name", "Desconocido")),
+        float(message.get("confidence", 0.0))
+    )
+
+
+def run(iterations: int) -> List[Dict[str, object]]:
+    rows = []
+    for codec in HEADER_CODECS:
+        if codec == HEADER_CODEC_MSGPACK and msgpack is None:
+            continue
+
+        header_bytes = encode_header(REQUEST_HEADER, codec)
+        result_bytes = encode_results([RESULT], codec)
+
+        rows.append({
+            "codec": codec,
+            "header_bytes": len(header_bytes),
+            "result_bytes": len(result_bytes),
+            "encode_header_us": _time_per_op(lambda: encode_header(REQUEST_HEADER, codec), iterations),
+            "decode_header_us": _time_per_op(lambda: decode_header(header_bytes), iterations),
+            "encode_result_us": _time_per_op(lambda: encode_results([RESULT], codec), iterations),
+            "decode_result_us": _time_per_op(lambda: decode_results(result_bytes), iterations),
+        })
+
+    json_result = encode_results([RESULT], HEADER_CODEC_JSON)
+    rows.append({
+        "codec": "json (legacy recv_json)",
+        "header_bytes": len(json.dumps(REQUEST_HEADER, separators=(',', ':'))),
+        "result_bytes": len(json_result),
+        "encode_header_us": _time_per_op(
+            lambda: json.dumps(REQUEST_HEADER, separators=(',', ':')).encode('utf-8'), iterations
+        ),
+        "decode_header_us": float('nan'),
+        "encode_result_us": float('nan'),
+        "decode_result_us": _time_per_op(lambda: _legacy_json_decode(json_result), iterations),
+    })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codecs de cabecera")
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = run(args.iterations)
+
+    print(f"{'codec':<26}{'hdr B':>7}{'res B':>7}{'enc hdr us':>12}{'dec hdr us':>12}{'enc res us':>12}{'dec res us':>12}")
+    for row in rows:
+        print(
+            f"{row['codec']:<26}{row['header_bytes']:>7}{row['result_bytes']:>7}"
+            f"{row['encode_header_us']:>12.2f}{row['decode_header_us']:>12.2f}"
+            f"{row['encode_result_us']:>12.2f}{row['decode_result_us']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
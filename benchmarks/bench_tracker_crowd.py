@@ -0,0 +1,254 @@
+"""
+Escalado del tracker con multitudes sinteticas (benchmarks.synthetic_crowd): para cada
+tipo de tracker y numero de caras pasa la escena por FaceTracker y, despues, por
+RegisterManager con todas las caras bloqueadas, y compara su salida con el ground truth.
+
+Metricas por configuracion:
+  id_switches  veces que una persona pasa a tener otro ID
+  lost         veces que una persona visible deja de estar seguida
+  misses / fp  personas visibles sin caja / cajas sin persona (suma de todos los frames)
+  mota         1 - (misses + fp + id_switches) / personas visibles
+  frame ms     tiempo de FaceTracker.process (o de RegisterManager.process_faces)
+
+El detector es un oraculo que devuelve las cajas visibles del ground truth (con fallos
+y ruido opcionales), para medir solo el tracking. El reloj de la logica (core.clock)
+avanza 1/fps por frame, asi que detection_interval se mide en tiempo de escena.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.bench_tracker_crowd [--faces 1,10,50,100] [--trackers auto,kcf,csrt]
+                                             [--frames 150] [--speed 60] [--occluders 2]
+                                             [--entry-rate 0.5] [--exit-rate 0.05] [--json crowd.json]
+"""
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from core import clock
+from core.register_manager import RegisterManager
+from benchmarks.synthetic_crowd import Box, CrowdConfig, CrowdScenario, GroundTruth
+
+
+class OracleDetector:
+    # Devuelve las cajas visibles del frame en curso; miss_rate y jitter simulan un detector real
+
+    def __init__(self, min_visibility: float, miss_rate: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.min_visibility = min_visibility
+        self.miss_rate = miss_rate
+        self.jitter = jitter
+        self.rng = np.random.default_rng(seed)
+        self.truth: List[GroundTruth] = []
+        self.calls = 0
+
+    def detect_with_scores(self, frame) -> List[Tuple[Box, float]]:
+        self.calls += 1
+        boxes = []
+        for gt in self.truth:
+            if gt.visibility < self.min_visibility or self.rng.random() < self.miss_rate:
+                continue
+            x1, y1, x2, y2 = gt.box
+            if self.jitter > 0:
+                dx1, dy1, dx2, dy2 = (int(v) for v in self.rng.normal(0, self.jitter, 4))
+                x1, y1 = max(0, x1 + dx1), max(0, y1 + dy1)
+                x2, y2 = max(x1 + 1, x2 + dx2), max(y1 + 1, y2 + dy2)
+            boxes.append(((x1, y1, x2, y2), 0.9))
+        return boxes
+
+    def detect(self, frame) -> List[Box]:
+        return [box for box, _ in self.detect_with_scores(frame)]
+
+
+def _iou(a: Box, b: Box) -> float:
+    # Ambas cajas en formato (x1, y1, x2, y2)
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / float((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+class TrackScore:
+    # Acumula metricas tipo CLEAR-MOT comparando la salida (id, bbox xywh) con el ground truth
+
+    def __init__(self, min_visibility: float, iou_threshold: float = 0.3):
+        self.min_visibility = min_visibility
+        self.iou_threshold = iou_threshold
+        self.assigned: Dict[int, int] = {}   # persona -> ultimo ID de track
+        self.tracked_last: set = set()
+        self.track_ids: set = set()
+        self.people: set = set()
+        self.visible = 0
+        self.matches = 0
+        self.misses = 0
+        self.false_positives = 0
+        self.id_switches = 0
+        self.lost = 0
+        self.frame_times: List[float] = []
+
+    def update(self, truth: List[GroundTruth], outputs: List[Tuple[int, Box]], seconds: float):
+        self.frame_times.append(seconds)
+        visible = [gt for gt in truth if gt.visibility >= self.min_visibility]
+        visible_ids = {gt.person_id for gt in visible}
+        self.people.update(visible_ids)
+        self.visible += len(visible)
+
+        candidates = []
+        for gt in visible:
+            for index, (track_id, (x, y, w, h)) in enumerate(outputs):
+                iou = _iou(gt.box, (x, y, x + w, y + h))
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, gt.person_id, index, track_id))
+        candidates.sort(reverse=True)
+
+        matched_people, matched_outputs = set(), set()
+        for _, person_id, index, track_id in candidates:
+            if person_id in matched_people or index in matched_outputs:
+                continue
+            matched_people.add(person_id)
+            matched_outputs.add(index)
+            self.track_ids.add(track_id)
+            previous = self.assigned.get(person_id)
+            if previous is not None and previous != track_id:
+                self.id_switches += 1
+            self.assigned[person_id] = track_id
+
+        self.matches += len(matched_people)
+        self.misses += len(visible) - len(matched_people)
+        self.false_positives += len(outputs) - len(matched_outputs)
+        # Perdida: seguida en el frame anterior, sigue visible y ya no tiene caja
+        self.lost += len((self.tracked_last & visible_ids) - matched_people)
+        self.tracked_last = matched_people
+
+    def summary(self) -> Dict[str, Any]:
+        times = np.array(self.frame_times or [0.0]) * 1000
+        errors = self.misses + self.false_positives + self.id_switches
+        return {
+            "people": len(self.people),
+            "track_ids": len(self.track_ids),
+            "id_switches": self.id_switches,
+            "lost": self.lost,
+            "misses": self.misses,
+            "false_positives": self.false_positives,
+            "recall": round(self.matches / self.visible, 3) if self.visible else None,
+            "mota": round(1 - errors / self.visible, 3) if self.visible else None,
+            "frame_ms_mean": round(float(times.mean()), 2),
+            "frame_ms_p95": round(float(np.percentile(times, 95)), 2),
+            "frame_ms_max": round(float(times.max()), 2)
+        }
+
+
+def run_scenario(args, faces: int, tracker_type: str) -> Dict[str, Any]:
+    from pipeline.tracker import FaceTracker
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    scenario = CrowdScenario(CrowdConfig(
+        faces=faces,
+        width=width,
+        height=height,
+        fps=args.fps,
+        speed=args.speed,
+        entry_rate=args.entry_rate,
+        exit_rate=args.exit_rate,
+        occluders=args.occluders,
+        sprites_dir=args.sprites_dir,
+        seed=args.seed
+    ))
+    detector = OracleDetector(args.min_visibility, args.miss_rate, args.jitter, seed=args.seed)
+    tracker = FaceTracker(interval=args.interval, tracker_type=tracker_type)
+    register = RegisterManager()
+
+    # Origen lejos de 0, como time.time(): el tracker detecta en el primer frame
+    origin = 1_000_000.0
+    scene_clock = clock.ManualClock(origin)
+    clock.set_source(scene_clock)
+    tracker_score = TrackScore(args.min_visibility)
+    register_score = TrackScore(args.min_visibility)
+    locked = False
+    try:
+        for frame, truth in scenario.frames(args.frames):
+            scene_clock.set(origin + scenario.timestamp)
+            detector.truth = truth
+
+            start = time.perf_counter()
+            tracked = tracker.process(frame, detector)
+            elapsed = time.perf_counter() - start
+            tracker_score.update(truth, [(face_id, bbox) for face_id, _, bbox in tracked], elapsed)
+
+            # Como en el modo registro: se bloquean las caras presentes al empezar y
+            # RegisterManager debe mantener sus IDs mientras la escena se mueve
+            if not locked and tracked:
+                locked = True
+                for face_id, _, bbox in tracked:
+                    register.lock_face(face_id, bbox)
+            start = time.perf_counter()
+            processed = register.process_faces(tracked)
+            elapsed = time.perf_counter() - start
+            register_score.update(truth, [(face_id, bbox) for face_id, _, bbox in processed], elapsed)
+    finally:
+        clock.reset()
+
+    return {
+        "faces": faces,
+        "tracker_type": tracker_type,
+        "frames": args.frames,
+        "entered": scenario.entered,
+        "exited": scenario.exited,
+        "detector_calls": detector.calls,
+        "tracker": tracker_score.summary(),
+        "register": register_score.summary()
+    }
+
+
+def _print_row(label: str, row: Dict[str, Any]):
+    print(
+        f"{label:<24}{row['people']:>7}{row['track_ids']:>7}{row['id_switches']:>9}{row['lost']:>7}"
+        f"{row['misses']:>8}{row['false_positives']:>7}{str(row['mota']):>8}"
+        f"{row['frame_ms_mean']:>10.2f}{row['frame_ms_p95']:>10.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado del tracker con multitudes sinteticas")
+    parser.add_argument("--faces", default="1,10,50,100", help="Caras en escena (lista separada por comas)")
+    parser.add_argument("--trackers", default="auto", help="Tipos de tracker a comparar, p.ej. auto,kcf,csrt,mosse")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--interval", type=float, default=0.5, help="detection_interval del tracker (s)")
+    parser.add_argument("--speed", type=float, default=60.0, help="Velocidad media de las caras (px/s)")
+    parser.add_argument("--occluders", type=int, default=0)
+    parser.add_argument("--entry-rate", type=float, default=0.0, help="Entradas por segundo")
+    parser.add_argument("--exit-rate", type=float, default=0.0, help="Probabilidad de salida por persona y segundo")
+    parser.add_argument("--sprites-dir", default=None, help="Carpeta con crops de caras a pegar")
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="Fraccion de caras que el detector no ve")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Ruido de las cajas del detector (px)")
+    parser.add_argument("--min-visibility", type=float, default=0.5, help="Fraccion visible para contar una cara")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    print(
+        f"{'escenario':<24}{'pers':>7}{'ids':>7}{'switch':>9}{'lost':>7}"
+        f"{'misses':>8}{'fp':>7}{'mota':>8}{'ms/frame':>10}{'p95 ms':>10}"
+    )
+    results = []
+    for tracker_type in args.trackers.split(","):
+        for faces in [int(value) for value in args.faces.split(",")]:
+            result = run_scenario(args, faces, tracker_type)
+            results.append(result)
+            _print_row(f"{tracker_type} x{faces} tracker", result["tracker"])
+            _print_row(f"{tracker_type} x{faces} register", result["register"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
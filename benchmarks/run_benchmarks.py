@@ -0,0 +1,390 @@
+"""
+Suite de benchmarks de las etapas calientes sobre frames sinteticos con un numero
+configurable de caras: deteccion, tracking, caches de RecognitionManager, resize +
+codificacion de crops, cabeceras, render de la UI y una iteracion completa del loop.
+
+Los resultados (us por operacion: media, p50, p95) se escriben en JSON y pueden
+compararse con una linea base guardada; una etapa cuyo p50 empeora mas del umbral
+se marca como regresion y el proceso termina con codigo 1.
+
+Uso (desde la raiz del repo):
+    python -m benchmarks.run_benchmarks [--faces 1,4,8] [--iterations 200] [--only tracker,header]
+                                        [--model models/yolov8n-face-lindevs.pt]
+                                        [--output actual.json] [--baseline base.json] [--threshold 0.10]
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+from typing import Any, Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from communication.crop_codec import CropCodec
+from communication.header_codec import HEADER_CODEC_BINARY, HEADER_CODEC_JSON, encode_header, decode_header
+from communication.recognition_client import RecognitionResult
+from communication.zmq_transport import FACE_SIZE, build_face_header
+from core.app_orchestrator import ApplicationOrchestrator
+from core.appearance_cache import AppearanceCache
+from core.frame_manager import FrameManager
+from core.recognition_manager import RecognitionManager, RecognizedIdentity
+from UI.input_handler import AppState, InputHandler
+
+FRAME_SIZE = (480, 640)
+CYCLE = 32  # Frames sinteticos distintos; el movimiento es periodico para poder repetirlos
+
+Box = Tuple[int, int, int, int]
+
+
+def synthetic_frame(index: int, faces: int, size: Tuple[int, int] = FRAME_SIZE) -> Tuple[np.ndarray, List[Box]]:
+    # Fondo con textura y caras (elipse de piel, ojos y boca) en rejilla con movimiento suave
+    h, w = size
+    rng = np.random.default_rng(index)
+    frame = np.full((h, w, 3), 70, dtype=np.uint8)
+    frame += rng.integers(0, 20, (h, w, 3), dtype=np.uint8)
+
+    cols = max(1, int(np.ceil(np.sqrt(faces))))
+    rows = max(1, int(np.ceil(faces / cols)))
+    cell_w, cell_h = w // cols, h // rows
+    face_w = int(min(cell_w, cell_h) * 0.55)
+    face_h = int(face_w * 1.25)
+    phase = 2 * np.pi * (index % CYCLE) / CYCLE
+
+    boxes = []
+    for n in range(faces):
+        row, col = divmod(n, cols)
+        cx = col * cell_w + cell_w // 2 + int(0.1 * cell_w * np.sin(phase + n))
+        cy = row * cell_h + cell_h // 2 + int(0.1 * cell_h * np.cos(phase + n))
+        cv2.ellipse(frame, (cx, cy), (face_w // 2, face_h // 2), 0, 0, 360, (150, 170, 205), -1)
+        for dx in (-face_w // 5, face_w // 5):
+            cv2.circle(frame, (cx + dx, cy - face_h // 8), max(2, face_w // 12), (40, 40, 40), -1)
+        cv2.ellipse(frame, (cx, cy + face_h // 5), (face_w // 6, max(2, face_h // 20)), 0, 0, 360, (60, 60, 140), -1)
+        boxes.append((cx - face_w // 2, cy - face_h // 2, cx + face_w // 2, cy + face_h // 2))
+    return frame, boxes
+
+
+class BenchContext:
+
+    def __init__(self, faces: int, args: argparse.Namespace):
+        self.faces = faces
+        self.args = args
+        self.samples = [synthetic_frame(index, faces) for index in range(CYCLE)]
+        self.position = 0
+
+    def next_sample(self) -> Tuple[np.ndarray, List[Box]]:
+        sample = self.samples[self.position % CYCLE]
+        self.position += 1
+        return sample
+
+    def crops(self, index: int = 0) -> List[Tuple[Any, Box]]:
+        frame, boxes = self.samples[index]
+        return [(frame[y1:y2, x1:x2], (x1, y1, x2 - x1, y2 - y1)) for x1, y1, x2, y2 in boxes]
+
+
+class GroundTruthDetector:
+    # Devuelve las cajas con las que se genero el frame: aisla el coste del tracker
+
+    def __init__(self, context: BenchContext):
+        self.context = context
+
+    def detect_with_scores(self, frame) -> List[Tuple[Box, float]]:
+        return [(box, 0.9) for box in self.context.samples[(self.context.position - 1) % CYCLE][1]]
+
+    def detect(self, frame) -> List[Box]:
+        return [box for box, _ in self.detect_with_scores(frame)]
+
+
+class SyntheticCamera:
+
+    def __init__(self, context: BenchContext):
+        self.context = context
+
+    def read(self):
+        return self.context.next_sample()[0]
+
+
+class LoopbackRecognitionClient:
+    # Responde cada request con una identidad fija en el siguiente drain
+
+    is_connected = True
+
+    def __init__(self):
+        self._results: List[RecognitionResult] = []
+
+    def get_health(self):
+        return None
+
+    def send_recognition_request(self, frame, face_id, bbox, face_crop=None, quality=None, request_id=None) -> bool:
+        self._results.append(RecognitionResult(face_id, f"p{face_id}", f"Persona {face_id}", 0.95, request_id))
+        return True
+
+    def send_recognition_batch(self, frame, faces) -> List[int]:
+        return [f.face_id for f in faces if self.send_recognition_request(frame, f.face_id, f.bbox, request_id=f.request_id)]
+
+    def drain_results(self) -> List[RecognitionResult]:
+        results, self._results = self._results, []
+        return results
+
+    def take_failed_requests(self) -> List[Tuple[int, str]]:
+        return []
+
+
+@contextlib.contextmanager
+def no_highgui():
+    # El render se mide sin ventana: imshow/waitKey no estan disponibles en servidores
+    names = ("imshow", "waitKey", "namedWindow", "resizeWindow", "destroyAllWindows")
+    saved = {name: getattr(cv2, name) for name in names}
+    cv2.imshow = lambda *a, **k: None
+    cv2.waitKey = lambda *a, **k: 255
+    cv2.namedWindow = lambda *a, **k: None
+    cv2.resizeWindow = lambda *a, **k: None
+    cv2.destroyAllWindows = lambda *a, **k: None
+    try:
+        yield
+    finally:
+        for name, fn in saved.items():
+            setattr(cv2, name, fn)
+
+
+def _face_tracker(interval: float):
+    # Import diferido: pipeline.tracker importa el detector (torch)
+    from pipeline.tracker import FaceTracker
+    return FaceTracker(interval=interval)
+
+
+# --- Benchmarks: cada factoria prepara el estado y devuelve la operacion a medir ---
+
+def bench_detector(context: BenchContext) -> Callable[[], Any]:
+    if not context.args.model:
+        raise RuntimeError("requiere --model")
+    from pipeline.detector import FaceDetector
+    detector = FaceDetector(context.args.model, confidence=0.5, device=context.args.device)
+    return lambda: detector.detect(context.next_sample()[0])
+
+
+def bench_tracker_process(context: BenchContext) -> Callable[[], Any]:
+    tracker = _face_tracker(interval=1e9)
+    detector = GroundTruthDetector(context)
+    tracker._redetect(context.next_sample()[0], detector)
+    tracker.last_detection = time.time()
+    return lambda: tracker.process(context.next_sample()[0], detector)
+
+
+def bench_tracker_redetect(context: BenchContext) -> Callable[[], Any]:
+    tracker = _face_tracker(interval=1e9)
+    detector = GroundTruthDetector(context)
+    return lambda: tracker._redetect(context.next_sample()[0], detector)
+
+
+def bench_recognition_cache(context: BenchContext) -> Callable[[], Any]:
+    manager = RecognitionManager(position_cache_timeout=1e9)
+    crops = context.crops()
+    active_ids = list(range(len(crops)))
+    for face_id, (_, bbox) in enumerate(crops):
+        identity = RecognizedIdentity(f"p{face_id}", f"Persona {face_id}", 0.9, time.time())
+        manager.cache_position(bbox, identity)
+        if face_id % 2 == 0:
+            manager.identities[face_id] = identity
+
+    def op():
+        manager.refresh_active_faces(active_ids)
+        for face_id, (_, bbox) in zip(active_ids, crops):
+            if not manager.is_recognized(face_id):
+                manager.find_match_by_position(bbox)
+            manager.should_send(face_id)
+        manager.cleanup_not_visible(active_ids)
+    return op
+
+
+def bench_recognition_appearance(context: BenchContext) -> Callable[[], Any]:
+    cache = AppearanceCache(cache_timeout=1e9, update_interval=0.0)
+    manager = RecognitionManager(appearance_cache=cache)
+    crops = context.crops()
+    for face_id, (crop, _) in enumerate(crops):
+        cache.remember(1000 + face_id, crop, f"p{face_id}", f"Persona {face_id}", 0.9)
+    other_crops = context.crops(CYCLE // 2)
+
+    def op():
+        for face_id, (crop, _) in enumerate(other_crops):
+            manager.assign_identity_from_appearance(face_id, crop)
+            manager.identities.pop(face_id, None)
+    return op
+
+
+def bench_crop_encode(context: BenchContext) -> Callable[[], Any]:
+    codec = CropCodec("jpeg")
+    crops = context.crops()
+    return lambda: [codec.encode(cv2.resize(crop, FACE_SIZE)) for crop, _ in crops]
+
+
+def _bench_header(codec: str) -> Callable[[BenchContext], Callable[[], Any]]:
+    def factory(context: BenchContext) -> Callable[[], Any]:
+        crops = context.crops()
+
+        def op():
+            for face_id, (_, bbox) in enumerate(crops):
+                data = encode_header(build_face_header("cam_1", face_id, "recognize", bbox, quality=0.8), codec)
+                decode_header(data)
+        return op
+    return factory
+
+
+def bench_draw_preview(context: BenchContext) -> Callable[[], Any]:
+    from UI.renderer import UIRenderer
+    renderer = UIRenderer()
+    frame, _ = context.samples[0]
+    faces = [(face_id, crop, bbox) for face_id, (crop, bbox) in enumerate(context.crops())]
+    identities = {
+        face_id: RecognizedIdentity(f"p{face_id}", f"Persona {face_id}", 0.9, time.time())
+        for face_id, _, _ in faces if face_id % 2 == 0
+    }
+    return lambda: renderer.draw_preview(
+        frame, faces, "recognize", "idle", [], {}, identities,
+        zmq_register_enabled=True, zmq_recognition_enabled=True
+    )
+
+
+def bench_loop_iteration(context: BenchContext) -> Callable[[], Any]:
+    from UI.renderer import UIRenderer
+    detector = GroundTruthDetector(context)
+    if context.args.model:
+        from pipeline.detector import FaceDetector
+        detector = FaceDetector(context.args.model, confidence=0.5, device=context.args.device)
+
+    orchestrator = ApplicationOrchestrator(
+        camera=SyntheticCamera(context),
+        detector=detector,
+        tracker=_face_tracker(interval=0.5),
+        frame_manager=FrameManager(),
+        renderer=UIRenderer(),
+        input_handler=InputHandler(),
+        recognition_client=LoopbackRecognitionClient(),
+        recognition_config={"best_shot_min_quality": 0.0}
+    )
+    orchestrator.state = AppState()
+    orchestrator.running = True
+    return orchestrator._process_frame
+
+
+BENCHMARKS: Dict[str, Callable[[BenchContext], Callable[[], Any]]] = {
+    "detector.detect": bench_detector,
+    "tracker.process": bench_tracker_process,
+    "tracker.redetect": bench_tracker_redetect,
+    "recognition.position_cache": bench_recognition_cache,
+    "recognition.appearance_cache": bench_recognition_appearance,
+    "crop.resize_encode": bench_crop_encode,
+    "header.json": _bench_header(HEADER_CODEC_JSON),
+    "header.binary": _bench_header(HEADER_CODEC_BINARY),
+    "ui.draw_preview": bench_draw_preview,
+    "loop.iteration": bench_loop_iteration,
+}
+
+
+def measure(op: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        op()
+    samples = np.empty(iterations)
+    for index in range(iterations):
+        start = time.perf_counter()
+        op()
+        samples[index] = time.perf_counter() - start
+    samples *= 1e6
+    return {
+        "iterations": iterations,
+        "mean_us": round(float(samples.mean()), 2),
+        "p50_us": round(float(np.percentile(samples, 50)), 2),
+        "p95_us": round(float(np.percentile(samples, 95)), 2),
+        "min_us": round(float(samples.min()), 2)
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    selected = [
+        name for name in BENCHMARKS
+        if not args.only or any(name.startswith(prefix) for prefix in args.only.split(","))
+    ]
+    results: Dict[str, Any] = {}
+    with no_highgui():
+        for faces in [int(value) for value in args.faces.split(",")]:
+            for name in selected:
+                key = f"{name}[{faces}]"
+                context = BenchContext(faces, args)
+                try:
+                    op = BENCHMARKS[name](context)
+                except Exception as e:
+                    results[key] = {"skipped": str(e)}
+                    print(f"{key:<36} omitido: {e}")
+                    continue
+                results[key] = measure(op, args.iterations, args.warmup)
+                row = results[key]
+                print(f"{key:<36}{row['mean_us']:>12.1f}{row['p50_us']:>12.1f}{row['p95_us']:>12.1f}")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "frame_size": list(FRAME_SIZE),
+            "iterations": args.iterations
+        },
+        "results": results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, noise_us: float) -> List[str]:
+    regressions = []
+    print(f"\n{'benchmark':<36}{'base p50':>12}{'actual p50':>12}{'cambio':>10}")
+    for key, row in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or "p50_us" not in base or "p50_us" not in row:
+            continue
+        change = row["p50_us"] / base["p50_us"] - 1 if base["p50_us"] > 0 else 0.0
+        flag = ""
+        if change > threshold and row["p50_us"] - base["p50_us"] > noise_us:
+            flag = "  REGRESION"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  mejora"
+        print(f"{key:<36}{base['p50_us']:>12.1f}{row['p50_us']:>12.1f}{change * 100:>9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las etapas del pipeline")
+    parser.add_argument("--faces", default="1,4,8", help="Caras por frame (lista separada por comas)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", default=None, help="Prefijos de benchmark a ejecutar, p.ej. tracker,header")
+    parser.add_argument("--model", default=None, help="Modelo YOLO para detector.detect y loop.iteration")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output", default=None, help="Fichero JSON de resultados")
+    parser.add_argument("--baseline", default=None, help="JSON de una ejecucion anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Empeoramiento relativo del p50 que cuenta como regresion")
+    parser.add_argument("--noise-us", type=float, default=5.0, help="Diferencias absolutas menores se ignoran")
+    args = parser.parse_args()
+
+    print(f"{'benchmark':<36}{'media us':>12}{'p50 us':>12}{'p95 us':>12}")
+    current = run(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold, args.noise_us)
+        if regressions:
+            print(f"\n{len(regressions)} regresiones: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nSin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Generador de escenas sinteticas de multitudes para probar el tracker a escala: N caras
+(sprites dibujados o crops pegados desde una carpeta) que se mueven por la escena, con
+velocidad, oclusiones, entradas/salidas y resolucion configurables. Cada frame viene
+con su ground truth: ID de persona, caja y fraccion visible.
+
+Lo usa benchmarks.bench_tracker_crowd; tambien se puede importar directamente:
+
+    scenario = CrowdScenario(CrowdConfig(faces=50, occluders=2))
+    for frame, truth in scenario.frames(300):
+        ...
+"""
+import os
+import math
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class CrowdConfig:
+    faces: int = 10
+    width: int = 1280
+    height: int = 720
+    fps: float = 30.0
+    face_width: Tuple[int, int] = (36, 72)  # Ancho minimo/maximo de cada cara (px)
+    speed: float = 60.0                     # Velocidad media (px/s)
+    entry_rate: float = 0.0                 # Personas nuevas por segundo (entran por un borde)
+    exit_rate: float = 0.0                  # Probabilidad por segundo de que una persona se marche
+    occluders: int = 0                      # Columnas que cruzan la escena tapando caras
+    occluder_width: int = 80
+    sprites_dir: Optional[str] = None       # Carpeta con crops de caras; si no, se dibujan
+    seed: int = 0
+
+
+@dataclass
+class GroundTruth:
+    person_id: int
+    box: Box            # (x1, y1, x2, y2) recortada a la imagen
+    visibility: float   # Fraccion de la caja no tapada por oclusores
+
+
+@dataclass
+class _Person:
+    person_id: int
+    x: float
+    y: float
+    vx: float
+    vy: float
+    sprite: np.ndarray
+    entering: bool = False
+    leaving: bool = False
+
+
+@dataclass
+class _Occluder:
+    x: float
+    vx: float
+    color: Tuple[int, int, int] = field(default=(90, 90, 90))
+
+
+class CrowdScenario:
+
+    def __init__(self, config: CrowdConfig):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        self.dt = 1.0 / config.fps
+        self.frame_index = 0
+        self.next_id = 0
+        self.entered = 0
+        self.exited = 0
+
+        h, w = config.height, config.width
+        texture = self.rng.integers(40, 110, (h // 8 + 1, w // 8 + 1, 3), dtype=np.uint8)
+        self.background = cv2.resize(texture, (w, h), interpolation=cv2.INTER_LINEAR)
+
+        self._crops = self._load_crops(config.sprites_dir)
+        self.people: List[_Person] = [self._spawn(inside=True) for _ in range(config.faces)]
+        self.occluders = [
+            _Occluder(
+                x=float(self.rng.uniform(0, w)),
+                vx=float(self.rng.choice((-1, 1)) * self.rng.uniform(0.5, 1.5) * config.speed)
+            )
+            for _ in range(config.occluders)
+        ]
+
+    def _load_crops(self, path: Optional[str]) -> List[np.ndarray]:
+        if not path:
+            return []
+        crops = []
+        for name in sorted(os.listdir(path)):
+            image = cv2.imread(os.path.join(path, name), cv2.IMREAD_COLOR)
+            if image is not None:
+                crops.append(image)
+        if not crops:
+            raise ValueError(f"No hay imagenes legibles en {path}")
+        return crops
+
+    def _make_sprite(self, width: int) -> np.ndarray:
+        height = int(width * 1.25)
+        if self._crops:
+            crop = self._crops[int(self.rng.integers(len(self._crops)))]
+            return cv2.resize(crop, (width, height), interpolation=cv2.INTER_AREA)
+
+        # Cara dibujada: tono de piel, pelo y rasgos distintos por persona para que
+        # los trackers de apariencia tengan algo que distinguir
+        sprite = np.zeros((height, width, 3), dtype=np.uint8)
+        sprite[:] = self.background[:height, :width]
+        skin = tuple(int(v) for v in self.rng.integers((90, 120, 150), (170, 200, 240)))
+        hair = tuple(int(v) for v in self.rng.integers(0, 90, 3))
+        center = (width // 2, height // 2)
+        cv2.ellipse(sprite, center, (width // 2 - 1, height // 2 - 1), 0, 0, 360, skin, -1)
+        cv2.ellipse(sprite, (center[0], height // 5), (width // 2 - 1, height // 5), 0, 180, 360, hair, -1)
+        eye = max(2, width // 12)
+        spread = int(width * self.rng.uniform(0.15, 0.25))
+        for dx in (-spread, spread):
+            cv2.circle(sprite, (center[0] + dx, int(height * 0.45)), eye, (30, 30, 30), -1)
+        mouth = (max(2, int(width * self.rng.uniform(0.12, 0.22))), max(1, height // 24))
+        cv2.ellipse(sprite, (center[0], int(height * 0.7)), mouth, 0, 0, 360, (60, 50, 150), -1)
+        return sprite
+
+    def _spawn(self, inside: bool) -> _Person:
+        config = self.config
+        width = int(self.rng.integers(config.face_width[0], config.face_width[1] + 1))
+        sprite = self._make_sprite(width)
+        sh, sw = sprite.shape[:2]
+        angle = self.rng.uniform(0, 2 * math.pi)
+        speed = config.speed * self.rng.uniform(0.5, 1.5)
+        vx, vy = speed * math.cos(angle), speed * math.sin(angle)
+
+        if inside:
+            x = self.rng.uniform(sw / 2, config.width - sw / 2)
+            y = self.rng.uniform(sh / 2, config.height - sh / 2)
+        else:
+            # Entra desde fuera por un borde, caminando hacia dentro
+            edge = int(self.rng.integers(4))
+            if edge in (0, 1):
+                x = -sw / 2 if edge == 0 else config.width + sw / 2
+                y = self.rng.uniform(sh / 2, config.height - sh / 2)
+                vx = abs(vx) if edge == 0 else -abs(vx)
+            else:
+                x = self.rng.uniform(sw / 2, config.width - sw / 2)
+                y = -sh / 2 if edge == 2 else config.height + sh / 2
+                vy = abs(vy) if edge == 2 else -abs(vy)
+            self.entered += 1
+
+        person = _Person(self.next_id, x, y, vx, vy, sprite, entering=not inside)
+        self.next_id += 1
+        return person
+
+    def _move(self, person: _Person):
+        config = self.config
+        person.x += person.vx * self.dt
+        person.y += person.vy * self.dt
+        if person.leaving:
+            return
+        sh, sw = person.sprite.shape[:2]
+        min_x, max_x = sw / 2, config.width - sw / 2
+        min_y, max_y = sh / 2, config.height - sh / 2
+        if person.entering:
+            # Quien entra por un borde no rebota hasta estar dentro del todo
+            person.entering = not (min_x <= person.x <= max_x and min_y <= person.y <= max_y)
+            return
+        if person.x < min_x:
+            person.vx = abs(person.vx)
+        elif person.x > max_x:
+            person.vx = -abs(person.vx)
+        if person.y < min_y:
+            person.vy = abs(person.vy)
+        elif person.y > max_y:
+            person.vy = -abs(person.vy)
+
+    def _outside(self, person: _Person) -> bool:
+        sh, sw = person.sprite.shape[:2]
+        return (
+            person.x + sw / 2 < 0 or person.x - sw / 2 > self.config.width
+            or person.y + sh / 2 < 0 or person.y - sh / 2 > self.config.height
+        )
+
+    def _paste(self, frame: np.ndarray, person: _Person) -> Optional[Box]:
+        sh, sw = person.sprite.shape[:2]
+        x1, y1 = int(round(person.x - sw / 2)), int(round(person.y - sh / 2))
+        fx1, fy1 = max(0, x1), max(0, y1)
+        fx2, fy2 = min(frame.shape[1], x1 + sw), min(frame.shape[0], y1 + sh)
+        if fx2 <= fx1 or fy2 <= fy1:
+            return None
+        frame[fy1:fy2, fx1:fx2] = person.sprite[fy1 - y1:fy2 - y1, fx1 - x1:fx2 - x1]
+        return (fx1, fy1, fx2, fy2)
+
+    def step(self) -> Tuple[np.ndarray, List[GroundTruth]]:
+        config = self.config
+
+        if config.exit_rate > 0:
+            for person in self.people:
+                if not person.leaving and self.rng.random() < config.exit_rate * self.dt:
+                    person.leaving = True
+        if config.entry_rate > 0:
+            for _ in range(int(self.rng.poisson(config.entry_rate * self.dt))):
+                self.people.append(self._spawn(inside=False))
+
+        for person in self.people:
+            self._move(person)
+        remaining = [person for person in self.people if not (person.leaving and self._outside(person))]
+        self.exited += len(self.people) - len(remaining)
+        self.people = remaining
+
+        for occluder in self.occluders:
+            occluder.x += occluder.vx * self.dt
+            if occluder.x < 0 or occluder.x > config.width:
+                occluder.vx = -occluder.vx
+
+        frame = self.background.copy()
+        boxes = []
+        for person in self.people:
+            box = self._paste(frame, person)
+            if box is not None:
+                boxes.append((person.person_id, box))
+
+        spans = []
+        for occluder in self.occluders:
+            ox1 = int(occluder.x - config.occluder_width / 2)
+            ox2 = ox1 + config.occluder_width
+            frame[:, max(0, ox1):max(0, ox2)] = occluder.color
+            spans.append((ox1, ox2))
+
+        truth = []
+        for person_id, (x1, y1, x2, y2) in boxes:
+            # Fraccion horizontal tapada: los oclusores ocupan toda la altura
+            covered = np.zeros(x2 - x1, dtype=bool)
+            for ox1, ox2 in spans:
+                covered[max(0, ox1 - x1):max(0, ox2 - x1)] = True
+            truth.append(GroundTruth(person_id, (x1, y1, x2, y2), 1.0 - covered.mean()))
+
+        self.frame_index += 1
+        return frame, truth
+
+    def frames(self, count: int) -> Iterator[Tuple[np.ndarray, List[GroundTruth]]]:
+        for _ in range(count):
+            yield self.step()
+
+    @property
+    def timestamp(self) -> float:
+        return self.frame_index * self.dt
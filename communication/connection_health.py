@@ -0,0 +1,132 @@
+import time
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HEALTH_HEALTHY = "healthy"
+HEALTH_DEGRADED = "degraded"
+HEALTH_DOWN = "down"
+
+# ConnectionHealth combina los eventos del monitor ZMQ con un ping/pong de
+# aplicacion. Mientras el backend no haya respondido ningun pong se asume que no
+# lo soporta y el estado depende solo del monitor (conectado = healthy). Un backend
+# que no responde ninguno de los primeros `probe_pings` pings deja de recibirlos:
+# el backend C++ actual no entiende los pings y los recibe sin imagen.
+class ConnectionHealth:
+
+    def __init__(
+        self,
+        ping_interval: float = 0.0,
+        degraded_rtt_ms: float = 250.0,
+        down_after: float = 6.0,
+        reconnect_base: float = 0.5,
+        reconnect_max: float = 30.0,
+        probe_pings: int = 3
+    ):
+        self.ping_interval = ping_interval
+        self.probe_pings = probe_pings
+        self.degraded_rtt_ms = degraded_rtt_ms
+        self.down_after = down_after
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = reconnect_max
+
+        self.connected = False
+        self.pong_supported = False
+        self.rtt_ms: Optional[float] = None
+
+        self._ping_seq = 0
+        self._probe_abandoned = False
+        self._pending_pings: Dict[int, float] = {}
+        self._last_ping = 0.0
+        self._last_pong = time.time()
+
+        self.reconnect_attempts = 0
+        self.reconnects = 0
+        self._awaiting_pong = False
+        # El primer intento de reconexion espera down_after desde el arranque
+        self._next_reconnect = time.time() + down_after
+
+    def on_connected(self):
+        self.connected = True
+        # Con ping/pong, el backoff solo se reinicia cuando el backend vuelve a responder
+        if not self.pong_supported:
+            self.reconnect_attempts = 0
+        # Periodo de gracia: el primer pong tras conectar aun no ha podido llegar
+        self._last_pong = time.time()
+
+    def on_disconnected(self):
+        self.connected = False
+
+    def should_ping(self, now: float) -> bool:
+        if self.ping_interval <= 0 or not self.connected:
+            return False
+        if not self.pong_supported and self._ping_seq >= self.probe_pings:
+            if not self._probe_abandoned:
+                self._probe_abandoned = True
+                logger.info(f"[HEALTH] Sin pong tras {self.probe_pings} pings: el backend no soporta ping/pong, se deja de enviar")
+            return False
+        return now - self._last_ping >= self.ping_interval
+
+    def next_ping(self, now: float) -> int:
+        self._ping_seq += 1
+        self._last_ping = now
+        self._pending_pings[self._ping_seq] = now
+        # Pings que nunca se respondieron no se acumulan
+        if len(self._pending_pings) > 16:
+            self._pending_pings.pop(min(self._pending_pings))
+        return self._ping_seq
+
+    def on_pong(self, seq: int, now: float) -> bool:
+        sent = self._pending_pings.pop(seq, None)
+        if sent is None:
+            return False
+
+        sample = (now - sent) * 1000.0
+        self.rtt_ms = sample if self.rtt_ms is None else 0.8 * self.rtt_ms + 0.2 * sample
+        if not self.pong_supported:
+            logger.info(f"[HEALTH] El backend responde ping/pong (RTT {sample:.1f} ms)")
+        self.pong_supported = True
+        self._awaiting_pong = False
+        self.reconnect_attempts = 0
+        self._last_pong = now
+        return True
+
+    def state(self, now: Optional[float] = None) -> str:
+        if not self.connected:
+            return HEALTH_DOWN
+        if not self.pong_supported:
+            return HEALTH_HEALTHY
+
+        now = now or time.time()
+        silence = now - self._last_pong
+        if silence > self.down_after:
+            return HEALTH_DOWN
+        if self._awaiting_pong or silence > 2 * self.ping_interval:
+            return HEALTH_DEGRADED
+        if self.rtt_ms is not None and self.rtt_ms > self.degraded_rtt_ms:
+            return HEALTH_DEGRADED
+        return HEALTH_HEALTHY
+
+    def should_reconnect(self, now: float) -> bool:
+        return now >= self._next_reconnect and self.state(now) == HEALTH_DOWN
+
+    def on_reconnect(self, now: float) -> float:
+        # Backoff exponencial entre intentos, reiniciado al conectar
+        self.reconnects += 1
+        delay = min(self.reconnect_max, self.reconnect_base * (2 ** self.reconnect_attempts))
+        self.reconnect_attempts += 1
+        self._next_reconnect = now + delay
+        self._pending_pings.clear()
+        self._last_pong = now
+        self._awaiting_pong = True
+        return delay
+
+    def get_stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "state": self.state(now),
+            "rtt_ms": round(self.rtt_ms, 1) if self.rtt_ms is not None else None,
+            "pong_supported": self.pong_supported,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts
+        }
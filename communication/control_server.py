@@ -0,0 +1,148 @@
+import sys
+import json
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import zmq
+
+from communication.zmq_transport import acquire_context, release_context
+
+logger = logging.getLogger(__name__)
+
+CONTROL_COMMANDS = ("mode", "register", "faces", "status", "metrics", "profile", "quit")
+
+
+@dataclass
+class ControlCommand:
+    name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    reply: Optional[Dict[str, Any]] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def complete(self, reply: Dict[str, Any]):
+        self.reply = reply
+        self.done.set()
+
+    def wait(self, timeout: float) -> Dict[str, Any]:
+        if not self.done.wait(timeout):
+            return {"ok": False, "error": "timeout"}
+        return self.reply
+
+
+def parse_command_line(line: str) -> Optional[ControlCommand]:
+    # Formato de linea: "mode register", "register <face_id> <nombre>", "faces", "status", "metrics",
+    # "profile <cprofile|sample|memory> [frames|segundos]", "quit"
+    parts = line.strip().split(maxsplit=2)
+    if not parts:
+        return None
+
+    name = parts[0].lower()
+    args: Dict[str, Any] = {}
+    if name == "mode" and len(parts) > 1:
+        args["mode"] = parts[1]
+    elif name == "register" and len(parts) > 2:
+        try:
+            args["face_id"] = int(parts[1])
+        except ValueError:
+            return ControlCommand(name="invalid", args={"line": line.strip()})
+        args["name"] = parts[2]
+    elif name == "profile" and len(parts) > 1:
+        args["kind"] = parts[1].lower()
+        if len(parts) > 2:
+            try:
+                args["amount"] = float(parts[2])
+            except ValueError:
+                return ControlCommand(name="invalid", args={"line": line.strip()})
+    return ControlCommand(name=name, args=args)
+
+
+# ControlServer recibe comandos para el modo sin ventana (headless), donde no hay
+# teclado: por un socket ZMQ REP local (JSON {"cmd": ..., ...}) y/o por stdin, una
+# orden por linea. Los comandos se encolan y el loop principal los ejecuta entre
+# frames; cada peticion espera la respuesta del loop antes de contestar.
+class ControlServer:
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = "tcp://127.0.0.1:5560",
+        stdin: bool = False,
+        reply_timeout: float = 2.0
+    ):
+        self.endpoint = endpoint
+        self.stdin = stdin
+        self.reply_timeout = reply_timeout
+
+        self._commands: "queue.Queue[ControlCommand]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self.endpoint:
+            thread = threading.Thread(target=self._serve_socket, name="control-socket", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.stdin:
+            # Daemon: readline bloquea y no se puede interrumpir al cerrar
+            thread = threading.Thread(target=self._read_stdin, name="control-stdin", daemon=True)
+            thread.start()
+
+    def pending(self) -> List[ControlCommand]:
+        commands = []
+        while True:
+            try:
+                commands.append(self._commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def submit(self, command: ControlCommand) -> Dict[str, Any]:
+        self._commands.put(command)
+        return command.wait(self.reply_timeout)
+
+    def _serve_socket(self):
+        context = acquire_context()
+        socket = context.socket(zmq.REP)
+        socket.setsockopt(zmq.LINGER, 0)
+        try:
+            socket.bind(self.endpoint)
+        except zmq.ZMQError as e:
+            logger.error(f"[CONTROL] No se pudo abrir {self.endpoint}: {e}")
+            socket.close()
+            release_context()
+            return
+
+        logger.info(f"[CONTROL] Escuchando comandos en {self.endpoint}")
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        try:
+            while not self._stop_event.is_set():
+                if not poller.poll(100):
+                    continue
+                try:
+                    message = json.loads(socket.recv())
+                    command = ControlCommand(name=str(message.get("cmd", "")).lower(), args=message)
+                except (ValueError, AttributeError):
+                    socket.send_json({"ok": False, "error": "JSON inválido"})
+                    continue
+                socket.send_json(self.submit(command))
+        finally:
+            socket.close()
+            release_context()
+
+    def _read_stdin(self):
+        for line in sys.stdin:
+            if self._stop_event.is_set():
+                break
+            command = parse_command_line(line)
+            if command is None:
+                continue
+            print(json.dumps(self.submit(command), ensure_ascii=False), flush=True)
+        logger.debug("[CONTROL] stdin cerrado")
+
+    def close(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
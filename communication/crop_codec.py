@@ -0,0 +1,95 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CROP_CODEC_JPEG = "jpeg"
+CROP_CODEC_RAW = "raw"
+CROP_CODEC_PNG = "png"
+CROP_CODEC_WEBP = "webp"
+
+CROP_CODECS = (CROP_CODEC_JPEG, CROP_CODEC_RAW, CROP_CODEC_PNG, CROP_CODEC_WEBP)
+
+# Calidad por defecto de cada codec (JPEG/WebP 0-100, PNG nivel de compresion 0-9)
+DEFAULT_QUALITY = {
+    CROP_CODEC_JPEG: 95,
+    CROP_CODEC_RAW: None,
+    CROP_CODEC_PNG: 1,
+    CROP_CODEC_WEBP: 90
+}
+
+
+def validate_crop_codec(codec: str) -> str:
+    if codec not in CROP_CODECS:
+        logger.warning(f"Codec de crop desconocido '{codec}', usando '{CROP_CODEC_JPEG}'")
+        return CROP_CODEC_JPEG
+    return codec
+
+
+# CropCodec codifica un crop ya redimensionado. encode() devuelve un buffer que
+# ZMQ puede enviar sin copiar (ndarray) y header_fields() lo que el backend necesita
+# para decodificarlo. JPEG no anade campos: es el formato que el backend asume.
+class CropCodec:
+
+    def __init__(self, codec: str = CROP_CODEC_JPEG, quality: Optional[int] = None):
+        self.codec = validate_crop_codec(codec)
+        self.quality = quality if quality is not None else DEFAULT_QUALITY[self.codec]
+
+        if self.codec == CROP_CODEC_JPEG:
+            self._extension = '.jpg'
+            self._params = [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)]
+        elif self.codec == CROP_CODEC_PNG:
+            self._extension = '.png'
+            self._params = [cv2.IMWRITE_PNG_COMPRESSION, int(self.quality)]
+        elif self.codec == CROP_CODEC_WEBP:
+            self._extension = '.webp'
+            self._params = [cv2.IMWRITE_WEBP_QUALITY, int(self.quality)]
+        else:
+            self._extension = None
+            self._params = []
+
+    def encode(self, image: np.ndarray) -> Optional[np.ndarray]:
+        if self.codec == CROP_CODEC_RAW:
+            # BGR crudo: el propio ndarray contiguo es el buffer a enviar
+            return np.ascontiguousarray(image)
+
+        success, buffer = cv2.imencode(self._extension, image, self._params)
+        if not success:
+            return None
+        return buffer
+
+    def header_fields(self, image: np.ndarray) -> Dict[str, Any]:
+        if self.codec == CROP_CODEC_JPEG:
+            return {}
+        fields: Dict[str, Any] = {"image_format": self.codec}
+        if self.codec == CROP_CODEC_RAW:
+            fields["shape"] = list(image.shape)
+            fields["dtype"] = image.dtype.name
+        return fields
+
+    def __repr__(self) -> str:
+        if self.quality is None:
+            return self.codec
+        return f"{self.codec}:{self.quality}"
+
+
+# CropEncoderPool ejecuta resize + codificacion fuera del hilo que los pide.
+# OpenCV libera el GIL en resize/imencode, por lo que varios hilos codifican en paralelo.
+class CropEncoderPool:
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crop-encode")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable, *iterables):
+        return list(self._executor.map(fn, *iterables))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,190 @@
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+
+from core import clock
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingRequest:
+    face_id: int
+    bbox: Tuple[int, int, int, int]
+    face_crop: Any
+    camera_id: str
+    quality: Optional[float] = None
+    request_id: Optional[str] = None
+    timestamp: float = field(default_factory=clock.now)
+
+# CreditWindow limita cuantas requests pueden estar sin respuesta en el backend.
+# Cada envio consume un credito y cada resultado lo devuelve. Sin creditos explicitos
+# del backend la ventana se estima localmente (AIMD): crece +1/ventana por resultado
+# recibido y se reduce a la mitad ante congestion (socket lleno o request expirada).
+class CreditWindow:
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_window: int = 1,
+        max_window: int = 32,
+        credit_timeout: float = 3.0
+    ):
+        self.min_window = min_window
+        self.max_window = max(max_window, min_window)
+        self.window = float(min(max(initial, min_window), self.max_window))
+        self.credit_timeout = credit_timeout
+
+        # request_id -> (face_id, instante de envio) de cada request pendiente de respuesta.
+        # Una cara puede tener varias en vuelo: cada una ocupa su credito
+        self.in_flight: Dict[str, Tuple[int, float]] = {}
+        self.granted = False
+        self._anonymous = 0
+
+    def available(self) -> int:
+        return max(0, int(self.window) - len(self.in_flight))
+
+    def faces_in_flight(self) -> Set[int]:
+        return {face_id for face_id, _ in self.in_flight.values()}
+
+    def acquire(self, face_id: int, request_id: Optional[str] = None):
+        if not request_id:
+            self._anonymous += 1
+            request_id = f"#{self._anonymous}"
+        self.in_flight[request_id] = (face_id, clock.now())
+
+    def release(self, face_id: int, request_id: Optional[str] = None) -> bool:
+        if not request_id or request_id not in self.in_flight:
+            # Sin request_id: la mas antigua de la cara o, sin face_id (formato legacy), la mas antigua
+            candidates = [key for key, (fid, _) in self.in_flight.items() if fid == face_id or face_id < 0]
+            if not candidates:
+                return False
+            request_id = min(candidates, key=lambda key: self.in_flight[key][1])
+
+        del self.in_flight[request_id]
+        if not self.granted:
+            self.window = min(self.max_window, self.window + 1.0 / self.window)
+        return True
+
+    def grant(self, credits: int):
+        # Ventana fijada por el backend; desactiva la estimacion local
+        self.granted = True
+        self.window = float(min(max(int(credits), self.min_window), self.max_window))
+
+    def on_congestion(self):
+        previous = int(self.window)
+        self.window = max(float(self.min_window), self.window / 2.0)
+        if int(self.window) != previous:
+            logger.debug(f"[FLOW] Congestión, ventana {previous} -> {int(self.window)}")
+
+    def expire(self) -> int:
+        now = clock.now()
+        expired = [key for key, (_, sent) in self.in_flight.items() if now - sent > self.credit_timeout]
+        for key in expired:
+            del self.in_flight[key]
+        if expired:
+            # Respuestas que no llegan: el backend va mas lento que la ventana actual
+            self.on_congestion()
+        return len(expired)
+
+
+# CoalescingQueue guarda como maximo una request por cara: la mas reciente
+# reemplaza a la anterior. Al liberarse creditos sale primero la mas valiosa:
+# caras sin request en vuelo y, entre ellas, la de mejor calidad. Las requests
+# reemplazadas o caducadas no se envian nunca: se devuelven a quien las encolo.
+class CoalescingQueue:
+
+    def __init__(self, max_age: float = 3.0):
+        self.max_age = max_age
+        self.requests: Dict[int, PendingRequest] = {}
+        self.coalesced = 0
+        self.dropped = 0
+
+    def put(self, request: PendingRequest) -> Optional[PendingRequest]:
+        # Devuelve la request reemplazada, si la habia
+        replaced = self.requests.get(request.face_id)
+        if replaced is not None:
+            self.coalesced += 1
+        self.requests[request.face_id] = request
+        return replaced
+
+    def requeue(self, request: PendingRequest) -> bool:
+        # Reencola una request que no se pudo enviar, salvo que ya haya otra mas nueva
+        if request.face_id in self.requests:
+            self.coalesced += 1
+            return False
+        self.requests[request.face_id] = request
+        return True
+
+    def pop_best(self, in_flight: Set[int]) -> Optional[PendingRequest]:
+        if not self.requests:
+            return None
+        best = max(
+            self.requests.values(),
+            key=lambda r: (r.face_id not in in_flight, r.quality or 0.0, r.timestamp)
+        )
+        return self.requests.pop(best.face_id)
+
+    def drop_stale(self) -> List[PendingRequest]:
+        now = clock.now()
+        stale = [face_id for face_id, r in self.requests.items() if now - r.timestamp > self.max_age]
+        dropped = [self.requests.pop(face_id) for face_id in stale]
+        self.dropped += len(dropped)
+        return dropped
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+
+class FlowController:
+
+    def __init__(
+        self,
+        initial_window: int = 8,
+        max_window: int = 32,
+        credit_timeout: float = 3.0
+    ):
+        self.credits = CreditWindow(
+            initial=initial_window,
+            max_window=max_window,
+            credit_timeout=credit_timeout
+        )
+        self.queue = CoalescingQueue(max_age=credit_timeout)
+        # Requests que no se enviaran (reemplazadas, caducadas); las recoge el cliente
+        self.discarded: List[PendingRequest] = []
+
+    def put(self, request: PendingRequest):
+        replaced = self.queue.put(request)
+        if replaced is not None:
+            self.discarded.append(replaced)
+
+    def requeue(self, request: PendingRequest):
+        if not self.queue.requeue(request):
+            self.discarded.append(request)
+
+    def take_discarded(self) -> List[PendingRequest]:
+        discarded, self.discarded = self.discarded, []
+        return discarded
+
+    def take_ready(self) -> List[PendingRequest]:
+        # Requests que caben en la ventana actual, de mas a menos valiosa
+        self.credits.expire()
+        self.discarded.extend(self.queue.drop_stale())
+
+        ready = []
+        in_flight = self.credits.faces_in_flight()
+        for _ in range(self.credits.available()):
+            request = self.queue.pop_best(in_flight)
+            if request is None:
+                break
+            ready.append(request)
+        return ready
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window": int(self.credits.window),
+            "in_flight": len(self.credits.in_flight),
+            "queued": len(self.queue),
+            "coalesced": self.queue.coalesced,
+            "dropped": self.queue.dropped,
+            "granted": self.credits.granted
+        }
@@ -0,0 +1,257 @@
+import json
+import struct
+import logging
+from typing import Any, Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional
+    msgpack = None
+
+# Codecs de cabecera disponibles
+HEADER_CODEC_JSON = "json"
+HEADER_CODEC_BINARY = "binary"
+HEADER_CODEC_MSGPACK = "msgpack"
+
+HEADER_CODECS = (HEADER_CODEC_JSON, HEADER_CODEC_BINARY, HEADER_CODEC_MSGPACK)
+
+# Primer byte de cada cabecera. JSON empieza siempre por '{' (0x7B),
+# asi que el receptor distingue el formato sin configuracion
+MAGIC_BINARY = 0xB1
+MAGIC_MSGPACK = 0xB2
+PROTOCOL_VERSION = 1
+
+# Cabecera de request v1 (binario):
+#   magic, version, mode, flags, timestamp, face_id, bbox x/y/w/h, quality
+# seguida de camera_id (len u8), person_name (len u16) y extra JSON (len u16)
+_REQUEST_STRUCT = struct.Struct('!BBBBdqiiiif')
+
+# Resultado v1 (binario):
+#   magic, version, kind, flags, count
+# y por cada resultado: face_id, confidence, person_id (len u8), person_name (len u16),
+# extra JSON (len u16)
+_RESULT_PREFIX = struct.Struct('!BBBBH')
+_RESULT_ITEM = struct.Struct('!qf')
+
+_U8 = struct.Struct('!B')
+_U16 = struct.Struct('!H')
+
+MODES = {
+    "recognize": 1,
+    "register": 2,
+    "recognize_batch": 3,
+    "batch_face": 4,
+    "ping": 5,
+    "pong": 6
+}
+_MODES_BY_ID = {value: key for key, value in MODES.items()}
+
+_FLAG_HAS_QUALITY = 0x01
+_FLAG_HAS_BBOX = 0x02
+
+_RESULT_KIND_SINGLE = 1
+_RESULT_KIND_BATCH = 2
+
+_REQUEST_FIELDS = ("mode", "timestamp", "face_id", "bbox", "quality", "camera_id", "person_name")
+_RESULT_FIELDS = ("face_id", "confidence", "person_id", "person_name")
+
+
+class HeaderCodecError(ValueError):
+    pass
+
+
+def validate_header_codec(codec: str) -> str:
+    if codec not in HEADER_CODECS:
+        logger.warning(f"Codec de cabecera desconocido '{codec}', usando '{HEADER_CODEC_JSON}'")
+        return HEADER_CODEC_JSON
+    if codec == HEADER_CODEC_MSGPACK and msgpack is None:
+        logger.warning("msgpack no está instalado, usando cabeceras JSON")
+        return HEADER_CODEC_JSON
+    return codec
+
+
+def _pack_str(value: str, length_struct: struct.Struct) -> bytes:
+    data = value.encode('utf-8')
+    max_len = 0xFF if length_struct is _U8 else 0xFFFF
+    if len(data) > max_len:
+        data = data[:max_len]
+    return length_struct.pack(len(data)) + data
+
+
+def _unpack_str(data: memoryview, offset: int, length_struct: struct.Struct) -> Tuple[str, int]:
+    (length,) = length_struct.unpack_from(data, offset)
+    offset += length_struct.size
+    value = bytes(data[offset:offset + length]).decode('utf-8')
+    return value, offset + length
+
+
+def _pack_extra(extra: Dict[str, Any]) -> bytes:
+    if not extra:
+        return _U16.pack(0)
+    return _pack_str(json.dumps(extra, separators=(',', ':')), _U16)
+
+
+def _unpack_extra(data: memoryview, offset: int) -> Tuple[Dict[str, Any], int]:
+    raw, offset = _unpack_str(data, offset, _U16)
+    return (json.loads(raw) if raw else {}), offset
+
+
+def encode_header(header: Dict[str, Any], codec: str = HEADER_CODEC_JSON) -> bytes:
+    if codec == HEADER_CODEC_BINARY:
+        return _encode_request_binary(header)
+    if codec == HEADER_CODEC_MSGPACK:
+        return bytes((MAGIC_MSGPACK, PROTOCOL_VERSION)) + msgpack.packb(header, use_bin_type=True)
+    return json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+
+def _encode_request_binary(header: Dict[str, Any]) -> bytes:
+    flags = 0
+    quality = header.get("quality")
+    if quality is not None:
+        flags |= _FLAG_HAS_QUALITY
+    bbox = header.get("bbox")
+    if bbox is not None:
+        flags |= _FLAG_HAS_BBOX
+    else:
+        bbox = (0, 0, 0, 0)
+
+    mode = header.get("mode", "recognize")
+    extra = {key: value for key, value in header.items() if key not in _REQUEST_FIELDS}
+    if mode not in MODES:
+        extra["mode"] = mode
+
+    fixed = _REQUEST_STRUCT.pack(
+        MAGIC_BINARY,
+        PROTOCOL_VERSION,
+        MODES.get(mode, 0),
+        flags,
+        float(header.get("timestamp", 0.0)),
+        int(header.get("face_id", -1)),
+        int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3]),
+        float(quality) if quality is not None else 0.0
+    )
+
+    return b''.join((
+        fixed,
+        _pack_str(str(header.get("camera_id", "")), _U8),
+        _pack_str(str(header.get("person_name", "")), _U16),
+        _pack_extra(extra)
+    ))
+
+
+def decode_header(data: Union[bytes, memoryview]) -> Dict[str, Any]:
+    view = memoryview(data)
+    if len(view) == 0:
+        raise HeaderCodecError("Cabecera vacía")
+
+    first = view[0]
+    if first == ord('{'):
+        return json.loads(bytes(view))
+    if first == MAGIC_MSGPACK:
+        _check_version(view[1])
+        if msgpack is None:
+            raise HeaderCodecError("Cabecera msgpack recibida pero msgpack no está instalado")
+        return msgpack.unpackb(bytes(view[2:]), raw=False)
+    if first == MAGIC_BINARY:
+        return _decode_request_binary(view)
+
+    raise HeaderCodecError(f"Formato de cabecera desconocido (byte 0x{first:02x})")
+
+
+def _decode_request_binary(view: memoryview) -> Dict[str, Any]:
+    (_, version, mode_id, flags, timestamp, face_id,
+     x, y, w, h, quality) = _REQUEST_STRUCT.unpack_from(view, 0)
+    _check_version(version)
+
+    offset = _REQUEST_STRUCT.size
+    camera_id, offset = _unpack_str(view, offset, _U8)
+    person_name, offset = _unpack_str(view, offset, _U16)
+    extra, offset = _unpack_extra(view, offset)
+
+    header: Dict[str, Any] = {
+        "camera_id": camera_id,
+        "face_id": face_id,
+        "mode": _MODES_BY_ID.get(mode_id, "unknown"),
+        "timestamp": timestamp
+    }
+    if flags & _FLAG_HAS_BBOX:
+        header["bbox"] = [x, y, w, h]
+    if flags & _FLAG_HAS_QUALITY:
+        header["quality"] = round(quality, 3)
+    if person_name:
+        header["person_name"] = person_name
+    header.update(extra)
+    return header
+
+
+def _check_version(version: int):
+    if version > PROTOCOL_VERSION:
+        raise HeaderCodecError(f"Versión de protocolo no soportada: {version}")
+
+
+def encode_results(results: List[Dict[str, Any]], codec: str = HEADER_CODEC_JSON, batch: bool = False) -> bytes:
+    if codec == HEADER_CODEC_BINARY:
+        kind = _RESULT_KIND_BATCH if batch else _RESULT_KIND_SINGLE
+        parts = [_RESULT_PREFIX.pack(MAGIC_BINARY, PROTOCOL_VERSION, kind, 0, len(results))]
+        for result in results:
+            extra = {key: value for key, value in result.items() if key not in _RESULT_FIELDS}
+            parts.append(_RESULT_ITEM.pack(int(result.get("face_id", -1)), float(result.get("confidence", 0.0))))
+            parts.append(_pack_str(str(result.get("person_id", "")), _U8))
+            parts.append(_pack_str(str(result.get("person_name", "")), _U16))
+            parts.append(_pack_extra(extra))
+        return b''.join(parts)
+
+    payload: Any = {"results": results} if batch else results[0]
+    if codec == HEADER_CODEC_MSGPACK:
+        return bytes((MAGIC_MSGPACK, PROTOCOL_VERSION)) + msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def decode_results(data: Union[bytes, memoryview]) -> Tuple[List[Dict[str, Any]], bool]:
+    # Retorna (resultados, tipado): tipado=True cuando los campos ya vienen con su
+    # tipo (binario) y no hace falta la coercion del formato JSON legacy
+    view = memoryview(data)
+    if len(view) == 0:
+        raise HeaderCodecError("Resultado vacío")
+
+    first = view[0]
+    if first == MAGIC_BINARY:
+        return _decode_results_binary(view), True
+
+    if first == MAGIC_MSGPACK:
+        _check_version(view[1])
+        if msgpack is None:
+            raise HeaderCodecError("Resultado msgpack recibido pero msgpack no está instalado")
+        payload = msgpack.unpackb(bytes(view[2:]), raw=False)
+    else:
+        payload = json.loads(bytes(view))
+
+    if isinstance(payload, dict) and isinstance(payload.get("results"), list):
+        return payload["results"], False
+    return [payload], False
+
+
+def _decode_results_binary(view: memoryview) -> List[Dict[str, Any]]:
+    _, version, _, _, count = _RESULT_PREFIX.unpack_from(view, 0)
+    _check_version(version)
+
+    offset = _RESULT_PREFIX.size
+    results: List[Dict[str, Any]] = []
+    for _ in range(count):
+        face_id, confidence = _RESULT_ITEM.unpack_from(view, offset)
+        offset += _RESULT_ITEM.size
+        person_id, offset = _unpack_str(view, offset, _U8)
+        person_name, offset = _unpack_str(view, offset, _U16)
+        extra, offset = _unpack_extra(view, offset)
+
+        result = {
+            "face_id": face_id,
+            "person_id": person_id,
+            "person_name": person_name,
+            "confidence": confidence
+        }
+        result.update(extra)
+        results.append(result)
+    return results
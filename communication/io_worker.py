@@ -0,0 +1,203 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ZMQIOWorker es el unico hilo que toca los sockets ZMQ de un cliente.
+# El hilo principal solo deja trabajos en `outbox` y recoge resultados de `inbox`;
+# ambas son deques acotadas (append/popleft son atomicos en CPython, sin locks)
+# que descartan el elemento mas antiguo cuando se llenan.
+#
+# submit() devuelve un Future con el valor que devuelve el trabajo en el hilo de I/O;
+# si el trabajo se descarta (cola llena o parada) el Future queda cancelado. Sus
+# callbacks corren en el hilo de I/O o en el que descarta: solo deben anotar.
+#
+# El cliente debe implementar:
+#   _connect_sockets() -> bool, check_connection(), _link_usable() -> bool, health,
+#   _flush_encoded(), _io_receive() -> List[Any] y _close_sockets()
+class ZMQIOWorker:
+    def __init__(
+        self,
+        client,
+        name: str,
+        outbox_size: int = 64,
+        inbox_size: int = 512,
+        poll_interval_ms: int = 2
+    ):
+        self.client = client
+        self.name = name
+        self.poll_interval = poll_interval_ms / 1000.0
+
+        self.outbox: Deque[Tuple[Future, Callable, tuple, dict]] = deque(maxlen=outbox_size)
+        self.inbox: Deque[Any] = deque(maxlen=inbox_size)
+
+        # Estado de conexion cacheado; solo lo escribe el hilo de I/O
+        self.connected = False
+        self.health_state = "down"
+        self.dropped_jobs = 0
+        self.dropped_results = 0
+
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+        self._connect_ok = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Limpieza que debe esperar a que el hilo termine (contexto, memoria compartida)
+        self._exit_lock = threading.Lock()
+        self._exited = False
+        self._exit_callbacks: List[Callable[[], None]] = []
+
+    def start(self, timeout: float = 2.0) -> bool:
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+        if not self._ready.wait(timeout):
+            logger.error(f"[{self.name}] El hilo de I/O no inicializó los sockets a tiempo")
+            return False
+        return self._connect_ok
+
+    def in_io_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Optional[Future]:
+        if self._stop_event.is_set():
+            return None
+
+        if len(self.outbox) == self.outbox.maxlen:
+            try:
+                dropped = self.outbox.popleft()
+            except IndexError:
+                # El hilo de I/O vacio la cola entre medias
+                dropped = None
+            if dropped is not None:
+                self.dropped_jobs += 1
+                dropped[0].cancel()
+                logger.warning(f"[{self.name}] Cola de envío llena, descartando el trabajo más antiguo")
+
+        future: Future = Future()
+        self.outbox.append((future, fn, args, kwargs))
+        self._wakeup.set()
+        return future
+
+    def wake(self):
+        # Despierta el hilo antes del siguiente poll (p.ej. al terminar una codificacion)
+        self._wakeup.set()
+
+    def take_results(self) -> List[Any]:
+        results = []
+        while True:
+            try:
+                results.append(self.inbox.popleft())
+            except IndexError:
+                return results
+
+    def take_result(self) -> Optional[Any]:
+        try:
+            return self.inbox.popleft()
+        except IndexError:
+            return None
+
+    def stop(self, timeout: float = 1.0) -> bool:
+        # True si el hilo ya no existe; False si sigue vivo tras el timeout (p.ej.
+        # bloqueado en un send), y entonces sigue usando sus sockets
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is None or self.in_io_thread():
+            return self._thread is None
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"[{self.name}] El hilo de I/O no terminó en {timeout:.1f} s")
+            return False
+        self._thread = None
+        return True
+
+    def call_on_exit(self, fn: Callable[[], None]):
+        # Ejecuta fn cuando el hilo haya terminado (ahora mismo si ya termino)
+        with self._exit_lock:
+            if not self._exited and self._thread is not None:
+                self._exit_callbacks.append(fn)
+                return
+        fn()
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            with self._exit_lock:
+                self._exited = True
+                callbacks, self._exit_callbacks = self._exit_callbacks, []
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.debug(f"[{self.name}] Error en la limpieza diferida: {e}")
+
+    def _serve(self):
+        try:
+            self._connect_ok = bool(self.client._connect_sockets())
+        except Exception as e:
+            logger.error(f"[{self.name}] Error inicializando sockets: {e}")
+            self._connect_ok = False
+        finally:
+            self._ready.set()
+
+        if not self._connect_ok:
+            return
+
+        logger.info(f"[{self.name}] Hilo de I/O iniciado")
+
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+            try:
+                self.client.check_connection()
+                self.connected = self.client._link_usable()
+                self.health_state = self.client.health.state()
+
+                self._run_jobs()
+                self.client._flush_encoded()
+
+                for result in self.client._io_receive():
+                    if len(self.inbox) == self.inbox.maxlen:
+                        self.dropped_results += 1
+                    self.inbox.append(result)
+            except Exception as e:
+                logger.error(f"[{self.name}] Error en el hilo de I/O: {e}", exc_info=True)
+
+        # Los trabajos pendientes se descartan (y se avisa a quien los pidio): el socket se cierra con LINGER=0
+        self._cancel_pending()
+        self.connected = False
+        self.health_state = "down"
+        try:
+            self.client._close_sockets()
+        except Exception as e:
+            logger.debug(f"[{self.name}] Error cerrando sockets: {e}")
+        logger.info(f"[{self.name}] Hilo de I/O detenido")
+
+    def _run_jobs(self):
+        while True:
+            try:
+                future, fn, args, kwargs = self.outbox.popleft()
+            except IndexError:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                logger.error(f"[{self.name}] Error en un trabajo de envío: {e}", exc_info=True)
+                future.set_exception(e)
+
+    def _cancel_pending(self):
+        while True:
+            try:
+                future, _, _, _ = self.outbox.popleft()
+            except IndexError:
+                return
+            future.cancel()
@@ -1,12 +1,14 @@
-import cv2
 import time
-import json
-import struct
 import logging
 import zmq
-from typing import Tuple, Optional
+from collections import deque
+from typing import Tuple, Optional, List, Deque, Dict, Set, Any
 from dataclasses import dataclass
 
+from communication.zmq_transport import ZMQTransport, build_face_header
+from communication.header_codec import encode_header, decode_results
+from communication.flow_control import FlowController, PendingRequest
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -15,166 +17,367 @@ class RecognitionResult:
     person_id: str
     person_name: str
     confidence: float
+    request_id: Optional[str] = None
+
+@dataclass
+class BatchFace:
+    face_id: int
+    bbox: Tuple[int, int, int, int]
+    face_crop: Optional[Any] = None
+    quality: Optional[float] = None
+    request_id: Optional[str] = None
 
-class RecognitionClient:
-    def __init__(self, send_endpoint: str, recv_endpoint: str):
-        self.send_endpoint = send_endpoint
-        self.recv_endpoint = recv_endpoint
+class RecognitionClient(ZMQTransport):
+
+    LOG_TAG = "RECOGNIZE"
+    ACTION_LABEL = "reconocimiento"
+    POLLED_FLUSH = True
+    ENCODE_POOL = True
+
+    def __init__(
+        self,
+        send_endpoint: str,
+        recv_endpoint: str,
+        flow_window: int = 0,
+        flow_max_window: int = 32,
+        flow_credit_timeout: float = 3.0,
+        **transport_options
+    ):
+        super().__init__(send_endpoint, recv_endpoint, **transport_options)
         
-        self.context: Optional[zmq.Context] = None
-        self.send_socket: Optional[zmq.Socket] = None
-        self.recv_socket: Optional[zmq.Socket] = None
+        self._pending_results: Deque[RecognitionResult] = deque()
         
-        self._monitor_socket: Optional[zmq.Socket] = None
-        self._connected = False
+        # (face_id, request_id) de envios diferidos al hilo de I/O que no salieron;
+        # el hilo principal los recoge con take_failed_requests() y deshace su estado
+        self._failed_requests: Deque[Tuple[int, Optional[str]]] = deque()
         
-        self.enabled = False
+        # flow_window > 0 activa el control de flujo por creditos: fuera de la ventana
+        # las requests esperan en cola, una por cara (la mas reciente)
+        self.flow: Optional[FlowController] = None
+        if flow_window > 0:
+            self.flow = FlowController(flow_window, flow_max_window, flow_credit_timeout)
+        self._dispatch_batches = False
     
-    def connect(self) -> bool:
-        try:
-            self.context = zmq.Context()
-            
-            self.send_socket = self.context.socket(zmq.PUSH)
-            self.send_socket.setsockopt(zmq.SNDHWM, 100)
-            
-            monitor_addr = f"inproc://monitor-recognize-{id(self)}"
-            self.send_socket.monitor(monitor_addr, zmq.EVENT_CONNECTED | zmq.EVENT_DISCONNECTED | zmq.EVENT_CONNECT_DELAYED)
-            
-            self._monitor_socket = self.context.socket(zmq.PAIR)
-            self._monitor_socket.setsockopt(zmq.RCVTIMEO, 0)
-            self._monitor_socket.connect(monitor_addr)
-            
-            self.send_socket.connect(self.send_endpoint)
-            
-            self.recv_socket = self.context.socket(zmq.PULL)
-            self.recv_socket.setsockopt(zmq.RCVHWM, 100)
-            self.recv_socket.connect(self.recv_endpoint)
-            
-            self.enabled = True
-            logger.info(f"RecognitionClient inicializado - Send: {self.send_endpoint}, Recv: {self.recv_endpoint}")
+    def send_recognition_request(
+        self,
+        frame,
+        face_id: int,
+        bbox: Tuple[int, int, int, int],
+        camera_id: str = "cam_1",
+        face_crop=None,
+        quality: Optional[float] = None,
+        request_id: Optional[str] = None
+    ) -> bool:
+        if self._defer_to_io():
+            future = self._io_worker.submit(
+                self.send_recognition_request,
+                frame, face_id, bbox, camera_id, face_crop, quality, request_id
+            )
+            if future is None:
+                return False
+            future.add_done_callback(lambda f: self._record_failures(f, [(face_id, request_id)]))
             return True
-            
-        except Exception as e:
-            logger.error(f"Error conectando RecognitionClient: {e}")
-            self.enabled = False
+        
+        if not self.enabled or not self.send_socket:
             return False
-    
-    def check_connection(self):
-        if not self._monitor_socket:
-            return
         
-        try:
-            while self._monitor_socket.poll(0):
-                message = self._monitor_socket.recv_multipart(flags=zmq.NOBLOCK)
-                if len(message) >= 1:
-                    event_data = message[0]
-                    if len(event_data) >= 4:
-                        event_id = struct.unpack('=H', event_data[:2])[0]
-                        
-                        if event_id == zmq.EVENT_CONNECTED:
-                            self._connected = True
-                            logger.info("[RECOGNIZE] Conectado al servidor C++")
-                        elif event_id == zmq.EVENT_DISCONNECTED:
-                            self._connected = False
-                            logger.warning("[RECOGNIZE] Desconectado del servidor C++")
-                        elif event_id == zmq.EVENT_CONNECT_DELAYED:
-                            self._connected = False
-        except zmq.Again:
-            pass
-        except Exception as e:
-            logger.debug(f"[RECOGNIZE] Error monitoreando conexión: {e}")
+        if self.flow is not None:
+            self._enqueue(face_id, bbox, frame, face_crop, camera_id, quality, request_id)
+            self._dispatch_pending()
+            return True
+        
+        return self._send_now(frame, face_id, bbox, camera_id, face_crop, quality, request_id)
     
-    def send_recognition_request(
+    def _record_failures(self, future, requested: List[Tuple[int, Optional[str]]]):
+        # Corre en el hilo de I/O (o en el que descarto el trabajo): solo anota
+        sent: Set[int] = set()
+        if not future.cancelled() and future.exception() is None:
+            result = future.result()
+            if isinstance(result, list):
+                sent = set(result)
+            elif result:
+                sent = {face_id for face_id, _ in requested}
+        for face_id, request_id in requested:
+            if face_id not in sent:
+                self._failed_requests.append((face_id, request_id))
+    
+    def _on_send_failed(self, header: Dict[str, Any], reason: str):
+        logger.debug(f"[RECOGNIZE] Face ID {header.get('face_id')} no enviada: {reason}")
+        self._failed_requests.append((header["face_id"], header.get("request_id")))
+    
+    def take_failed_requests(self) -> List[Tuple[int, Optional[str]]]:
+        failed = []
+        while True:
+            try:
+                failed.append(self._failed_requests.popleft())
+            except IndexError:
+                return failed
+    
+    def _send_now(
         self,
         frame,
         face_id: int,
         bbox: Tuple[int, int, int, int],
-        camera_id: str = "cam_1"
+        camera_id: str,
+        face_crop=None,
+        quality: Optional[float] = None,
+        request_id: Optional[str] = None
     ) -> bool:
-        if not self.enabled or not self.send_socket:
+        header = build_face_header(
+            camera_id, face_id, "recognize", bbox,
+            quality=round(float(quality), 3) if quality is not None else None,
+            request_id=request_id
+        )
+        
+        if not self._submit_face(header, frame, bbox, face_crop):
             return False
         
+        logger.debug(f"[RECOGNIZE] Enviado - Face ID: {face_id}")
+        return True
+    
+    def send_recognition_batch(
+        self,
+        frame,
+        faces: List[BatchFace],
+        camera_id: str = "cam_1"
+    ) -> List[int]:
+        # Un unico mensaje multipart por frame:
+        # [cabecera del frame, cabecera cara 1, imagen cara 1, cabecera cara 2, ...]
+        # Las imagenes salen directamente del buffer del codec (copy=False)
+        if self._defer_to_io():
+            future = self._io_worker.submit(self.send_recognition_batch, frame, faces, camera_id)
+            if future is None:
+                return []
+            requested = [(face.face_id, face.request_id) for face in faces]
+            future.add_done_callback(lambda f: self._record_failures(f, requested))
+            return [face.face_id for face in faces]
+        
+        if not self.enabled or not self.send_socket or not faces:
+            return []
+        
+        if self.flow is not None:
+            # El backend acepta lotes: los envios diferidos tambien salen agrupados
+            self._dispatch_batches = True
+            for face in faces:
+                self._enqueue(face.face_id, face.bbox, frame, face.face_crop, camera_id, face.quality, face.request_id)
+            self._dispatch_pending()
+            return [face.face_id for face in faces]
+        
+        return self._send_batch_now(frame, faces, camera_id)
+    
+    def _send_batch_now(
+        self,
+        frame,
+        faces: List[BatchFace],
+        camera_id: str
+    ) -> List[int]:
         try:
-            x, y, w, h = bbox
+            parts = []
+            sent_ids: List[int] = []
             
-            if frame is None or frame.size == 0:
-                logger.error("Frame inválido para reconocimiento")
-                return False
-            
-            face_crop = frame[y:y+h, x:x+w]
-            if face_crop.size == 0:
-                logger.error(f"Crop vacío para reconocimiento: {bbox}")
-                return False
-            
-            face_resized = cv2.resize(face_crop, (112, 112))
-            
-            success, jpeg_bytes = cv2.imencode(
-                '.jpg',
-                face_resized,
-                [cv2.IMWRITE_JPEG_QUALITY, 95]
-            )
+            # Las caras del lote se codifican en paralelo si hay pool de codificacion
+            encoded_faces = self._encode_many([(frame, face.bbox, face.face_crop) for face in faces])
             
-            if not success:
-                logger.error("Error codificando JPEG para reconocimiento")
-                return False
+            for face, encoded in zip(faces, encoded_faces):
+                if encoded is None:
+                    continue
+                image, image_fields = encoded
+                
+                face_header = build_face_header(
+                    camera_id, face.face_id, "batch_face", face.bbox,
+                    image_size=int(image.size) if image is not None else 0,
+                    quality=round(float(face.quality), 3) if face.quality is not None else None,
+                    request_id=face.request_id,
+                    **image_fields
+                )
+                
+                # Con memoria compartida la parte de imagen va vacia para conservar los pares
+                parts.append(encode_header(face_header, self.header_codec))
+                parts.append(image if image is not None else b'')
+                sent_ids.append(face.face_id)
             
-            jpeg_bytes = jpeg_bytes.tobytes()
+            if not sent_ids:
+                return []
             
-            header = {
+            frame_header = {
                 "camera_id": camera_id,
-                "face_id": int(face_id),
-                "mode": "recognize",
+                "mode": "recognize_batch",
                 "timestamp": time.time(),
-                "bbox": [int(x), int(y), int(w), int(h)]
+                "count": len(sent_ids)
             }
+            parts.insert(0, encode_header(frame_header, self.header_codec))
             
-            header_json = json.dumps(header, separators=(',', ':')).encode('utf-8')
-            header_len = len(header_json)
-            message = struct.pack('!I', header_len) + header_json + jpeg_bytes
+            self.send_socket.send_multipart(parts, flags=zmq.NOBLOCK, copy=False)
             
-            self.send_socket.send(message, zmq.NOBLOCK)
-            
-            logger.debug(f"[RECOGNIZE] Enviado - Face ID: {face_id}")
-            return True
+            logger.debug(f"[RECOGNIZE] Lote enviado - {len(sent_ids)} caras")
+            return sent_ids
             
         except zmq.Again:
-            logger.warning("[RECOGNIZE] Buffer lleno")
-            return False
+            logger.warning("[RECOGNIZE] Buffer lleno (lote)")
+            return []
         except Exception as e:
-            logger.error(f"[RECOGNIZE] Error enviando: {e}", exc_info=True)
+            logger.error(f"[RECOGNIZE] Error enviando lote: {e}", exc_info=True)
+            return []
+    
+    def _enqueue(
+        self,
+        face_id: int,
+        bbox: Tuple[int, int, int, int],
+        frame,
+        face_crop,
+        camera_id: str,
+        quality: Optional[float],
+        request_id: Optional[str] = None
+    ):
+        if face_crop is None and frame is not None:
+            x, y, w, h = bbox
+            face_crop = frame[y:y+h, x:x+w]
+        self.flow.put(PendingRequest(face_id, bbox, face_crop, camera_id, quality, request_id))
+    
+    def _socket_writable(self) -> bool:
+        try:
+            return bool(self.send_socket.get(zmq.EVENTS) & zmq.POLLOUT)
+        except zmq.ZMQError:
             return False
     
+    def _dispatch_pending(self):
+        if self.flow is None:
+            return
+        self._dispatch_ready()
+        # Reemplazadas por una mas reciente de la misma cara o caducadas en cola: nunca
+        # saldran, y quien las envio debe poder deshacerlas como cualquier envio fallido
+        for request in self.flow.take_discarded():
+            self._failed_requests.append((request.face_id, request.request_id))
+    
+    def _dispatch_ready(self):
+        # Envia lo que cabe en la ventana de creditos; el resto sigue coalescido en cola
+        if not self.enabled or not self.send_socket:
+            return
+        
+        ready = self.flow.take_ready()
+        if not ready:
+            return
+        
+        if not self._socket_writable():
+            # HWM alcanzado: el backend no da abasto, se reduce la ventana
+            self.flow.credits.on_congestion()
+            for request in ready:
+                self.flow.requeue(request)
+            return
+        
+        if len(ready) > 1 and self._dispatch_batches:
+            by_camera: Dict[str, List[PendingRequest]] = {}
+            for request in ready:
+                by_camera.setdefault(request.camera_id, []).append(request)
+            for camera_id, requests in by_camera.items():
+                sent = set(self._send_batch_now(
+                    None,
+                    [BatchFace(r.face_id, r.bbox, r.face_crop, r.quality, r.request_id) for r in requests],
+                    camera_id
+                ))
+                self._settle(requests, sent)
+            return
+        
+        for index, request in enumerate(ready):
+            if self._send_now(
+                None, request.face_id, request.bbox, request.camera_id,
+                request.face_crop, request.quality, request.request_id
+            ):
+                self._settle([request], {request.face_id})
+            else:
+                self._settle(ready[index:], set())
+                return
+    
+    def _settle(self, requests: List[PendingRequest], sent_ids: Set[int]):
+        failed = False
+        for request in requests:
+            if request.face_id in sent_ids:
+                self.flow.credits.acquire(request.face_id, request.request_id)
+            else:
+                failed = True
+                self.flow.requeue(request)
+        if failed:
+            self.flow.credits.on_congestion()
+    
+    def _release_credits(self, items: List[dict], results_start: int):
+        if self.flow is None:
+            return
+        for item in items:
+            credits = item.get("credits") if isinstance(item, dict) else None
+            if credits is not None:
+                self.flow.credits.grant(credits)
+        for result in list(self._pending_results)[results_start:]:
+            self.flow.credits.release(result.face_id, result.request_id)
+    
+    def get_flow_stats(self) -> Optional[Dict[str, Any]]:
+        return self.flow.get_stats() if self.flow is not None else None
+    
+    def _parse_result(self, message: dict, typed: bool = False) -> RecognitionResult:
+        if typed:
+            # Codec binario: los campos ya vienen tipados, sin heuristicas legacy
+            return RecognitionResult(
+                face_id=message["face_id"],
+                person_id=message["person_id"],
+                person_name=message["person_name"] or "Desconocido",
+                confidence=message["confidence"],
+                request_id=message.get("request_id")
+            )
+        
+        face_id_raw = message.get("face_id", -1)
+        person_id_raw = message.get("person_id", "")
+        
+        if isinstance(face_id_raw, str) and '-' in str(face_id_raw):
+            person_id = str(face_id_raw)
+            face_id = -1
+            logger.debug(f"[RECOGNIZE] Formato legacy: UUID en face_id, usando -1")
+        else:
+            try:
+                face_id = int(face_id_raw)
+            except (ValueError, TypeError):
+                face_id = -1
+            person_id = str(person_id_raw) if person_id_raw else ""
+        
+        return RecognitionResult(
+            face_id=face_id,
+            person_id=person_id,
+            person_name=str(message.get("person_name", "Desconocido")),
+            confidence=float(message.get("confidence", 0.0)),
+            request_id=str(message["request_id"]) if message.get("request_id") else None
+        )
+    
+    def _read_message(self) -> int:
+        # Lee un mensaje ya disponible (sin esperar) y encola sus resultados
+        data = self.recv_socket.recv(flags=zmq.NOBLOCK, copy=False)
+        items, typed = decode_results(data.buffer)
+        items = [item for item in items if not self._handle_pong(item)]
+        results_start = len(self._pending_results)
+        for item in items:
+            self._pending_results.append(self._parse_result(item, typed))
+        self._release_credits(items, results_start)
+        if len(items) > 1:
+            logger.debug(f"[RECOGNIZE] Lote recibido: {len(items)} resultados")
+        return len(items)
+    
     def receive_result(self, timeout_ms: int = 10) -> Optional[RecognitionResult]:
+        if self._defer_to_io():
+            return self._io_worker.take_result()
+        
         if not self.enabled or not self.recv_socket:
             return None
         
+        self._flush_encoded()
+        
+        # Resultados que llegaron juntos en una respuesta por lote
+        if self._pending_results:
+            return self._pending_results.popleft()
+        
         try:
             if self.recv_socket.poll(timeout_ms):
-                message = self.recv_socket.recv_json(flags=zmq.NOBLOCK)
-                
-                face_id_raw = message.get("face_id", -1)
-                person_id_raw = message.get("person_id", "")
-                
-                if isinstance(face_id_raw, str) and '-' in str(face_id_raw):
-                    person_id = str(face_id_raw)
-                    face_id = -1
-                    logger.debug(f"[RECOGNIZE] Formato legacy: UUID en face_id, usando -1")
-                else:
-                    try:
-                        face_id = int(face_id_raw)
-                    except (ValueError, TypeError):
-                        face_id = -1
-                    person_id = str(person_id_raw) if person_id_raw else ""
-                
-                result = RecognitionResult(
-                    face_id=face_id,
-                    person_id=person_id,
-                    person_name=str(message.get("person_name", "Desconocido")),
-                    confidence=float(message.get("confidence", 0.0))
-                )
-                
-                logger.debug(f"[RECOGNIZE] Recibido: {result.person_name} ({result.confidence:.2%})")
-                return result
+                self._read_message()
+                if self._pending_results:
+                    result = self._pending_results.popleft()
+                    logger.debug(f"[RECOGNIZE] Recibido: {result.person_name} ({result.confidence:.2%})")
+                    return result
                 
         except zmq.Again:
             pass
@@ -183,48 +386,33 @@ class RecognitionClient:
         
         return None
     
-    def close(self):
-        logger.info("Cerrando RecognitionClient...")
-        self._connected = False
+    def drain_results(self, max_messages: int = 256) -> List[RecognitionResult]:
+        # Vacia en una sola pasada, sin timeout, todo lo que ya esta en el socket
+        if self._defer_to_io():
+            return self._io_worker.take_results()
         
-        if self._monitor_socket:
-            try:
-                self._monitor_socket.close()
-            except:
-                pass
-            self._monitor_socket = None
+        if not self.enabled or not self.recv_socket:
+            return []
         
-        if self.send_socket:
-            try:
-                self.send_socket.setsockopt(zmq.LINGER, 0)
-                self.send_socket.close()
-            except:
-                pass
-            self.send_socket = None
+        self._flush_encoded()
         
-        if self.recv_socket:
-            try:
-                self.recv_socket.setsockopt(zmq.LINGER, 0)
-                self.recv_socket.close()
-            except:
-                pass
-            self.recv_socket = None
+        try:
+            for _ in range(max_messages):
+                self._read_message()
+        except zmq.Again:
+            pass
+        except Exception as e:
+            logger.error(f"[RECOGNIZE] Error recibiendo: {e}")
         
-        if self.context:
-            try:
-                self.context.term()
-            except:
-                pass
-            self.context = None
-        
-        self.enabled = False
-        logger.info("RecognitionClient cerrado")
-    
-    @property
-    def is_connected(self) -> bool:
-        self.check_connection()
-        return self._connected
-    
-    @property
-    def is_enabled(self) -> bool:
-        return self.enabled
+        results = list(self._pending_results)
+        self._pending_results.clear()
+        
+        # Los resultados recien llegados liberaron creditos
+        self._dispatch_pending()
+        
+        if results:
+            logger.debug(f"[RECOGNIZE] Drenados {len(results)} resultados")
+        return results
+    
+    def _io_receive(self) -> List[RecognitionResult]:
+        return self.drain_results()
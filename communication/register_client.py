@@ -1,12 +1,11 @@
-import cv2
-import time
-import json
-import struct
 import logging
 import zmq
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List
 from dataclasses import dataclass
 
+from communication.zmq_transport import ZMQTransport, build_face_header
+from communication.header_codec import decode_results
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -16,74 +15,10 @@ class RegisterResult:
     person_name: str
     success: bool
 
-class RegisterClient:
-    def __init__(self, send_endpoint: str, recv_endpoint: str):
-        self.send_endpoint = send_endpoint
-        self.recv_endpoint = recv_endpoint
-        
-        self.context: Optional[zmq.Context] = None
-        self.send_socket: Optional[zmq.Socket] = None
-        self.recv_socket: Optional[zmq.Socket] = None
-        
-        self._monitor_socket: Optional[zmq.Socket] = None
-        self._connected = False
-        self._last_connect_attempt = 0
-        
-        self.enabled = False
-    
-    def connect(self) -> bool:
-        try:
-            self.context = zmq.Context()
-            
-            self.send_socket = self.context.socket(zmq.PUSH)
-            self.send_socket.setsockopt(zmq.SNDHWM, 100)
-            
-            monitor_addr = f"inproc://monitor-register-{id(self)}"
-            self.send_socket.monitor(monitor_addr, zmq.EVENT_CONNECTED | zmq.EVENT_DISCONNECTED | zmq.EVENT_CONNECT_DELAYED)
-            
-            self._monitor_socket = self.context.socket(zmq.PAIR)
-            self._monitor_socket.setsockopt(zmq.RCVTIMEO, 0)
-            self._monitor_socket.connect(monitor_addr)
-            
-            self.send_socket.connect(self.send_endpoint)
-            
-            self.recv_socket = self.context.socket(zmq.PULL)
-            self.recv_socket.setsockopt(zmq.RCVHWM, 100)
-            self.recv_socket.connect(self.recv_endpoint)
-            
-            self.enabled = True
-            logger.info(f"RegisterClient inicializado - Send: {self.send_endpoint}, Recv: {self.recv_endpoint}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error conectando RegisterClient: {e}")
-            self.enabled = False
-            return False
-    
-    def check_connection(self):
-        if not self._monitor_socket:
-            return
-        
-        try:
-            while self._monitor_socket.poll(0):
-                message = self._monitor_socket.recv_multipart(flags=zmq.NOBLOCK)
-                if len(message) >= 1:
-                    event_data = message[0]
-                    if len(event_data) >= 4:
-                        event_id = struct.unpack('=H', event_data[:2])[0]
-                        
-                        if event_id == zmq.EVENT_CONNECTED:
-                            self._connected = True
-                            logger.info("[REGISTER] Conectado al servidor C++")
-                        elif event_id == zmq.EVENT_DISCONNECTED:
-                            self._connected = False
-                            logger.warning("[REGISTER] Desconectado del servidor C++")
-                        elif event_id == zmq.EVENT_CONNECT_DELAYED:
-                            self._connected = False
-        except zmq.Again:
-            pass
-        except Exception as e:
-            logger.debug(f"[REGISTER] Error monitoreando conexión: {e}")
+class RegisterClient(ZMQTransport):
+
+    LOG_TAG = "REGISTER"
+    ACTION_LABEL = "registro"
     
     def send_register_request(
         self,
@@ -91,69 +26,58 @@ class RegisterClient:
         face_id: int,
         bbox: Tuple[int, int, int, int],
         person_name: str,
-        camera_id: str = "cam_1"
+        camera_id: str = "cam_1",
+        face_crop=None,
+        quality: Optional[float] = None
     ) -> bool:
-        if not self.enabled or not self.send_socket:
-            return False
-        
-        try:
-            x, y, w, h = bbox
-            
-            if frame is None or frame.size == 0:
-                logger.error("Frame inválido para registro")
-                return False
-            
-            face_crop = frame[y:y+h, x:x+w]
-            if face_crop.size == 0:
-                logger.error(f"Crop vacío para registro: {bbox}")
-                return False
-            
-            face_resized = cv2.resize(face_crop, (112, 112))
-            
-            success, jpeg_bytes = cv2.imencode(
-                '.jpg',
-                face_resized,
-                [cv2.IMWRITE_JPEG_QUALITY, 95]
+        if self._defer_to_io():
+            future = self._io_worker.submit(
+                self.send_register_request,
+                frame, face_id, bbox, person_name, camera_id, face_crop, quality
             )
-            
-            if not success:
-                logger.error("Error codificando JPEG para registro")
+            if future is None:
                 return False
-            
-            jpeg_bytes = jpeg_bytes.tobytes()
-            
-            header = {
-                "camera_id": camera_id,
-                "face_id": int(face_id),
-                "mode": "register",
-                "timestamp": time.time(),
-                "bbox": [int(x), int(y), int(w), int(h)],
-                "person_name": person_name
-            }
-            
-            header_json = json.dumps(header, separators=(',', ':')).encode('utf-8')
-            header_len = len(header_json)
-            message = struct.pack('!I', header_len) + header_json + jpeg_bytes
-            
-            self.send_socket.send(message, zmq.NOBLOCK)
-            
-            logger.info(f"[REGISTER] Enviado - Face ID: {face_id}, Nombre: {person_name}")
+            future.add_done_callback(lambda f: self._log_failure(f, face_id))
             return True
-            
-        except zmq.Again:
-            logger.warning("[REGISTER] Buffer lleno")
+        
+        if not self.enabled or not self.send_socket:
             return False
-        except Exception as e:
-            logger.error(f"[REGISTER] Error: {e}", exc_info=True)
+        
+        header = build_face_header(
+            camera_id, face_id, "register", bbox,
+            person_name=person_name,
+            quality=round(float(quality), 3) if quality is not None else None
+        )
+        
+        if not self._submit_face(header, frame, bbox, face_crop):
             return False
+        
+        logger.info(f"[REGISTER] Enviado - Face ID: {face_id}, Nombre: {person_name}")
+        return True
+    
+    def _log_failure(self, future, face_id: int):
+        if future.cancelled() or future.exception() is not None or not future.result():
+            logger.warning(f"[REGISTER] No se pudo enviar el registro de la cara {face_id}")
     
     def receive_confirmation(self, timeout_ms: int = 10) -> Optional[RegisterResult]:
+        if self._defer_to_io():
+            return self._io_worker.take_result()
+        
         if not self.enabled or not self.recv_socket:
             return None
         
+        self._flush_encoded()
+        
         try:
-            if self.recv_socket.poll(timeout_ms):
-                message = self.recv_socket.recv_json(flags=zmq.NOBLOCK)
+            while self.recv_socket.poll(timeout_ms):
+                data = self.recv_socket.recv(flags=zmq.NOBLOCK, copy=False)
+                items, _ = decode_results(data.buffer)
+                items = [item for item in items if not self._handle_pong(item)]
+                if not items:
+                    # Era un pong: se sigue con lo que ya este en el socket
+                    timeout_ms = 0
+                    continue
+                message = items[0]
                 
                 result = RegisterResult(
                     face_id=int(message.get("face_id", -1)),
@@ -176,48 +100,10 @@ class RegisterClient:
         
         return None
     
-    def close(self):
-        logger.info("Cerrando RegisterClient...")
-        self._connected = False
-        
-        if self._monitor_socket:
-            try:
-                self._monitor_socket.close()
-            except:
-                pass
-            self._monitor_socket = None
-        
-        if self.send_socket:
-            try:
-                self.send_socket.setsockopt(zmq.LINGER, 0)
-                self.send_socket.close()
-            except:
-                pass
-            self.send_socket = None
-        
-        if self.recv_socket:
-            try:
-                self.recv_socket.setsockopt(zmq.LINGER, 0)
-                self.recv_socket.close()
-            except:
-                pass
-            self.recv_socket = None
-        
-        if self.context:
-            try:
-                self.context.term()
-            except:
-                pass
-            self.context = None
-        
-        self.enabled = False
-        logger.info("RegisterClient cerrado")
-    
-    @property
-    def is_connected(self) -> bool:
-        self.check_connection()
-        return self._connected
-    
-    @property
-    def is_enabled(self) -> bool:
-        return self.enabled
+    def _io_receive(self) -> List[RegisterResult]:
+        results = []
+        while True:
+            result = self.receive_confirmation(timeout_ms=0)
+            if result is None:
+                return results
+            results.append(result)
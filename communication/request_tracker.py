@@ -0,0 +1,196 @@
+import os
+import bisect
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from dataclasses import dataclass
+
+from core import clock
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingRecognition:
+    request_id: str
+    face_id: int
+    bbox: Tuple[int, int, int, int]
+    capture_ts: float
+    send_ts: float
+
+# Histograma de latencias con cubetas fijas en ms (escala ~logaritmica).
+# Los percentiles se interpolan dentro de la cubeta: suficiente para dimensionar capacidad.
+class LatencyHistogram:
+
+    BUCKETS_MS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000, 10000)
+
+    def __init__(self, buckets_ms: Optional[Tuple[float, ...]] = None):
+        self.buckets_ms = tuple(buckets_ms) if buckets_ms else self.BUCKETS_MS
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        target = p / 100.0 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                lower = self.buckets_ms[index - 1] if index > 0 else 0.0
+                upper = self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+                fraction = (target - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max_ms)
+            cumulative += bucket_count
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self._round(self.percentile(50)),
+            "p95_ms": self._round(self.percentile(95)),
+            "p99_ms": self._round(self.percentile(99)),
+            "max_ms": round(self.max_ms, 1) if self.count else None
+        }
+
+    @staticmethod
+    def _round(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+
+# RequestTracker asigna un request_id unico a cada request de reconocimiento y
+# conserva la tabla de pendientes. Un resultado solo se aplica si su request_id
+# sigue pendiente; los que llegan tras expirar (late) o que no corresponden a
+# ninguna request conocida (orphan) se cuentan y se descartan.
+class RequestTracker:
+
+    def __init__(self, timeout: float = 10.0, expired_memory: int = 1024):
+        self.timeout = timeout
+        # Prefijo de sesion: los ids no se repiten entre reinicios del proceso ni del tracker
+        self._session = os.urandom(3).hex()
+        self._counter = 0
+
+        self.pending: Dict[str, PendingRecognition] = {}
+        self._expired: "OrderedDict[str, float]" = OrderedDict()
+        self._expired_memory = expired_memory
+
+        self.send_latency = LatencyHistogram()
+        self.round_trip = LatencyHistogram()
+        self.capture_to_result = LatencyHistogram()
+
+        self.completed = 0
+        self.timeouts = 0
+        self.late = 0
+        self.orphans = 0
+        self.invalidated = 0
+        self.send_failures = 0
+
+    def new_request_id(self) -> str:
+        self._counter += 1
+        return f"{self._session}-{self._counter}"
+
+    def register(
+        self,
+        request_id: str,
+        face_id: int,
+        bbox: Tuple[int, int, int, int],
+        capture_ts: float,
+        send_ts: Optional[float] = None
+    ):
+        send_ts = send_ts or clock.now()
+        self.pending[request_id] = PendingRecognition(request_id, face_id, bbox, capture_ts, send_ts)
+        self.send_latency.observe((send_ts - capture_ts) * 1000.0)
+
+    def _forget(self, request_id: str):
+        self._expired[request_id] = clock.now()
+        while len(self._expired) > self._expired_memory:
+            self._expired.popitem(last=False)
+
+    def resolve(self, result: Any) -> Optional[PendingRecognition]:
+        now = clock.now()
+        request_id = getattr(result, "request_id", None)
+
+        if request_id:
+            entry = self.pending.pop(request_id, None)
+            if entry is None:
+                if request_id in self._expired:
+                    self.late += 1
+                    logger.debug(f"[REQUEST] Resultado tardío descartado: {request_id}")
+                else:
+                    self.orphans += 1
+                    logger.debug(f"[REQUEST] Resultado huérfano descartado: {request_id}")
+                return None
+        else:
+            # Backend sin request_id: se empareja con la request pendiente mas antigua de la cara
+            entry = self._oldest_for_face(result.face_id)
+            if entry is None:
+                self.orphans += 1
+                return None
+            del self.pending[entry.request_id]
+
+        self.completed += 1
+        self.round_trip.observe((now - entry.send_ts) * 1000.0)
+        self.capture_to_result.observe((now - entry.capture_ts) * 1000.0)
+        return entry
+
+    def _oldest_for_face(self, face_id: int) -> Optional[PendingRecognition]:
+        candidates = [entry for entry in self.pending.values() if entry.face_id == face_id]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda entry: entry.send_ts)
+
+    def has_pending(self, face_id: int) -> bool:
+        return any(entry.face_id == face_id for entry in self.pending.values())
+
+    def cancel(self, request_id: str) -> Optional[PendingRecognition]:
+        # La request no llego a enviarse (descartada o fallida en el hilo de I/O)
+        entry = self.pending.pop(request_id, None)
+        if entry is not None:
+            self.send_failures += 1
+        return entry
+
+    def expire(self) -> int:
+        now = clock.now()
+        expired = [rid for rid, entry in self.pending.items() if now - entry.send_ts > self.timeout]
+        for request_id in expired:
+            del self.pending[request_id]
+            self._forget(request_id)
+        self.timeouts += len(expired)
+        return len(expired)
+
+    def invalidate_all(self):
+        # Tras un reset del tracker los face_id se reutilizan: nada pendiente es aplicable
+        for request_id in self.pending:
+            self._forget(request_id)
+        self.invalidated += len(self.pending)
+        self.pending.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "late": self.late,
+            "orphans": self.orphans,
+            "invalidated": self.invalidated,
+            "send_failures": self.send_failures,
+            "send_latency": self.send_latency.snapshot(),
+            "round_trip": self.round_trip.snapshot(),
+            "capture_to_result": self.capture_to_result.snapshot()
+        }
+
+    def log_summary(self):
+        stats = self.get_stats()
+        rtt = stats["round_trip"]
+        logger.info(
+            f"Requests: {stats['completed']} completadas, {stats['pending']} pendientes, "
+            f"{stats['timeouts']} expiradas, {stats['late']} tardías, {stats['orphans']} huérfanas | "
+            f"RTT p50={rtt['p50_ms']} p95={rtt['p95_ms']} p99={rtt['p99_ms']} ms"
+        )
@@ -0,0 +1,292 @@
+import bisect
+import hashlib
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Any, Deque
+from dataclasses import dataclass
+
+from core import clock
+from communication.recognition_client import RecognitionClient, RecognitionResult, BatchFace
+from communication.connection_health import HEALTH_HEALTHY, HEALTH_DEGRADED, HEALTH_DOWN
+
+logger = logging.getLogger(__name__)
+
+ROUTING_ROUND_ROBIN = "round_robin"
+ROUTING_LEAST_INFLIGHT = "least_inflight"
+ROUTING_CONSISTENT_HASH = "consistent_hash"
+
+ROUTING_POLICIES = (ROUTING_ROUND_ROBIN, ROUTING_LEAST_INFLIGHT, ROUTING_CONSISTENT_HASH)
+
+@dataclass
+class EndpointHealth:
+    name: str
+    client: RecognitionClient
+    in_flight: int = 0
+    sent: int = 0
+    received: int = 0
+    failures: int = 0
+    healthy: bool = False
+
+# ShardedRecognitionClient reparte las requests entre varios backends C++ con la misma
+# interfaz que RecognitionClient. Un backend que el monitor reporta desconectado sale
+# de la rotacion y sus caras se reasignan al siguiente backend sano.
+class ShardedRecognitionClient:
+
+    VIRTUAL_NODES = 64
+
+    def __init__(
+        self,
+        endpoints: List[Dict[str, str]],
+        routing: str = ROUTING_ROUND_ROBIN,
+        result_timeout: float = 10.0,
+        **transport_options
+    ):
+        if not endpoints:
+            raise ValueError("Se necesita al menos un endpoint de reconocimiento")
+
+        if routing not in ROUTING_POLICIES:
+            logger.warning(f"Política de enrutado desconocida '{routing}', usando '{ROUTING_ROUND_ROBIN}'")
+            routing = ROUTING_ROUND_ROBIN
+        self.routing = routing
+
+        self.backends: List[EndpointHealth] = []
+        for endpoint in endpoints:
+            client = RecognitionClient(
+                send_endpoint=endpoint['send'],
+                recv_endpoint=endpoint['recv'],
+                **transport_options
+            )
+            self.backends.append(EndpointHealth(name=endpoint.get('name', endpoint['send']), client=client))
+
+        # face_id -> (indice del backend con una request pendiente para esa cara, instante del
+        # envio, request_id). Pasado result_timeout la request se da por perdida (como en
+        # RequestTracker) y deja de contar
+        self._in_flight_owner: Dict[int, Tuple[int, float, Optional[str]]] = {}
+        self.result_timeout = result_timeout
+        self._rr_next = 0
+        self._pending_results: Deque[RecognitionResult] = deque()
+
+        self._ring: List[Tuple[int, int]] = []
+        for index, backend in enumerate(self.backends):
+            for vnode in range(self.VIRTUAL_NODES):
+                self._ring.append((self._hash(f"{backend.name}#{vnode}"), index))
+        self._ring.sort()
+        self._ring_keys = [key for key, _ in self._ring]
+
+        self.enabled = False
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def connect(self) -> bool:
+        connected = [backend.client.connect() for backend in self.backends]
+        self.enabled = any(connected)
+        logger.info(
+            f"ShardedRecognitionClient: {sum(connected)}/{len(self.backends)} backends, "
+            f"enrutado={self.routing}"
+        )
+        return self.enabled
+
+    def _refresh_health(self) -> List[int]:
+        healthy = []
+        for index, backend in enumerate(self.backends):
+            is_up = backend.client.is_connected
+            if is_up != backend.healthy:
+                if is_up:
+                    logger.info(f"[SHARD] Backend {backend.name} disponible")
+                else:
+                    logger.warning(f"[SHARD] Backend {backend.name} caído, sale de la rotación")
+                    self._release_backend(index)
+                backend.healthy = is_up
+            if is_up:
+                healthy.append(index)
+        return healthy
+
+    def _release_backend(self, index: int):
+        # Las requests pendientes en un backend caido no van a volver
+        orphaned = [face_id for face_id, (owner, _, _) in self._in_flight_owner.items() if owner == index]
+        for face_id in orphaned:
+            del self._in_flight_owner[face_id]
+        self.backends[index].in_flight = 0
+
+    def _release_in_flight(self, face_id: int, index: Optional[int] = None, request_id: Optional[str] = None):
+        # Libera la request pendiente de la cara (solo si es de ese backend / esa request, si se indica)
+        owner = self._in_flight_owner.get(face_id)
+        if owner is None or (index is not None and owner[0] != index):
+            return
+        if request_id and owner[2] and owner[2] != request_id:
+            # Otra request de la cara (p.ej. la que reemplazo a esta) sigue en vuelo
+            return
+        del self._in_flight_owner[face_id]
+        backend = self.backends[owner[0]]
+        backend.in_flight = max(0, backend.in_flight - 1)
+
+    def _expire_in_flight(self):
+        # Sin resultado tras result_timeout (timeout del backend o cara que salio de escena)
+        now = clock.now()
+        expired = [
+            face_id for face_id, (_, sent_at, _) in self._in_flight_owner.items()
+            if now - sent_at > self.result_timeout
+        ]
+        for face_id in expired:
+            self._release_in_flight(face_id)
+
+    def _select_backend(self, face_id: int, healthy: List[int]) -> Optional[int]:
+        if not healthy:
+            return None
+
+        if self.routing == ROUTING_LEAST_INFLIGHT:
+            return min(healthy, key=lambda index: self.backends[index].in_flight)
+
+        if self.routing == ROUTING_CONSISTENT_HASH:
+            # Se recorre el anillo desde el hash de la cara hasta el primer backend sano
+            position = bisect.bisect(self._ring_keys, self._hash(str(face_id)))
+            healthy_set = set(healthy)
+            for offset in range(len(self._ring)):
+                _, index = self._ring[(position + offset) % len(self._ring)]
+                if index in healthy_set:
+                    return index
+            return None
+
+        index = healthy[self._rr_next % len(healthy)]
+        self._rr_next += 1
+        return index
+
+    def _mark_sent(self, index: int, face_id: int, request_id: Optional[str] = None):
+        self._release_in_flight(face_id)
+        self._in_flight_owner[face_id] = (index, clock.now(), request_id)
+        backend = self.backends[index]
+        backend.in_flight += 1
+        backend.sent += 1
+
+    def send_recognition_request(
+        self,
+        frame,
+        face_id: int,
+        bbox: Tuple[int, int, int, int],
+        camera_id: str = "cam_1",
+        face_crop=None,
+        quality: Optional[float] = None,
+        request_id: Optional[str] = None
+    ) -> bool:
+        self._expire_in_flight()
+        healthy = self._refresh_health()
+        index = self._select_backend(face_id, healthy)
+        if index is None:
+            return False
+
+        backend = self.backends[index]
+        success = backend.client.send_recognition_request(
+            frame, face_id, bbox, camera_id, face_crop, quality, request_id
+        )
+        if success:
+            self._mark_sent(index, face_id, request_id)
+        else:
+            backend.failures += 1
+        return success
+
+    def send_recognition_batch(
+        self,
+        frame,
+        faces: List[BatchFace],
+        camera_id: str = "cam_1"
+    ) -> List[int]:
+        self._expire_in_flight()
+        healthy = self._refresh_health()
+
+        # Un lote por backend, respetando la politica de enrutado cara a cara
+        groups: Dict[int, List[BatchFace]] = {}
+        for face in faces:
+            index = self._select_backend(face.face_id, healthy)
+            if index is not None:
+                groups.setdefault(index, []).append(face)
+
+        sent_ids: List[int] = []
+        for index, group in groups.items():
+            backend = self.backends[index]
+            group_sent = backend.client.send_recognition_batch(frame, group, camera_id)
+            if not group_sent:
+                backend.failures += 1
+            request_ids = {face.face_id: face.request_id for face in group}
+            for face_id in group_sent:
+                self._mark_sent(index, face_id, request_ids.get(face_id))
+            sent_ids.extend(group_sent)
+        return sent_ids
+
+    def drain_results(self) -> List[RecognitionResult]:
+        self._expire_in_flight()
+        results: List[RecognitionResult] = list(self._pending_results)
+        self._pending_results.clear()
+        for index, backend in enumerate(self.backends):
+            backend_results = backend.client.drain_results()
+            for result in backend_results:
+                self._release_in_flight(result.face_id, index)
+            backend.received += len(backend_results)
+            results.extend(backend_results)
+        return results
+
+    def take_failed_requests(self) -> List[Tuple[int, Optional[str]]]:
+        failed: List[Tuple[int, Optional[str]]] = []
+        for index, backend in enumerate(self.backends):
+            backend_failed = backend.client.take_failed_requests()
+            for face_id, request_id in backend_failed:
+                self._release_in_flight(face_id, index, request_id)
+            backend.failures += len(backend_failed)
+            failed.extend(backend_failed)
+        return failed
+
+    def receive_result(self, timeout_ms: int = 0) -> Optional[RecognitionResult]:
+        if not self._pending_results:
+            self._pending_results.extend(self.drain_results())
+        if not self._pending_results:
+            return None
+        return self._pending_results.popleft()
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": backend.name,
+                "healthy": backend.healthy,
+                "in_flight": backend.in_flight,
+                "sent": backend.sent,
+                "received": backend.received,
+                "failures": backend.failures,
+                "health": backend.client.get_health()
+            }
+            for backend in self.backends
+        ]
+
+    def close(self):
+        for backend in self.backends:
+            backend.client.close()
+        self.enabled = False
+
+    @property
+    def is_connected(self) -> bool:
+        return bool(self._refresh_health())
+    
+    @property
+    def health_state(self) -> str:
+        # healthy si todos los backends lo estan, down si ninguno responde
+        states = [backend.client.health_state for backend in self.backends]
+        if all(state == HEALTH_HEALTHY for state in states):
+            return HEALTH_HEALTHY
+        if all(state == HEALTH_DOWN for state in states):
+            return HEALTH_DOWN
+        return HEALTH_DEGRADED
+    
+    def get_health(self) -> Dict[str, Any]:
+        rtts = [
+            backend.client.health.rtt_ms for backend in self.backends
+            if backend.client.health.rtt_ms is not None
+        ]
+        return {
+            "state": self.health_state,
+            "rtt_ms": round(min(rtts), 1) if rtts else None,
+            "backends": {backend.name: backend.client.health_state for backend in self.backends}
+        }
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.enabled
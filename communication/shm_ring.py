@@ -0,0 +1,119 @@
+import logging
+from typing import Any, Dict, Optional, Tuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SharedMemoryRing es un anillo de slots de tamaño fijo en memoria compartida.
+# Layout: [generacion u64 por slot][slot 0][slot 1]...
+# El escritor invalida la generacion del slot (0) antes de escribir en el y
+# publica la nueva solo al terminar; el lector compara la generacion antes y
+# despues de copiar, asi que una copia que coincida con una reescritura (aunque
+# sea a medias) nunca se acepta.
+class SharedMemoryRing:
+
+    def __init__(
+        self,
+        slots: int = 64,
+        slot_shape: Tuple[int, ...] = (112, 112, 3),
+        dtype: Any = np.uint8,
+        name: Optional[str] = None,
+        create: bool = True
+    ):
+        self.slots = slots
+        self.slot_shape = tuple(slot_shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.slot_shape)) * self.dtype.itemsize
+        self._header_bytes = slots * 8
+        self._owner = create
+
+        size = self._header_bytes + slots * self.slot_bytes
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=False)
+
+        self.generations = np.ndarray((slots,), dtype=np.uint64, buffer=self.shm.buf, offset=0)
+        self.data = np.ndarray(
+            (slots,) + self.slot_shape,
+            dtype=self.dtype,
+            buffer=self.shm.buf,
+            offset=self._header_bytes
+        )
+
+        if create:
+            self.generations[:] = 0
+            logger.info(f"Anillo de memoria compartida creado: {self.shm.name} ({slots} slots de {self.slot_shape})")
+
+        self._next_slot = 0
+        self._next_generation = 1
+
+    @classmethod
+    def attach(cls, descriptor: Dict[str, Any]) -> "SharedMemoryRing":
+        return cls(
+            slots=int(descriptor["shm_slots"]),
+            slot_shape=tuple(descriptor["shape"]),
+            dtype=descriptor.get("dtype", "uint8"),
+            name=descriptor["shm_name"],
+            create=False
+        )
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire_slot(self) -> Tuple[int, np.ndarray]:
+        # Devuelve el siguiente slot para escribir directamente en el (p.ej. cv2.resize(dst=...))
+        slot = self._next_slot
+        self._next_slot = (self._next_slot + 1) % self.slots
+        # Invalida el slot: un lector con la generacion anterior lo rechaza mientras se reescribe
+        self.generations[slot] = 0
+        return slot, self.data[slot]
+
+    def publish(self, slot: int) -> int:
+        generation = self._next_generation
+        self._next_generation += 1
+        self.generations[slot] = generation
+        return generation
+
+    def write(self, image: np.ndarray) -> Tuple[int, int]:
+        slot, view = self.acquire_slot()
+        np.copyto(view, image)
+        return slot, self.publish(slot)
+
+    def read(self, slot: int, generation: int) -> Optional[np.ndarray]:
+        if generation <= 0 or not 0 <= slot < self.slots:
+            return None
+        if int(self.generations[slot]) != generation:
+            return None
+        image = self.data[slot].copy()
+        if int(self.generations[slot]) != generation:
+            return None
+        return image
+
+    def descriptor(self, slot: int, generation: int) -> Dict[str, Any]:
+        return {
+            "image_transport": "shm",
+            "shm_name": self.shm.name,
+            "shm_slots": self.slots,
+            "slot": slot,
+            "generation": generation,
+            "shape": list(self.slot_shape),
+            "dtype": self.dtype.name
+        }
+
+    def close(self):
+        # Las vistas numpy deben soltarse antes de cerrar el mapeo
+        self.generations = None
+        self.data = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except Exception:
+                pass
@@ -0,0 +1,52 @@
+import struct
+import logging
+from typing import List, Any
+
+import zmq
+
+from communication.header_codec import HEADER_CODEC_JSON, encode_header
+
+logger = logging.getLogger(__name__)
+
+# Formato legacy: un solo frame ZMQ = [len(header) !I][header JSON][imagen]
+WIRE_FORMAT_LEGACY = "legacy"
+# Formato multipart: dos frames ZMQ = [header JSON] [imagen], la imagen sin copiar
+WIRE_FORMAT_MULTIPART = "multipart"
+
+WIRE_FORMATS = (WIRE_FORMAT_LEGACY, WIRE_FORMAT_MULTIPART)
+
+
+def validate_wire_format(wire_format: str) -> str:
+    if wire_format not in WIRE_FORMATS:
+        logger.warning(f"Formato de mensaje desconocido '{wire_format}', usando '{WIRE_FORMAT_LEGACY}'")
+        return WIRE_FORMAT_LEGACY
+    return wire_format
+
+
+def build_frames(
+    header: dict,
+    image: Any,
+    wire_format: str = WIRE_FORMAT_LEGACY,
+    header_codec: str = HEADER_CODEC_JSON
+) -> List[Any]:
+    header_bytes = encode_header(header, header_codec)
+
+    # Sin imagen (p.ej. descriptor de memoria compartida) solo viaja la cabecera
+    if image is None:
+        if wire_format == WIRE_FORMAT_MULTIPART:
+            return [header_bytes]
+        return [struct.pack('!I', len(header_bytes)) + header_bytes]
+
+    if wire_format == WIRE_FORMAT_MULTIPART:
+        # El buffer de imencode (ndarray) se pasa tal cual a ZMQ
+        return [header_bytes, image]
+
+    # Una sola copia de la imagen (join) en lugar de tobytes() + concatenaciones
+    return [b''.join((struct.pack('!I', len(header_bytes)), header_bytes, memoryview(image)))]
+
+
+def send_frames(socket: zmq.Socket, frames: List[Any]):
+    if len(frames) == 1:
+        socket.send(frames[0], zmq.NOBLOCK)
+    else:
+        socket.send_multipart(frames, flags=zmq.NOBLOCK, copy=False)
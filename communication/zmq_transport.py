@@ -0,0 +1,612 @@
+import cv2
+import time
+import socket
+import struct
+import logging
+import threading
+import zmq
+from collections import deque
+from concurrent.futures import Future
+from typing import Tuple, Optional, List, Dict, Any, Deque, Callable
+from dataclasses import dataclass
+
+from communication.wire_format import (
+    WIRE_FORMAT_LEGACY,
+    validate_wire_format,
+    build_frames,
+    send_frames
+)
+from communication.header_codec import HEADER_CODEC_JSON, validate_header_codec
+from communication.io_worker import ZMQIOWorker
+from communication.shm_ring import SharedMemoryRing
+from communication.crop_codec import CROP_CODEC_JPEG, CropCodec, CropEncoderPool
+from communication.connection_health import HEALTH_DOWN, ConnectionHealth
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de los crops que espera el backend C++
+FACE_SIZE = (112, 112)
+
+# Transporte de la imagen: JPEG dentro del mensaje o slot crudo en memoria compartida
+IMAGE_TRANSPORT_JPEG = "jpeg"
+IMAGE_TRANSPORT_SHM = "shm"
+IMAGE_TRANSPORT_AUTO = "auto"
+
+IMAGE_TRANSPORTS = (IMAGE_TRANSPORT_JPEG, IMAGE_TRANSPORT_SHM, IMAGE_TRANSPORT_AUTO)
+
+_context_lock = threading.Lock()
+_shared_context: Optional[zmq.Context] = None
+_context_users = 0
+
+
+def acquire_context(io_threads: int = 1) -> zmq.Context:
+    # Un unico zmq.Context por proceso, compartido por todos los transportes
+    global _shared_context, _context_users
+    with _context_lock:
+        if _shared_context is None or _shared_context.closed:
+            _shared_context = zmq.Context(io_threads=io_threads)
+            logger.debug(f"Contexto ZMQ compartido creado (io_threads={io_threads})")
+        _context_users += 1
+        return _shared_context
+
+
+def release_context():
+    global _shared_context, _context_users
+    with _context_lock:
+        _context_users = max(0, _context_users - 1)
+        if _context_users == 0 and _shared_context is not None:
+            try:
+                _shared_context.term()
+            except Exception:
+                pass
+            _shared_context = None
+            logger.debug("Contexto ZMQ compartido terminado")
+
+
+@dataclass
+class SocketOptions:
+    sndhwm: int = 100
+    rcvhwm: int = 100
+    linger: int = 0
+    immediate: bool = True
+    tcp_keepalive: bool = True
+    tcp_keepalive_idle: int = 30
+    tcp_keepalive_intvl: int = 10
+    tcp_keepalive_cnt: int = 3
+    # Reconexion nativa de libzmq con backoff exponencial (ms)
+    reconnect_ivl: int = 100
+    reconnect_ivl_max: int = 0
+    # Heartbeats ZMTP (ms, 0 = desactivados): cierran la conexion si el par deja de responder
+    heartbeat_ivl: int = 0
+    heartbeat_timeout: int = 0
+    heartbeat_ttl: int = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SocketOptions":
+        options = cls()
+        for key in cls.__dataclass_fields__:
+            if key in config:
+                setattr(options, key, type(getattr(options, key))(config[key]))
+        return options
+
+    def apply(self, socket: zmq.Socket):
+        socket.setsockopt(zmq.LINGER, self.linger)
+        if socket.type == zmq.PUSH:
+            socket.setsockopt(zmq.SNDHWM, self.sndhwm)
+            # No encolar mensajes hacia conexiones que aun no estan completas
+            socket.setsockopt(zmq.IMMEDIATE, 1 if self.immediate else 0)
+        if socket.type == zmq.PULL:
+            socket.setsockopt(zmq.RCVHWM, self.rcvhwm)
+        if self.tcp_keepalive:
+            socket.setsockopt(zmq.TCP_KEEPALIVE, 1)
+            socket.setsockopt(zmq.TCP_KEEPALIVE_IDLE, self.tcp_keepalive_idle)
+            socket.setsockopt(zmq.TCP_KEEPALIVE_INTVL, self.tcp_keepalive_intvl)
+            socket.setsockopt(zmq.TCP_KEEPALIVE_CNT, self.tcp_keepalive_cnt)
+        socket.setsockopt(zmq.RECONNECT_IVL, self.reconnect_ivl)
+        socket.setsockopt(zmq.RECONNECT_IVL_MAX, self.reconnect_ivl_max)
+        # Los heartbeats ZMTP requieren libzmq >= 4.2
+        if self.heartbeat_ivl > 0 and hasattr(zmq, "HEARTBEAT_IVL"):
+            socket.setsockopt(zmq.HEARTBEAT_IVL, self.heartbeat_ivl)
+            if self.heartbeat_timeout > 0:
+                socket.setsockopt(zmq.HEARTBEAT_TIMEOUT, self.heartbeat_timeout)
+            if self.heartbeat_ttl > 0:
+                socket.setsockopt(zmq.HEARTBEAT_TTL, self.heartbeat_ttl)
+
+
+def is_local_endpoint(endpoint: str) -> bool:
+    # ipc:// o un endpoint tcp que apunta a esta misma maquina
+    if endpoint.startswith(("ipc://", "inproc://")):
+        return True
+    if not endpoint.startswith("tcp://"):
+        return False
+
+    host = endpoint[len("tcp://"):].rsplit(":", 1)[0].strip("[]")
+    if host in ("localhost", "::1") or host.startswith("127."):
+        return True
+    try:
+        local_name = socket.gethostname()
+        return host == local_name or host == socket.gethostbyname(local_name)
+    except OSError:
+        return False
+
+
+def build_face_header(
+    camera_id: str,
+    face_id: int,
+    mode: str,
+    bbox: Tuple[int, int, int, int],
+    **extra
+) -> Dict[str, Any]:
+    # Esquema unico de cabecera para todas las caras enviadas al backend
+    x, y, w, h = bbox
+    header = {
+        "camera_id": camera_id,
+        "face_id": int(face_id),
+        "mode": mode,
+        "timestamp": time.time(),
+        "bbox": [int(x), int(y), int(w), int(h)]
+    }
+    for key, value in extra.items():
+        if value is not None:
+            header[key] = value
+    return header
+
+
+# ZMQTransport concentra la conexion, monitorizacion, codificacion, envio y cierre
+# comunes a todos los clientes ZMQ (PUSH hacia C++ y, opcionalmente, PULL de vuelta).
+# Los clientes de cada rol solo construyen sus cabeceras e interpretan sus respuestas.
+class ZMQTransport:
+
+    LOG_TAG = "ZMQ"
+    ACTION_LABEL = "envío"
+    # True si el loop principal llama al cliente en cada frame (drain) y puede enviar
+    # alli lo ya codificado; si no, sin hilo de I/O la codificacion es sincrona
+    POLLED_FLUSH = False
+    # True si el cliente codifica en el pool (encode_workers); los envios puntuales
+    # (registro) codifican en linea y no necesitan hilos de codificacion
+    ENCODE_POOL = False
+
+    def __init__(
+        self,
+        send_endpoint: str,
+        recv_endpoint: Optional[str] = None,
+        wire_format: str = WIRE_FORMAT_LEGACY,
+        header_codec: str = HEADER_CODEC_JSON,
+        io_thread: bool = False,
+        socket_options: Optional[SocketOptions] = None,
+        io_threads: int = 1,
+        image_transport: str = IMAGE_TRANSPORT_JPEG,
+        shm_slots: int = 128,
+        crop_codec: str = CROP_CODEC_JPEG,
+        crop_quality: Optional[int] = None,
+        encode_workers: int = 0,
+        health_options: Optional[Dict[str, Any]] = None
+    ):
+        self.send_endpoint = send_endpoint
+        self.recv_endpoint = recv_endpoint
+        self.wire_format = validate_wire_format(wire_format)
+        self.header_codec = validate_header_codec(header_codec)
+        self.socket_options = socket_options or SocketOptions()
+        self.io_threads = io_threads
+
+        self.context: Optional[zmq.Context] = None
+        self.send_socket: Optional[zmq.Socket] = None
+        self.recv_socket: Optional[zmq.Socket] = None
+
+        self._monitor_socket: Optional[zmq.Socket] = None
+        self._connected = False
+
+        # Con io_thread=True todos los sockets viven en un hilo de I/O dedicado
+        self.io_thread = io_thread
+        self._io_worker: Optional[ZMQIOWorker] = None
+        self._last_connect_attempt = 0
+        self._connect_count = 0
+
+        # Ping/pong de aplicacion y reconexion; sin socket de vuelta no hay pongs que esperar
+        self.health = ConnectionHealth(**(health_options or {}))
+        if not recv_endpoint:
+            self.health.ping_interval = 0
+
+        if image_transport not in IMAGE_TRANSPORTS:
+            logger.warning(f"Transporte de imagen desconocido '{image_transport}', usando '{IMAGE_TRANSPORT_JPEG}'")
+            image_transport = IMAGE_TRANSPORT_JPEG
+        self.image_transport = image_transport
+        self.shm_slots = shm_slots
+        self._shm_ring: Optional[SharedMemoryRing] = None
+
+        # Con encode_workers > 0 el resize + codificacion corre en un pool de hilos;
+        # los mensajes ya codificados esperan aqui, en orden, a que los envie el hilo del socket
+        self.crop_codec = CropCodec(crop_codec, crop_quality)
+        self.encode_workers = encode_workers
+        self._encode_pool: Optional[CropEncoderPool] = None
+        self._encoded_outbox: Deque[Tuple[Dict[str, Any], Future]] = deque(maxlen=64)
+
+        self.enabled = False
+
+    def _open_shm_ring(self):
+        use_shm = self.image_transport == IMAGE_TRANSPORT_SHM or (
+            self.image_transport == IMAGE_TRANSPORT_AUTO and is_local_endpoint(self.send_endpoint)
+        )
+        if not use_shm or self._shm_ring is not None:
+            return
+
+        try:
+            self._shm_ring = SharedMemoryRing(
+                slots=self.shm_slots,
+                slot_shape=(FACE_SIZE[1], FACE_SIZE[0], 3)
+            )
+            logger.info(f"[{self.LOG_TAG}] Crops por memoria compartida ({self._shm_ring.name})")
+        except Exception as e:
+            logger.warning(f"[{self.LOG_TAG}] Memoria compartida no disponible, usando JPEG: {e}")
+            self._shm_ring = None
+
+    def connect(self) -> bool:
+        self.context = acquire_context(self.io_threads)
+        self._open_shm_ring()
+
+        # Con memoria compartida no hay codificacion que repartir
+        if self.ENCODE_POOL and self.encode_workers > 0 and self._shm_ring is None and self._encode_pool is None:
+            self._encode_pool = CropEncoderPool(self.encode_workers)
+
+        if self.io_thread:
+            self._io_worker = ZMQIOWorker(self, name=f"{self.LOG_TAG.lower()}-io")
+            if not self._io_worker.start():
+                self._io_worker.stop()
+                self._io_worker = None
+                self.enabled = False
+            return self.enabled
+
+        return self._connect_sockets()
+
+    def _connect_sockets(self) -> bool:
+        try:
+            self._last_connect_attempt = time.time()
+
+            self.send_socket = self.context.socket(zmq.PUSH)
+            self.socket_options.apply(self.send_socket)
+
+            # Direccion nueva en cada conexion: la anterior se libera de forma asincrona
+            self._connect_count += 1
+            monitor_addr = f"inproc://monitor-{self.LOG_TAG.lower()}-{id(self)}-{self._connect_count}"
+            self.send_socket.monitor(monitor_addr, zmq.EVENT_CONNECTED | zmq.EVENT_DISCONNECTED | zmq.EVENT_CONNECT_DELAYED)
+
+            self._monitor_socket = self.context.socket(zmq.PAIR)
+            self._monitor_socket.setsockopt(zmq.RCVTIMEO, 0)
+            self._monitor_socket.connect(monitor_addr)
+
+            self.send_socket.connect(self.send_endpoint)
+
+            if self.recv_endpoint:
+                self.recv_socket = self.context.socket(zmq.PULL)
+                self.socket_options.apply(self.recv_socket)
+                self.recv_socket.connect(self.recv_endpoint)
+
+            self.enabled = True
+            logger.info(
+                f"{type(self).__name__} inicializado - Send: {self.send_endpoint}, "
+                f"Recv: {self.recv_endpoint}, Formato: {self.wire_format}/{self.header_codec}, "
+                f"Crop: {self.crop_codec}"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error conectando {type(self).__name__}: {e}")
+            self.enabled = False
+            return False
+
+    def check_connection(self):
+        if not self._monitor_socket:
+            return
+
+        try:
+            while self._monitor_socket.poll(0):
+                message = self._monitor_socket.recv_multipart(flags=zmq.NOBLOCK)
+                if len(message) >= 1:
+                    event_data = message[0]
+                    if len(event_data) >= 4:
+                        event_id = struct.unpack('=H', event_data[:2])[0]
+
+                        if event_id == zmq.EVENT_CONNECTED:
+                            self._connected = True
+                            self.health.on_connected()
+                            logger.info(f"[{self.LOG_TAG}] Conectado al servidor C++")
+                        elif event_id == zmq.EVENT_DISCONNECTED:
+                            self._connected = False
+                            self.health.on_disconnected()
+                            logger.warning(f"[{self.LOG_TAG}] Desconectado del servidor C++")
+                        elif event_id == zmq.EVENT_CONNECT_DELAYED:
+                            self._connected = False
+                            self.health.on_disconnected()
+        except zmq.Again:
+            pass
+        except Exception as e:
+            logger.debug(f"[{self.LOG_TAG}] Error monitoreando conexión: {e}")
+
+        self._maintain_health()
+
+    def _maintain_health(self):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        if self.health.should_ping(now):
+            self._send_ping(now)
+
+        if self.health.should_reconnect(now):
+            self._reconnect(now)
+
+    def _send_ping(self, now: float):
+        seq = self.health.next_ping(now)
+        header = {"mode": "ping", "seq": seq, "timestamp": now}
+        try:
+            send_frames(self.send_socket, build_frames(header, None, self.wire_format, self.header_codec))
+        except zmq.Again:
+            pass
+        except Exception as e:
+            logger.debug(f"[{self.LOG_TAG}] Error enviando ping: {e}")
+
+    def _handle_pong(self, message: Any) -> bool:
+        # True si el mensaje era un pong (y ya se consumio)
+        if not isinstance(message, dict) or message.get("mode") != "pong":
+            return False
+        try:
+            self.health.on_pong(int(message.get("seq", -1)), time.time())
+        except (TypeError, ValueError):
+            pass
+        return True
+
+    def _reconnect(self, now: float):
+        # Se recrean los sockets: descarta lo encolado hacia un backend que no responde
+        delay = self.health.on_reconnect(now)
+        logger.warning(
+            f"[{self.LOG_TAG}] Backend sin respuesta, reconectando "
+            f"(intento {self.health.reconnect_attempts}, siguiente en {delay:.1f}s)"
+        )
+        self._close_sockets()
+        self._connected = False
+        self.health.on_disconnected()
+        self._connect_sockets()
+
+    def _link_usable(self) -> bool:
+        return self._connected and self.health.state() != HEALTH_DOWN
+
+    def _defer_to_io(self) -> bool:
+        # True si la llamada viene de fuera del hilo de I/O y debe encolarse
+        return self._io_worker is not None and not self._io_worker.in_io_thread()
+
+    def _crop_face(
+        self,
+        frame,
+        bbox: Tuple[int, int, int, int],
+        face_crop=None
+    ):
+        x, y, w, h = bbox
+
+        # El crop puede venir preseleccionado (mejor captura del track)
+        if face_crop is None:
+            if frame is None or frame.size == 0:
+                logger.error(f"Frame inválido para {self.ACTION_LABEL}")
+                return None
+
+            face_crop = frame[y:y+h, x:x+w]
+
+        if face_crop.size == 0:
+            logger.error(f"Crop vacío para {self.ACTION_LABEL}: {bbox}")
+            return None
+
+        return face_crop
+
+    def _encode_image(
+        self,
+        frame,
+        bbox: Tuple[int, int, int, int],
+        face_crop=None
+    ) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        # Devuelve (imagen, campos extra de cabecera). Con memoria compartida la imagen
+        # es None: el crop se redimensiona directamente sobre el slot y solo viaja el descriptor
+        face_crop = self._crop_face(frame, bbox, face_crop)
+        if face_crop is None:
+            return None
+
+        if self._shm_ring is None:
+            face_resized = cv2.resize(face_crop, FACE_SIZE)
+            buffer = self.crop_codec.encode(face_resized)
+            if buffer is None:
+                logger.error(f"Error codificando {self.crop_codec.codec} para {self.ACTION_LABEL}")
+                return None
+            return buffer, self.crop_codec.header_fields(face_resized)
+
+        if face_crop.ndim != 3 or face_crop.shape[2] != 3:
+            logger.error(f"Crop con formato no soportado para memoria compartida: {face_crop.shape}")
+            return None
+
+        slot, slot_view = self._shm_ring.acquire_slot()
+        cv2.resize(face_crop, FACE_SIZE, dst=slot_view)
+        generation = self._shm_ring.publish(slot)
+        return None, self._shm_ring.descriptor(slot, generation)
+
+    def _submit_face(
+        self,
+        header: Dict[str, Any],
+        frame,
+        bbox: Tuple[int, int, int, int],
+        face_crop=None
+    ) -> bool:
+        # Codifica y envia la cara; con pool de codificacion solo la encola y devuelve True
+        if self._encode_pool is None or (self._io_worker is None and not self.POLLED_FLUSH):
+            encoded = self._encode_image(frame, bbox, face_crop)
+            if encoded is None:
+                return False
+            image, image_fields = encoded
+            header.update(image_fields)
+            return self._send_face(header, image)
+
+        if not self.enabled:
+            return False
+
+        future = self._encode_pool.submit(self._encode_image, frame, bbox, face_crop)
+        io_worker = self._io_worker
+        if io_worker is not None:
+            future.add_done_callback(lambda _: io_worker.wake())
+
+        if len(self._encoded_outbox) == self._encoded_outbox.maxlen:
+            evicted, _ = self._encoded_outbox.popleft()
+            self._on_send_failed(evicted, "cola de codificación llena")
+        self._encoded_outbox.append((header, future))
+
+        self._flush_encoded()
+        return True
+
+    def _encode_many(self, items: List[Tuple[Any, Tuple[int, int, int, int], Any]]) -> List[Optional[Tuple[Any, Dict[str, Any]]]]:
+        # (frame, bbox, face_crop) -> resultado de _encode_image, en paralelo si hay pool
+        if self._encode_pool is None or len(items) < 2:
+            return [self._encode_image(*item) for item in items]
+        return self._encode_pool.map(lambda item: self._encode_image(*item), items)
+
+    def _flush_encoded(self):
+        # Envia, en orden de llegada, los mensajes cuya codificacion ya termino.
+        # Solo se llama desde el hilo que es dueño del socket
+        while self._encoded_outbox:
+            header, future = self._encoded_outbox[0]
+            if not future.done():
+                return
+            self._encoded_outbox.popleft()
+
+            try:
+                encoded = future.result()
+            except Exception as e:
+                logger.error(f"[{self.LOG_TAG}] Error codificando crop: {e}")
+                self._on_send_failed(header, "error de codificación")
+                continue
+            if encoded is None:
+                self._on_send_failed(header, "crop no codificable")
+                continue
+
+            image, image_fields = encoded
+            header.update(image_fields)
+            if not self._send_face(header, image):
+                self._on_send_failed(header, "envío fallido")
+
+    def _on_send_failed(self, header: Dict[str, Any], reason: str):
+        # Cara encolada en el pool de codificacion que no llego a enviarse (_submit_face
+        # ya devolvio True). Los clientes con requests pendientes lo sobrescriben para deshacerlas
+        logger.warning(f"[{self.LOG_TAG}] Cara {header.get('face_id')} no enviada: {reason}")
+
+    def _send_face(self, header: Dict[str, Any], image) -> bool:
+        if not self.enabled or not self.send_socket:
+            return False
+
+        # Conectado a nivel TCP pero sin pongs: no se encola nada hacia un backend muerto
+        if self.health.pong_supported and self.health.state() == HEALTH_DOWN:
+            return False
+
+        try:
+            if image is None:
+                header["image_size"] = 0
+            else:
+                header["image_size"] = int(image.size) if hasattr(image, "size") else len(image)
+            frames = build_frames(header, image, self.wire_format, self.header_codec)
+            send_frames(self.send_socket, frames)
+            return True
+
+        except zmq.Again:
+            logger.warning(f"[{self.LOG_TAG}] Buffer lleno")
+            return False
+        except Exception as e:
+            logger.error(f"[{self.LOG_TAG}] Error enviando: {e}", exc_info=True)
+            return False
+
+    def _io_receive(self) -> List[Any]:
+        return []
+
+    def close(self):
+        logger.info(f"Cerrando {type(self).__name__}...")
+        self._connected = False
+
+        # El contexto y el anillo de memoria compartida solo se liberan cuando nadie
+        # puede usarlos: term() bloquearia con sockets abiertos y un send en curso
+        # leeria un segmento ya desmapeado
+        release = self._release_shared(self.context, self._shm_ring)
+        self.context = None
+        self._shm_ring = None
+
+        if self._io_worker:
+            # El hilo de I/O cierra sus propios sockets antes de terminar
+            worker, self._io_worker = self._io_worker, None
+            if worker.stop():
+                release()
+            else:
+                logger.warning(f"[{self.LOG_TAG}] El hilo de I/O sigue activo; se liberará el contexto al terminar")
+                worker.call_on_exit(release)
+        else:
+            self._close_sockets()
+            release()
+
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown()
+            self._encode_pool = None
+        self._encoded_outbox.clear()
+
+        self.enabled = False
+        logger.info(f"{type(self).__name__} cerrado")
+
+    @staticmethod
+    def _release_shared(context: Optional[zmq.Context], shm_ring: Optional[SharedMemoryRing]) -> Callable[[], None]:
+        def release():
+            if context is not None:
+                release_context()
+            if shm_ring is not None:
+                shm_ring.close()
+        return release
+
+    def _close_sockets(self):
+        if self._monitor_socket:
+            try:
+                self._monitor_socket.close()
+            except Exception:
+                pass
+            self._monitor_socket = None
+
+        if self.send_socket:
+            try:
+                self.send_socket.disable_monitor()
+            except Exception:
+                pass
+            try:
+                self.send_socket.setsockopt(zmq.LINGER, 0)
+                self.send_socket.close()
+            except Exception:
+                pass
+            self.send_socket = None
+
+        if self.recv_socket:
+            try:
+                self.recv_socket.setsockopt(zmq.LINGER, 0)
+                self.recv_socket.close()
+            except Exception:
+                pass
+            self.recv_socket = None
+
+    @property
+    def is_connected(self) -> bool:
+        if self._io_worker:
+            # Lectura del flag cacheado por el hilo de I/O, sin tocar el socket monitor
+            return self._io_worker.connected
+        self.check_connection()
+        return self._link_usable()
+
+    @property
+    def health_state(self) -> str:
+        if self._io_worker:
+            return self._io_worker.health_state
+        self.check_connection()
+        return self.health.state()
+
+    def get_health(self) -> Dict[str, Any]:
+        stats = self.health.get_stats()
+        stats["state"] = self.health_state if self.enabled else HEALTH_DOWN
+        return stats
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.enabled
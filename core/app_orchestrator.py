@@ -1,15 +1,26 @@
 import time
 import logging
+import threading
 from typing import Optional, List, Tuple, Any, Dict
 import cv2
 
+from core import clock
 from core.render_context import RenderContext
-from core.metrics_manager import MetricsManager
+from core.metrics_manager import MetricsManager, TimedDetector
+from core.staged_pipeline import DropOldestQueue, PipelineStage, FramePacket
+from core.frame_budget import FrameBudget, ACTION_RENDER, ACTION_SEND, ACTION_REDETECT, ACTION_CAPTURE
 from core.frame_processor import FrameProcessor
 from core.register_manager import RegisterManager
 from core.recognition_manager import RecognitionManager
+from core.face_quality import FaceQualityScorer
+from core.best_shot_manager import BestShotManager
+from core.appearance_cache import AppearanceCache
+from core.session_recorder import SessionRecorder, RecordingDetector
+from core.profiler_hooks import ProfilerHooks
 from communication.register_client import RegisterClient
-from communication.recognition_client import RecognitionClient
+from communication.recognition_client import RecognitionClient, BatchFace
+from communication.request_tracker import RequestTracker
+from communication.control_server import ControlServer, ControlCommand
 
 logger = logging.getLogger(__name__)
 
@@ -25,18 +36,51 @@ class ApplicationOrchestrator:
         register_client: Optional[RegisterClient] = None,
         recognition_client: Optional[RecognitionClient] = None,
         register_config: dict = None,
-        recognition_config: dict = None
+        recognition_config: dict = None,
+        pipeline_config: dict = None,
+        control_server: Optional[ControlServer] = None,
+        headless: bool = False,
+        recorder: Optional[SessionRecorder] = None,
+        metrics_config: dict = None,
+        profiler: Optional[ProfilerHooks] = None
     ):
         self.camera = camera
         self.renderer = renderer
         self.input_handler = input_handler
         self.frame_manager = frame_manager
         
+        # Sin ventana: no se dibuja ni se usa HighGUI; las ordenes llegan por control_server
+        self.headless = headless
+        self.control_server = control_server
+        
+        # Grabacion de la sesion (frames, detecciones y trafico de reconocimiento) para replay
+        self.recorder = recorder
+        if recorder:
+            detector = RecordingDetector(detector, recorder)
+        
+        metrics_config = metrics_config or {}
+        self.metrics = MetricsManager(
+            log_interval=metrics_config.get('log_interval', 30),
+            fps_window=metrics_config.get('fps_window', 5.0),
+            snapshot_path=metrics_config.get('snapshot_path'),
+            snapshot_interval=metrics_config.get('snapshot_interval', 10.0)
+        )
+        detector = TimedDetector(detector, self.metrics)
+        
         self.register_client = register_client
         self.recognition_client = recognition_client
         
         register_config = register_config or {}
         recognition_config = recognition_config or {}
+        pipeline_config = pipeline_config or {}
+        
+        appearance_cache = None
+        if recognition_config.get('reid_enabled', True):
+            appearance_cache = AppearanceCache(
+                match_threshold=recognition_config.get('reid_match_threshold', 0.3),
+                cache_timeout=recognition_config.get('reid_cache_timeout', 30.0),
+                update_interval=recognition_config.get('reid_update_interval', 0.5)
+            )
         
         self.register_manager = RegisterManager(
             id_timeout=register_config.get('id_timeout', 5.0),
@@ -47,13 +91,72 @@ class ApplicationOrchestrator:
             send_interval=recognition_config.get('interval', 1.0),
             confidence_threshold=recognition_config.get('confidence_threshold', 0.7),
             position_match_threshold=recognition_config.get('position_match_threshold', 50),
-            position_cache_timeout=recognition_config.get('position_cache_timeout', 10.0)
+            position_cache_timeout=recognition_config.get('position_cache_timeout', 10.0),
+            fusion_min_results=recognition_config.get('fusion_min_results', 2),
+            fusion_vote_ratio=recognition_config.get('fusion_vote_ratio', 0.6),
+            instant_accept_confidence=recognition_config.get('instant_accept_confidence', 0.9),
+            unknown_backoff=recognition_config.get('unknown_backoff', 2.0),
+            max_send_interval=recognition_config.get('max_send_interval', 8.0),
+            appearance_cache=appearance_cache
         )
         
-        self.pending_bboxes: Dict[int, Tuple[int, int, int, int]] = {}
+        self.quality_scorer = FaceQualityScorer(
+            min_face_size=recognition_config.get('min_face_size', 40)
+        )
+        self.best_shots = BestShotManager(
+            scorer=self.quality_scorer,
+            window=recognition_config.get('best_shot_window', 0.5),
+            min_candidates=recognition_config.get('best_shot_min_candidates', 3),
+            min_quality=recognition_config.get('best_shot_min_quality', 0.0),
+            max_wait=recognition_config.get('best_shot_max_wait', 2.0)
+        )
+        # En registro se conserva la mejor captura de los ultimos segundos de cada cara bloqueada
+        self.register_best_shots = BestShotManager(
+            scorer=self.quality_scorer,
+            candidate_ttl=register_config.get('best_shot_ttl', 3.0)
+        )
+        
+        self.batch_requests = recognition_config.get('batch_requests', False)
+        
+        # Requests de reconocimiento en vuelo, por request_id
+        self.request_tracker = RequestTracker(timeout=recognition_config.get('result_timeout', 10.0))
         
         self.frame_processor = FrameProcessor(tracker, detector)
-        self.metrics = MetricsManager(log_interval=30)
+        self._tracker_generation = self.frame_processor.tracker_generation
+        self._capture_ts = 0.0
+        
+        # "sequential": un solo loop; "pipelined": captura, tracking y reconocimiento
+        # en hilos propios unidos por colas acotadas, y render + teclado en el hilo principal
+        self.pipeline_mode = pipeline_config.get('mode', 'sequential')
+        self.queue_size = pipeline_config.get('queue_size', 2)
+        
+        # Presupuesto por frame con degradacion escalonada (None = desactivado)
+        self.frame_budget: Optional[FrameBudget] = None
+        if pipeline_config.get('frame_budget_ms', 0) > 0:
+            self.frame_budget = FrameBudget(
+                budget_ms=pipeline_config['frame_budget_ms'],
+                escalate_after=pipeline_config.get('budget_escalate_after', 5),
+                recover_after=pipeline_config.get('budget_recover_after', 30),
+                max_starvation=pipeline_config.get('budget_max_starvation', 1.0),
+                metrics=self.metrics
+            )
+        # Protege managers, estado y clientes ZMQ compartidos entre la etapa de reconocimiento y el render
+        self._state_lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._stages: List[PipelineStage] = []
+        
+        # Perfilado bajo demanda (senal o comando 'profile'); None = desactivado
+        self.profiler = profiler
+        if profiler:
+            # Contenedores que crecen con las caras vistas: candidatos a fuga en los informes de memoria
+            profiler.watch("tracker.last_boxes", lambda: getattr(tracker, 'last_boxes', {}))
+            profiler.watch("recognition.identities", lambda: self.recognition_manager.identities)
+            profiler.watch("recognition.last_send_time", lambda: self.recognition_manager.last_send_time)
+            profiler.watch("recognition.position_cache", lambda: self.recognition_manager.position_cache)
+            profiler.watch("recognition.evidence", lambda: self.recognition_manager.evidence)
+            profiler.watch("best_shots.buffers", lambda: self.best_shots.buffers)
+            profiler.watch("request_tracker.pending", lambda: self.request_tracker.pending)
+            profiler.watch("register.locked_faces", lambda: self.register_manager.locked_faces)
         
         self.state = None
         self.running = False
@@ -62,35 +165,281 @@ class ApplicationOrchestrator:
         self.state = state
         self.running = True
         self.metrics.start()
+        
+        if self.control_server:
+            self.control_server.start()
+        
+        if self.pipeline_mode == "pipelined":
+            logger.info(f"Loop principal iniciado (pipeline por etapas, colas de {self.queue_size})")
+            self._run_pipelined()
+            return
+        
         logger.info("Loop principal iniciado")
         
         while self.running:
-            if not self._process_frame():
+            if not self._process_frame() or not self.running:
                 break
             self.metrics.increment_frame()
+            if self.profiler:
+                self.profiler.on_frame()
     
     def stop(self):
         self.running = False
-        cv2.destroyAllWindows()
-        cv2.waitKey(1)
+        self._stop_pipeline()
+        if self.control_server:
+            self.control_server.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
+            cv2.waitKey(1)
         logger.info(f"Loop detenido - FPS promedio: {self.metrics.get_fps():.1f}")
+        self.metrics.dump_json()
+        self.request_tracker.log_summary()
     
     def _process_frame(self) -> bool:
+        packet = self._timed("capture", self._capture_stage, None)
+        if packet is None:
+            return True
+        
+        packet = self._timed("track", self._track_stage, packet)
+        packet = self._timed("recognition", self._recognition_stage, packet)
+        return self._present(packet)
+    
+    def _timed(self, stage: str, work, *args):
+        start = time.perf_counter()
+        result = work(*args)
+        self.metrics.record_timing(f"stage.{stage}", time.perf_counter() - start)
+        return result
+    
+    def _run_pipelined(self):
+        capture_queue = DropOldestQueue("capture", self.queue_size)
+        track_queue = DropOldestQueue("track", self.queue_size)
+        render_queue = DropOldestQueue("render", self.queue_size)
+        
+        self._stop_event.clear()
+        self._stages = [
+            PipelineStage("capture", self._capture_stage, self._stop_event, self.metrics,
+                          output_queue=capture_queue),
+            PipelineStage("track", self._track_stage, self._stop_event, self.metrics,
+                          input_queue=capture_queue, output_queue=track_queue),
+            PipelineStage("recognition", self._recognition_stage, self._stop_event, self.metrics,
+                          input_queue=track_queue, output_queue=render_queue),
+        ]
+        for stage in self._stages:
+            stage.start()
+        
+        # imshow y waitKey deben quedarse en el hilo principal
+        last_packet = None
+        while self.running:
+            packet = render_queue.get(timeout=0.05)
+            self.metrics.set_gauge("queue.render", len(render_queue))
+            
+            if packet is None:
+                if last_packet is None:
+                    continue
+                # Sin frame nuevo se siguen atendiendo teclas y comandos sobre el ultimo mostrado
+                keep_running = self._poll_input(last_packet)
+            else:
+                last_packet = packet
+                keep_running = self._present(packet)
+                self.metrics.increment_frame()
+                if self.profiler:
+                    self.profiler.on_frame()
+            
+            if not keep_running:
+                break
+        
+        self._stop_pipeline()
+    
+    def _stop_pipeline(self):
+        self._stop_event.set()
+        for stage in self._stages:
+            stage.join(timeout=1.0)
+            if stage.is_alive():
+                logger.warning(f"La etapa '{stage.stage_name}' no terminó a tiempo")
+        self._stages = []
+    
+    def _allow(self, action: str, packet: Optional[FramePacket] = None) -> bool:
+        if self.frame_budget is None:
+            return True
+        return self.frame_budget.allow(action, packet.deadline if packet else None)
+    
+    def _capture_stage(self, _) -> Optional[FramePacket]:
+        started = time.perf_counter()
         live_frame = self.camera.read()
         if live_frame is None:
+            if getattr(self.camera, 'exhausted', False):
+                # Fuente finita (replay de una sesion): se termina el loop
+                self.running = False
+                return None
             logger.warning("No se pudo capturar frame")
             time.sleep(0.01)
+            return None
+        capture_ts = clock.now()
+        
+        # El frame se lee igualmente para vaciar el buffer de la camara
+        if not self._allow(ACTION_CAPTURE):
+            return None
+        
+        packet = FramePacket(frame=live_frame, capture_ts=capture_ts, started=started)
+        if self.frame_budget:
+            packet.deadline = self.frame_budget.begin_frame()
+        return packet
+    
+    def _track_stage(self, packet: FramePacket) -> FramePacket:
+        if self.recorder:
+            self.recorder.record_frame(packet.frame, packet.capture_ts)
+        # El presupuesto solo se consulta cuando al tracker le toca redetectar
+        packet.faces = self.frame_processor.detect_faces(
+            packet.frame,
+            allow_redetect=(lambda: self._allow(ACTION_REDETECT, packet)) if self.frame_budget else True
+        )
+        return packet
+    
+    def _recognition_stage(self, packet: FramePacket) -> FramePacket:
+        with self._state_lock:
+            self._capture_ts = packet.capture_ts
+            self._check_tracker_reset()
+            
+            packet.mode = self.state.mode
+            if packet.mode == "register":
+                self._update_register_mode(packet)
+            else:
+                self._update_recognition_mode(packet)
+        return packet
+    
+    def _present(self, packet: FramePacket) -> bool:
+        if not self.headless and self._allow(ACTION_RENDER, packet):
+            start = time.perf_counter()
+            with self._state_lock:
+                context = self._build_context(packet.display_frame, packet.display_faces)
+            self.renderer.draw_preview_from_context(context)
+            elapsed = time.perf_counter() - start
+            self.metrics.record_timing("stage.render", elapsed)
+            if self.frame_budget:
+                self.frame_budget.observe_cost(ACTION_RENDER, elapsed)
+        
+        keep_running = self._poll_input(packet)
+        if self.frame_budget and packet.deadline:
+            self.frame_budget.end_frame(packet.deadline)
+        # Frame completo: desde la captura hasta aqui (en modo pipelined incluye la espera en colas)
+        self.metrics.record_timing("frame", time.perf_counter() - packet.started)
+        return keep_running
+    
+    def _poll_input(self, packet: FramePacket) -> bool:
+        return self._timed("input", self._read_input, packet)
+    
+    def _read_input(self, packet: FramePacket) -> bool:
+        with self._state_lock:
+            if not self._process_commands(packet):
+                return False
+        
+        if self.headless:
             return True
         
-        faces = self.frame_processor.detect_faces(live_frame)
+        key = cv2.waitKey(1) & 0xFF
+        with self._state_lock:
+            return self._handle_key(key, packet)
+    
+    def _process_commands(self, packet: FramePacket) -> bool:
+        if not self.control_server:
+            return True
         
-        if self.state.mode == "register":
-            return self._handle_register_mode(live_frame, faces)
-        else:
-            return self._handle_recognition_mode(live_frame, faces)
+        for command in self.control_server.pending():
+            try:
+                reply = self._execute_command(command, packet)
+            except Exception as e:
+                logger.error(f"Error ejecutando comando '{command.name}': {e}", exc_info=True)
+                reply = {"ok": False, "error": str(e)}
+            command.complete(reply)
+        
+        return not self.state.should_exit
+    
+    def _execute_command(self, command: ControlCommand, packet: FramePacket) -> Dict[str, Any]:
+        if command.name == "mode":
+            mode = command.args.get("mode")
+            if mode not in ("register", "recognize"):
+                return {"ok": False, "error": "mode debe ser 'register' o 'recognize'"}
+            # Mismo efecto que las teclas '1' y '2'
+            self.state.mode = mode
+            self.state.register_state = "idle"
+            self.state.selected_face_ids = []
+            self.state.current_name = ""
+            self.register_manager.clear_all()
+            logger.info(f"Modo cambiado a: {mode.upper()} (comando)")
+            return {"ok": True, "mode": mode}
+        
+        if command.name == "register":
+            # Por JSON o stdin el face_id puede llegar como texto ("3")
+            try:
+                face_id = int(command.args.get("face_id"))
+            except (TypeError, ValueError):
+                return {"ok": False, "error": f"face_id inválido: {command.args.get('face_id')!r}"}
+            name = str(command.args.get("name", "")).strip()
+            bbox = next((b for fid, _, b in packet.faces if fid == face_id), None)
+            if bbox is None or not name:
+                return {"ok": False, "error": f"cara {face_id} no visible o nombre vacío"}
+            self.state.face_to_send = (face_id, bbox, name)
+            # Sin pantalla no hay frame congelado que mirar: se usa el frame actual
+            sent = self._send_register_request(packet.frame, use_paused=False)
+            return {"ok": bool(sent), "face_id": face_id, "name": name}
+        
+        if command.name == "faces":
+            faces = []
+            for face_id, _, bbox in packet.faces:
+                identity = self.recognition_manager.identities.get(face_id)
+                faces.append({
+                    "face_id": face_id,
+                    "bbox": list(bbox),
+                    "name": identity.person_name if identity else None,
+                    "confidence": round(identity.confidence, 3) if identity else None
+                })
+            return {"ok": True, "faces": faces}
+        
+        if command.name == "status":
+            return {
+                "ok": True,
+                "mode": self.state.mode,
+                "fps": round(self.metrics.get_rolling_fps(), 1),
+                "fps_avg": round(self.metrics.get_fps(), 1),
+                "faces": len(packet.faces),
+                "register": self.register_client.get_health() if self.register_client else None,
+                "recognition": self.recognition_client.get_health() if self.recognition_client else None
+            }
+        
+        if command.name == "profile":
+            if not self.profiler:
+                return {"ok": False, "error": "perfilado desactivado (profiling.enabled)"}
+            return self.profiler.request(command.args.get("kind", "cprofile"), command.args.get("amount"))
+        
+        if command.name == "metrics":
+            return {"ok": True, "metrics": self.metrics.snapshot()}
+        
+        if command.name == "quit":
+            logger.info("Solicitud de salida (comando)")
+            self.state.should_exit = True
+            return {"ok": True}
+        
+        return {"ok": False, "error": f"comando desconocido: {command.name}"}
+    
+    def _handle_key(self, key: int, packet: FramePacket) -> bool:
+        if packet.mode == "register":
+            return self._process_input_register(key, packet.display_frame, packet.faces)
+        return self._process_input_recognition(key)
     
-    def _handle_register_mode(self, frame, faces) -> bool:
-        faces = self.register_manager.process_faces(faces)
+    def _check_tracker_reset(self):
+        generation = self.frame_processor.tracker_generation
+        if generation != self._tracker_generation:
+            # Los face_id se reutilizan tras el reset: ningun resultado pendiente es aplicable
+            self._tracker_generation = generation
+            self.request_tracker.invalidate_all()
+            logger.info("Tracker reseteado: requests pendientes invalidadas")
+    
+    def _update_register_mode(self, packet: FramePacket):
+        frame = packet.frame
+        self.best_shots.clear_all()
+        faces = self.register_manager.process_faces(packet.faces)
+        
+        self._collect_register_shots(faces)
         
         display_frame = frame
         display_faces = faces
@@ -102,66 +451,169 @@ class ApplicationOrchestrator:
         else:
             self.frame_manager.pause(frame, faces)
         
-        self._render_ui(display_frame, display_faces)
-        
-        return self._process_input_register(display_frame, faces)
+        packet.faces = faces
+        packet.display_frame = display_frame
+        packet.display_faces = display_faces
     
-    def _handle_recognition_mode(self, frame, faces) -> bool:
+    def _update_recognition_mode(self, packet: FramePacket):
+        frame, faces = packet.frame, packet.faces
         self.frame_manager.resume()
         self.register_manager.clear_all()
+        self.register_best_shots.clear_all()
         
         active_face_ids = [face_id for face_id, _, _ in faces]
         
         self.recognition_manager.refresh_active_faces(active_face_ids)
         
-        for face_id, _, bbox in faces:
-            if not self.recognition_manager.is_recognized(face_id):
+        for face_id, face_crop, bbox in faces:
+            if self.recognition_manager.is_stable(face_id):
+                self.recognition_manager.remember_appearance(face_id, face_crop)
+            elif not self.recognition_manager.is_recognized(face_id):
                 if self.recognition_manager.assign_identity_from_cache(face_id, bbox):
-                    pass
+                    continue
+                # Si la posicion no coincide, se intenta por apariencia antes de enviar al backend
+                other_ids = [fid for fid in active_face_ids if fid != face_id]
+                self.recognition_manager.assign_identity_from_appearance(face_id, face_crop, other_ids)
         
         self.recognition_manager.cleanup_not_visible(active_face_ids)
+        self.best_shots.cleanup(active_face_ids)
         
-        self._send_for_recognition(frame, faces)
-        self._receive_recognition_results()
-        
-        self._render_ui(frame, faces)
+        self._send_for_recognition(frame, faces, packet)
+        self._timed("receive", self._receive_recognition_results)
         
-        return self._process_input_recognition()
+        packet.display_frame = frame
+        packet.display_faces = faces
     
-    def _send_for_recognition(self, frame, faces):
+    def _send_for_recognition(self, frame, faces, packet: Optional[FramePacket] = None):
         if not self.recognition_client or not self.recognition_client.is_connected:
             return
         
-        for face_id, _, bbox in faces:
-            if not self.recognition_manager.is_recognized(face_id):
-                if self.recognition_manager.should_send(face_id):
-                    success = self.recognition_client.send_recognition_request(
-                        frame=frame,
-                        face_id=face_id,
-                        bbox=bbox
-                    )
-                    if success:
-                        self.recognition_manager.mark_sent(face_id)
-                        self.pending_bboxes[face_id] = bbox
-                        logger.debug(f"Cara {face_id} enviada para reconocimiento")
+        self._undo_failed_sends()
+        
+        to_send: List[Tuple[BatchFace, Tuple[int, int, int, int]]] = []
+        
+        for face_id, face_crop, bbox in faces:
+            if self.recognition_manager.is_stable(face_id):
+                continue
+            
+            self.best_shots.add_candidate(
+                face_id,
+                face_crop,
+                bbox,
+                self.frame_processor.get_detection_score(face_id)
+            )
+            
+            if not self.recognition_manager.should_send(face_id):
+                continue
+            if not self.best_shots.is_ready(face_id):
+                continue
+            
+            shot = self.best_shots.get_best(face_id)
+            if shot is None:
+                continue
+            
+            to_send.append((BatchFace(
+                face_id=face_id,
+                bbox=shot.bbox,
+                face_crop=shot.face_crop,
+                quality=shot.quality.total,
+                request_id=self.request_tracker.new_request_id()
+            ), bbox))
+        
+        if not to_send:
+            return
+        
+        # Sin tiempo en el frame: las mejores capturas se conservan y se envian en otro frame
+        if not self._allow(ACTION_SEND, packet):
+            return
+        send_start = time.perf_counter()
+        
+        if self.batch_requests and len(to_send) > 1:
+            sent_ids = set(self.recognition_client.send_recognition_batch(
+                frame=frame,
+                faces=[face for face, _ in to_send]
+            ))
+        else:
+            sent_ids = set()
+            for face, _ in to_send:
+                success = self.recognition_client.send_recognition_request(
+                    frame=frame,
+                    face_id=face.face_id,
+                    bbox=face.bbox,
+                    face_crop=face.face_crop,
+                    quality=face.quality,
+                    request_id=face.request_id
+                )
+                if success:
+                    sent_ids.add(face.face_id)
+        
+        send_elapsed = time.perf_counter() - send_start
+        self.metrics.record_timing("stage.recognize_send", send_elapsed)
+        if self.frame_budget:
+            self.frame_budget.observe_cost(ACTION_SEND, send_elapsed)
+        
+        for face, bbox in to_send:
+            if face.face_id in sent_ids:
+                self.recognition_manager.mark_sent(face.face_id)
+                self.best_shots.reset(face.face_id)
+                self.request_tracker.register(face.request_id, face.face_id, bbox, self._capture_ts)
+                if self.recorder:
+                    self.recorder.record_request(face.face_id, face.request_id, bbox, face.quality)
+                logger.debug(f"Cara {face.face_id} enviada para reconocimiento (calidad {face.quality:.2f})")
+    
+    def _undo_failed_sends(self):
+        # Envios que el cliente descarto o no pudo hacer: fuera de pendientes y, si la
+        # cara no tiene otra request en curso (p.ej. la que la reemplazo en la cola de
+        # control de flujo), se puede volver a enviar en este mismo frame
+        for face_id, request_id in self.recognition_client.take_failed_requests():
+            if request_id:
+                self.request_tracker.cancel(request_id)
+            if not self.request_tracker.has_pending(face_id):
+                self.recognition_manager.mark_send_failed(face_id)
+                logger.debug(f"Envío de la cara {face_id} no realizado, se reintentará")
+    
+    def _collect_register_shots(self, faces):
+        locked_ids = self.register_manager.get_locked_ids()
+        if not locked_ids:
+            return
+        
+        for face_id, face_crop, bbox in faces:
+            if face_id in locked_ids:
+                self.register_best_shots.add_candidate(
+                    face_id,
+                    face_crop,
+                    bbox,
+                    self.frame_processor.get_detection_score(face_id)
+                )
     
     def _receive_recognition_results(self):
         if not self.recognition_client or not self.recognition_client.is_connected:
             return
         
-        result = self.recognition_client.receive_result()
-        if result:
-            bbox = self.pending_bboxes.pop(result.face_id, None)
-            self.recognition_manager.update_identity(
-                face_id=result.face_id,
-                person_id=result.person_id,
-                person_name=result.person_name,
-                confidence=result.confidence,
-                bbox=bbox
-            )
+        self.request_tracker.expire()
+        
+        results = self.recognition_client.drain_results()
+        if not results:
+            return
+        
+        # Solo se aplican resultados de requests aun pendientes (ni tardios ni huerfanos)
+        accepted = []
+        bboxes: Dict[int, Tuple[int, int, int, int]] = {}
+        for result in results:
+            if self.recorder:
+                self.recorder.record_result(result)
+            entry = self.request_tracker.resolve(result)
+            if entry is None:
+                continue
+            result.face_id = entry.face_id
+            bboxes[entry.face_id] = entry.bbox
+            accepted.append(result)
+        
+        if accepted:
+            self.recognition_manager.apply_results(accepted, bboxes)
     
-    def _render_ui(self, frame, faces):
-        context = RenderContext.from_state(
+    def _build_context(self, frame, faces) -> RenderContext:
+        return RenderContext.from_state(
             frame=frame,
             faces=faces,
             app_state=self.state,
@@ -170,11 +622,8 @@ class ApplicationOrchestrator:
             register_client=self.register_client,
             recognition_client=self.recognition_client
         )
-        self.renderer.draw_preview_from_context(context)
     
-    def _process_input_register(self, frame, faces) -> bool:
-        key = cv2.waitKey(1) & 0xFF
-        
+    def _process_input_register(self, key: int, frame, faces) -> bool:
         if key == 255:
             return True
         
@@ -193,9 +642,7 @@ class ApplicationOrchestrator:
         
         return True
     
-    def _process_input_recognition(self) -> bool:
-        key = cv2.waitKey(1) & 0xFF
-        
+    def _process_input_recognition(self, key: int) -> bool:
         if key == 255:
             return True
         
@@ -211,23 +658,42 @@ class ApplicationOrchestrator:
         
         return True
     
-    def _send_register_request(self, frame):
+    def _send_register_request(self, frame, use_paused: bool = True) -> bool:
         if not self.register_client or not self.register_client.is_connected:
             logger.warning("RegisterClient no disponible")
-            return
+            return False
         
         face_id, bbox, person_name = self.state.face_to_send
         
-        paused_frame = self.frame_manager.paused_frame
+        paused_frame = self.frame_manager.paused_frame if use_paused else None
         if paused_frame is None:
             paused_frame = frame
         
+        # Se compara el crop del frame pausado con la mejor captura reciente de la misma cara
+        x, y, w, h = bbox
+        face_crop = paused_frame[y:y+h, x:x+w]
+        # Con la puntuacion real del detector, como las capturas de register_best_shots
+        quality = self.quality_scorer.score(
+            face_crop,
+            detection_score=self.frame_processor.get_detection_score(face_id)
+        )
+        
+        shot = self.register_best_shots.get_best(face_id)
+        if shot and (quality is None or shot.quality.total > quality.total):
+            face_crop = shot.face_crop
+            quality = shot.quality
+            logger.debug(f"Registro de Face {face_id} usando mejor captura reciente")
+        
         success = self.register_client.send_register_request(
             frame=paused_frame,
             face_id=face_id,
             bbox=bbox,
-            person_name=person_name
+            person_name=person_name,
+            face_crop=face_crop,
+            quality=quality.total if quality else None
         )
         
         if success:
+            self.register_best_shots.reset(face_id)
             logger.info(f"Registro enviado: Face {face_id} = '{person_name}'")
+        return success
@@ -0,0 +1,152 @@
+import cv2
+import logging
+from typing import Dict, Optional, Iterable
+from dataclasses import dataclass
+
+import numpy as np
+
+from core import clock
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AppearanceEntry:
+    person_id: str
+    person_name: str
+    confidence: float
+    descriptor: np.ndarray
+    timestamp: float
+
+# AppearanceCache guarda un descriptor de apariencia (histograma HSV) de los tracks
+# identificados recientemente, para reasignar la identidad a un track nuevo
+# sin pasar por el backend C++
+class AppearanceCache:
+
+    H_BINS = 16
+    S_BINS = 8
+    # Se descarta el borde del crop, que suele contener fondo
+    INNER_MARGIN = 0.15
+
+    def __init__(
+        self,
+        match_threshold: float = 0.3,
+        min_margin: float = 0.05,
+        cache_timeout: float = 30.0,
+        update_interval: float = 0.5,
+        max_entries: int = 64
+    ):
+        self.match_threshold = match_threshold
+        self.min_margin = min_margin
+        self.cache_timeout = cache_timeout
+        self.update_interval = update_interval
+        self.max_entries = max_entries
+
+        self.entries: Dict[int, AppearanceEntry] = {}
+
+    def compute_descriptor(self, face_crop) -> Optional[np.ndarray]:
+        if face_crop is None or face_crop.size == 0 or face_crop.ndim != 3:
+            return None
+
+        h, w = face_crop.shape[:2]
+        my = int(h * self.INNER_MARGIN)
+        mx = int(w * self.INNER_MARGIN)
+        inner = face_crop[my:h - my, mx:w - mx]
+        if inner.size == 0:
+            inner = face_crop
+
+        hsv = cv2.cvtColor(inner, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [self.H_BINS, self.S_BINS], [0, 180, 0, 256])
+        hist = hist.ravel()
+
+        total = float(hist.sum())
+        if total <= 0:
+            return None
+
+        # Raiz del histograma normalizado: el producto punto da el coeficiente de Bhattacharyya
+        return np.sqrt(hist / total).astype(np.float32)
+
+    def remember(
+        self,
+        face_id: int,
+        face_crop,
+        person_id: str,
+        person_name: str,
+        confidence: float
+    ) -> bool:
+        now = clock.now()
+        entry = self.entries.get(face_id)
+        if entry and entry.person_id == person_id and now - entry.timestamp < self.update_interval:
+            return False
+
+        descriptor = self.compute_descriptor(face_crop)
+        if descriptor is None:
+            return False
+
+        self.entries[face_id] = AppearanceEntry(
+            person_id=person_id,
+            person_name=person_name,
+            confidence=confidence,
+            descriptor=descriptor,
+            timestamp=now
+        )
+
+        if len(self.entries) > self.max_entries:
+            oldest = min(self.entries, key=lambda fid: self.entries[fid].timestamp)
+            del self.entries[oldest]
+
+        return True
+
+    def match(self, face_crop, exclude_ids: Iterable[int] = ()) -> Optional[AppearanceEntry]:
+        self.cleanup()
+        if not self.entries:
+            return None
+
+        excluded = set(exclude_ids)
+        candidates = [
+            entry for face_id, entry in self.entries.items()
+            if face_id not in excluded
+        ]
+        if not candidates:
+            return None
+
+        query = self.compute_descriptor(face_crop)
+        if query is None:
+            return None
+
+        descriptors = np.stack([entry.descriptor for entry in candidates])
+        # Distancia de Hellinger contra todas las entradas en una sola operacion
+        distances = np.sqrt(np.clip(1.0 - descriptors @ query, 0.0, 1.0))
+
+        order = np.argsort(distances)
+        best = int(order[0])
+        best_distance = float(distances[best])
+        if best_distance > self.match_threshold:
+            return None
+
+        # Se exige margen frente al mejor candidato de otra persona para evitar confusiones.
+        # Sin otra persona el rival es el propio umbral: con una sola identidad en cache
+        # tambien hay que quedar claramente por debajo de match_threshold
+        rival = self.match_threshold
+        for idx in order[1:]:
+            other = candidates[int(idx)]
+            if other.person_id != candidates[best].person_id:
+                rival = min(rival, float(distances[idx]))
+                break
+        if rival - best_distance < self.min_margin:
+            logger.debug(f"Re-ID ambiguo ({best_distance:.2f} vs {rival:.2f}), ignorando")
+            return None
+
+        logger.debug(f"Re-ID por apariencia: {candidates[best].person_name} (distancia {best_distance:.2f})")
+        return candidates[best]
+
+    def cleanup(self):
+        now = clock.now()
+        expired = [
+            face_id for face_id, entry in self.entries.items()
+            if now - entry.timestamp > self.cache_timeout
+        ]
+        for face_id in expired:
+            del self.entries[face_id]
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,117 @@
+import logging
+from typing import Dict, List, Optional, Tuple, Any
+from dataclasses import dataclass
+
+from core import clock
+from core.face_quality import FaceQualityScorer, QualityScore
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BestShotCandidate:
+    face_crop: Any
+    bbox: Tuple[int, int, int, int]
+    quality: QualityScore
+    timestamp: float
+
+@dataclass
+class ShotBuffer:
+    first_seen: float
+    frames_seen: int
+    best: Optional[BestShotCandidate] = None
+
+# BestShotManager mantiene, por track, el mejor crop visto en una ventana corta
+# para enviar solo ese al backend en lugar del crop del frame actual
+class BestShotManager:
+    def __init__(
+        self,
+        scorer: Optional[FaceQualityScorer] = None,
+        window: float = 0.5,
+        min_candidates: int = 3,
+        min_quality: float = 0.0,
+        max_wait: float = 2.0,
+        candidate_ttl: float = 2.0
+    ):
+        self.scorer = scorer or FaceQualityScorer()
+        self.window = window
+        self.min_candidates = min_candidates
+        self.min_quality = min_quality
+        self.max_wait = max_wait
+        self.candidate_ttl = candidate_ttl
+
+        self.buffers: Dict[int, ShotBuffer] = {}
+
+    def add_candidate(
+        self,
+        face_id: int,
+        face_crop,
+        bbox: Tuple[int, int, int, int],
+        detection_score: float = 1.0
+    ) -> Optional[QualityScore]:
+        quality = self.scorer.score(face_crop, detection_score)
+        if quality is None:
+            return None
+
+        now = clock.now()
+        buffer = self.buffers.get(face_id)
+        if buffer is None:
+            buffer = ShotBuffer(first_seen=now, frames_seen=0)
+            self.buffers[face_id] = buffer
+
+        buffer.frames_seen += 1
+
+        best = buffer.best
+        if (
+            best is None
+            or quality.total > best.quality.total
+            or now - best.timestamp > self.candidate_ttl
+        ):
+            # Solo se copia el crop cuando mejora al actual (el crop es una vista del frame)
+            buffer.best = BestShotCandidate(
+                face_crop=face_crop.copy(),
+                bbox=bbox,
+                quality=quality,
+                timestamp=now
+            )
+
+        return quality
+
+    def is_ready(self, face_id: int) -> bool:
+        buffer = self.buffers.get(face_id)
+        if buffer is None or buffer.best is None:
+            return False
+
+        elapsed = clock.now() - buffer.first_seen
+        if buffer.frames_seen < self.min_candidates and elapsed < self.window:
+            return False
+
+        if buffer.best.quality.total < self.min_quality and elapsed < self.max_wait:
+            return False
+
+        return True
+
+    def get_best(self, face_id: int) -> Optional[BestShotCandidate]:
+        buffer = self.buffers.get(face_id)
+        if buffer is None:
+            return None
+
+        best = buffer.best
+        if best and clock.now() - best.timestamp > self.candidate_ttl:
+            return None
+        return best
+
+    def reset(self, face_id: int):
+        if face_id in self.buffers:
+            del self.buffers[face_id]
+
+    def cleanup(self, active_face_ids: List[int]):
+        to_remove = [
+            face_id for face_id in self.buffers.keys()
+            if face_id not in active_face_ids
+        ]
+        for face_id in to_remove:
+            del self.buffers[face_id]
+
+    def clear_all(self):
+        self.buffers.clear()
+        logger.debug("Buffers de mejor captura limpiados")
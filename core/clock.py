@@ -0,0 +1,33 @@
+import time
+from typing import Callable
+
+# Fuente de tiempo de la logica de tracking y reconocimiento. En ejecucion normal
+# es time.time; el replay de sesiones la sustituye por el reloj de la grabacion
+# para que intervalos, timeouts y ventanas se evaluen igual que en la sesion original.
+_source: Callable[[], float] = time.time
+
+
+def now() -> float:
+    return _source()
+
+
+def set_source(source: Callable[[], float]):
+    global _source
+    _source = source
+
+
+def reset():
+    set_source(time.time)
+
+
+class ManualClock:
+    # Reloj que solo avanza cuando se le indica (p.ej. al timestamp de cada frame grabado)
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def set(self, timestamp: float):
+        self.current = timestamp
+
+    def __call__(self) -> float:
+        return self.current
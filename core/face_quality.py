@@ -0,0 +1,98 @@
+import cv2
+import logging
+from typing import Optional, Dict
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class QualityScore:
+    sharpness: float
+    size: float
+    brightness: float
+    frontality: float
+    detection: float
+    total: float
+
+# FaceQualityScorer puntua un crop de cara con metricas baratas (todas en [0, 1])
+# para decidir que crop vale la pena enviar al backend C++
+class FaceQualityScorer:
+
+    ANALYSIS_SIZE = (64, 64)
+
+    DEFAULT_WEIGHTS = {
+        'sharpness': 0.35,
+        'size': 0.25,
+        'brightness': 0.15,
+        'frontality': 0.10,
+        'detection': 0.15
+    }
+
+    def __init__(
+        self,
+        sharpness_reference: float = 150.0,
+        min_face_size: int = 40,
+        ideal_face_size: int = 112,
+        target_brightness: float = 128.0,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.sharpness_reference = sharpness_reference
+        self.min_face_size = min_face_size
+        self.ideal_face_size = max(ideal_face_size, min_face_size + 1)
+        self.target_brightness = target_brightness
+
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        if weights:
+            self.weights.update(weights)
+        self._weight_sum = sum(self.weights.values()) or 1.0
+
+    def score(self, face_crop, detection_score: float = 1.0) -> Optional[QualityScore]:
+        if face_crop is None or face_crop.size == 0:
+            return None
+
+        h, w = face_crop.shape[:2]
+
+        if face_crop.ndim == 3:
+            gray = cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = face_crop
+
+        # Se analiza a tamaño fijo: el coste no depende del tamaño de la cara
+        small = cv2.resize(gray, self.ANALYSIS_SIZE, interpolation=cv2.INTER_AREA)
+
+        laplacian_var = float(cv2.Laplacian(small, cv2.CV_64F).var())
+        sharpness = min(1.0, laplacian_var / self.sharpness_reference)
+
+        side = min(w, h)
+        if side < self.min_face_size:
+            size = 0.0
+        else:
+            size = min(1.0, (side - self.min_face_size) / (self.ideal_face_size - self.min_face_size))
+
+        mean_brightness = float(small.mean())
+        brightness = max(0.0, 1.0 - abs(mean_brightness - self.target_brightness) / self.target_brightness)
+
+        # Una cara frontal es aproximadamente simetrica respecto al eje vertical
+        asymmetry = float(np.abs(small.astype(np.int16) - small[:, ::-1].astype(np.int16)).mean())
+        frontality = max(0.0, 1.0 - asymmetry / 64.0)
+
+        detection = min(1.0, max(0.0, float(detection_score)))
+
+        total = (
+            self.weights['sharpness'] * sharpness
+            + self.weights['size'] * size
+            + self.weights['brightness'] * brightness
+            + self.weights['frontality'] * frontality
+            + self.weights['detection'] * detection
+        ) / self._weight_sum
+
+        return QualityScore(
+            sharpness=sharpness,
+            size=size,
+            brightness=brightness,
+            frontality=frontality,
+            detection=detection,
+            total=total
+        )
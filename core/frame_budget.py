@@ -0,0 +1,147 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ACTION_RENDER = "render"
+ACTION_SEND = "send"
+ACTION_REDETECT = "redetect"
+ACTION_CAPTURE = "capture"
+
+# Orden de degradacion: en el nivel N se recortan las N primeras acciones
+DEGRADATION_LADDER = (ACTION_RENDER, ACTION_SEND, ACTION_REDETECT, ACTION_CAPTURE)
+
+
+@dataclass
+class FrameDeadline:
+    start: float
+    budget: float
+
+    def elapsed(self) -> float:
+        return time.time() - self.start
+
+    def remaining(self) -> float:
+        return self.budget - self.elapsed()
+
+# FrameBudget fija un presupuesto de tiempo por frame (desde la captura hasta que
+# se muestra) y un nivel de degradacion segun la latencia media reciente. Al
+# subir de nivel se recorta, en este orden: el render, los envios a reconocimiento,
+# la re-deteccion y por ultimo frames de captura. Render y envios solo se saltan
+# si al frame no le queda tiempo para ellos; ninguna accion se salta mas de
+# `max_starvation` segundos seguidos, para que la UI y los tracks no se congelen.
+class FrameBudget:
+
+    def __init__(
+        self,
+        budget_ms: float = 33.0,
+        escalate_after: int = 5,
+        recover_after: int = 30,
+        recover_ratio: float = 0.7,
+        max_starvation: float = 1.0,
+        metrics=None
+    ):
+        self.budget = budget_ms / 1000.0
+        self.escalate_after = escalate_after
+        self.recover_after = recover_after
+        self.recover_ratio = recover_ratio
+        self.max_starvation = max_starvation
+        self.metrics = metrics
+
+        self.level = 0
+        self.frame_time = 0.0
+        self._over = 0
+        self._under = 0
+        self._last_overrun = False
+
+        # Coste reciente (EWMA) de las acciones que se deciden por tiempo restante
+        self.costs: Dict[str, float] = {ACTION_RENDER: 0.0, ACTION_SEND: 0.0}
+        self._last_allowed: Dict[str, float] = {action: time.time() for action in DEGRADATION_LADDER}
+        self.skipped: Dict[str, int] = {action: 0 for action in DEGRADATION_LADDER}
+        self.overruns = 0
+        self.frames = 0
+
+    def begin_frame(self, start: Optional[float] = None) -> FrameDeadline:
+        return FrameDeadline(start=start or time.time(), budget=self.budget)
+
+    def observe_cost(self, action: str, seconds: float, alpha: float = 0.2):
+        if action in self.costs:
+            previous = self.costs[action]
+            self.costs[action] = seconds if previous == 0.0 else (1 - alpha) * previous + alpha * seconds
+
+    def allow(self, action: str, deadline: Optional[FrameDeadline] = None) -> bool:
+        now = time.time()
+        if self.level <= DEGRADATION_LADDER.index(action):
+            self._last_allowed[action] = now
+            return True
+
+        if now - self._last_allowed[action] >= self.max_starvation:
+            allowed = True
+        elif action == ACTION_CAPTURE:
+            # Tras un frame fuera de plazo se descarta el siguiente para recuperar terreno
+            allowed = not self._last_overrun
+            self._last_overrun = False
+        elif action in self.costs and deadline is not None:
+            allowed = deadline.remaining() > self.costs[action]
+        else:
+            allowed = False
+
+        if allowed:
+            self._last_allowed[action] = now
+        else:
+            self.skipped[action] += 1
+            if self.metrics:
+                self.metrics.increment(f"degrade.skip_{action}")
+        return allowed
+
+    def end_frame(self, deadline: FrameDeadline, alpha: float = 0.1):
+        elapsed = deadline.elapsed()
+        self.frames += 1
+        self.frame_time = elapsed if self.frames == 1 else (1 - alpha) * self.frame_time + alpha * elapsed
+        self._last_overrun = elapsed > self.budget
+        if self._last_overrun:
+            self.overruns += 1
+
+        if self.frame_time > self.budget:
+            self._over += 1
+            self._under = 0
+        elif self.frame_time < self.budget * self.recover_ratio:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.escalate_after and self.level < len(DEGRADATION_LADDER):
+            self._set_level(self.level + 1)
+        elif self._under >= self.recover_after and self.level > 0:
+            self._set_level(self.level - 1)
+
+        if self.metrics:
+            self.metrics.set_gauge("frame_budget.level", self.level)
+            self.metrics.record_timing("frame_budget.latency", elapsed)
+
+    def _set_level(self, level: int):
+        previous = self.level
+        self.level = level
+        self._over = self._under = 0
+        action = DEGRADATION_LADDER[max(previous, level) - 1]
+        if level > previous:
+            logger.warning(
+                f"[BUDGET] Latencia {self.frame_time * 1000:.1f} ms > {self.budget * 1000:.0f} ms: "
+                f"nivel {previous} -> {level} (se recorta {action})"
+            )
+        else:
+            logger.info(f"[BUDGET] Latencia recuperada: nivel {previous} -> {level} (se restablece {action})")
+        if self.metrics:
+            self.metrics.increment("degrade.escalations" if level > previous else "degrade.recoveries")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": round(self.budget * 1000, 1),
+            "level": self.level,
+            "frame_time_ms": round(self.frame_time * 1000, 1),
+            "frames": self.frames,
+            "overruns": self.overruns,
+            "skipped": dict(self.skipped)
+        }
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Union, Callable
 
 logger = logging.getLogger(__name__)
 
@@ -8,9 +8,24 @@ class FrameProcessor:
         self.tracker = tracker
         self.detector = detector
     
-    def detect_faces(self, frame) -> List[Tuple[int, Any, Tuple[int, int, int, int]]]:
+    def detect_faces(
+        self,
+        frame,
+        allow_redetect: Union[bool, Callable[[], bool]] = True
+    ) -> List[Tuple[int, Any, Tuple[int, int, int, int]]]:
+        if allow_redetect is not True:
+            return self.tracker.process(frame, self.detector, allow_redetect=allow_redetect)
         return self.tracker.process(frame, self.detector)
     
+    def get_detection_score(self, face_id: int) -> float:
+        if hasattr(self.tracker, 'get_score'):
+            return self.tracker.get_score(face_id)
+        return 1.0
+    
+    @property
+    def tracker_generation(self) -> int:
+        return getattr(self.tracker, 'generation', 0)
+    
     def reset_tracker(self):
         self.tracker.reset()
         logger.debug("Tracker reseteado")
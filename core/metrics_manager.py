@@ -1,36 +1,141 @@
+import os
+import re
+import json
 import time
 import logging
-from typing import Optional
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any
+
+from communication.request_tracker import LatencyHistogram
 
 logger = logging.getLogger(__name__)
 
+# Cubetas (ms) de los histogramas de etapas: mas finas que las de RequestTracker,
+# porque la mayoria de etapas del loop duran de decimas de ms a pocas decenas
+STAGE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 25, 33, 50, 75, 100, 150, 250, 500, 1000, 2500)
+
+PROMETHEUS_PREFIX = "facerec"
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
 
+@dataclass
+class TimingStat:
+    count: int = 0
+    total: float = 0.0
+    last: float = 0.0
+    ewma: float = 0.0
+    max: float = 0.0
+    histogram: LatencyHistogram = field(default_factory=lambda: LatencyHistogram(STAGE_BUCKETS_MS))
+    
+    def observe(self, seconds: float, alpha: float = 0.1):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.ewma = seconds if self.count == 1 else (1 - alpha) * self.ewma + alpha * seconds
+        self.max = max(self.max, seconds)
+        self.histogram.observe(seconds * 1000)
+
+
+# Registro de metricas del proceso: contadores, gauges e histogramas de latencia
+# por etapa (stage.capture, stage.detect, stage.track, stage.recognize_send,
+# stage.receive, stage.render, stage.input y frame, el frame completo). Se exporta
+# en texto Prometheus (core.metrics_server) y como instantanea JSON.
 class MetricsManager:
-    def __init__(self, log_interval: int = 30):
+    def __init__(
+        self,
+        log_interval: int = 30,
+        fps_window: float = 5.0,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 10.0
+    ):
         self.log_interval = log_interval
         self.frame_count = 0
         self.start_time: Optional[float] = None
+        
+        # FPS en ventana deslizante: instantes de los frames de los ultimos fps_window segundos
+        self.fps_window = fps_window
+        self._frame_times: deque = deque()
+        
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._last_snapshot = 0.0
+        
+        # Tiempos por etapa y profundidad de colas; se escriben desde varios hilos
+        self._lock = threading.Lock()
+        self.timings: Dict[str, TimingStat] = {}
+        self.gauges: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
     
     def start(self):
         self.frame_count = 0
         self.start_time = time.time()
+        with self._lock:
+            self._frame_times.clear()
         logger.debug("Métricas iniciadas")
     
     def increment_frame(self):
         self.frame_count += 1
+        now = time.time()
+        with self._lock:
+            self._frame_times.append(now)
+            self._prune_frame_times(now)
         
         # Loggear periódicamente
         if self.frame_count % self.log_interval == 0:
             self._log_metrics()
+        
+        if self.snapshot_path and now - self._last_snapshot >= self.snapshot_interval:
+            self.dump_json()
+    
+    def _prune_frame_times(self, now: float):
+        while self._frame_times and now - self._frame_times[0] > self.fps_window:
+            self._frame_times.popleft()
+    
+    def record_timing(self, name: str, seconds: float):
+        with self._lock:
+            stat = self.timings.get(name)
+            if stat is None:
+                stat = self.timings[name] = TimingStat()
+            stat.observe(seconds)
+    
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+    
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
     
     def _log_metrics(self):
         if not self.start_time:
             return
         
-        elapsed = time.time() - self.start_time
-        if elapsed > 0:
-            fps = self.frame_count / elapsed
-            logger.debug(f"FPS: {fps:.1f} | Frames: {self.frame_count}")
+        with self._lock:
+            frame = self.timings.get("frame")
+            frame_p95 = frame.histogram.percentile(95) if frame else None
+        logger.info(
+            f"FPS: {self.get_rolling_fps():.1f} (media {self.get_fps():.1f}) | Frames: {self.frame_count}"
+            + (f" | Frame p95: {frame_p95:.1f} ms" if frame_p95 is not None else "")
+        )
+        
+        with self._lock:
+            stages = " | ".join(
+                f"{name}: {stat.ewma * 1000:.1f} ms (p95 {stat.histogram.percentile(95):.1f}, max {stat.max * 1000:.1f})"
+                for name, stat in sorted(self.timings.items())
+            )
+            gauges = " | ".join(f"{name}: {value:g}" for name, value in sorted(self.gauges.items()))
+            counters = " | ".join(f"{name}: {value}" for name, value in sorted(self.counters.items()))
+        if stages:
+            logger.debug(f"Etapas: {stages}")
+        if gauges:
+            logger.debug(f"Colas: {gauges}")
+        if counters:
+            logger.debug(f"Contadores: {counters}")
     
     def get_fps(self) -> float:
         if not self.start_time:
@@ -39,6 +144,142 @@ class MetricsManager:
         elapsed = time.time() - self.start_time
         return self.frame_count / elapsed if elapsed > 0 else 0.0
     
+    def get_rolling_fps(self) -> float:
+        if not self.start_time:
+            return 0.0
+        
+        now = time.time()
+        with self._lock:
+            self._prune_frame_times(now)
+            frames = len(self._frame_times)
+        # Al arrancar la ventana aun no esta llena
+        span = min(self.fps_window, now - self.start_time)
+        return frames / span if span > 0 else 0.0
+    
+    def get_stage_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "timings_ms": {
+                    name: {
+                        "count": stat.count,
+                        "mean": round(stat.total / stat.count * 1000, 2) if stat.count else None,
+                        "ewma": round(stat.ewma * 1000, 2),
+                        "p50": self._round(stat.histogram.percentile(50)),
+                        "p95": self._round(stat.histogram.percentile(95)),
+                        "p99": self._round(stat.histogram.percentile(99)),
+                        "max": round(stat.max * 1000, 2)
+                    }
+                    for name, stat in self.timings.items()
+                },
+                "gauges": dict(self.gauges),
+                "counters": dict(self.counters)
+            }
+    
+    @staticmethod
+    def _round(value: Optional[float]) -> Optional[float]:
+        return round(value, 2) if value is not None else None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = {
+            "timestamp": time.time(),
+            "uptime": round(time.time() - self.start_time, 1) if self.start_time else 0.0,
+            "frames": self.frame_count,
+            "fps": round(self.get_rolling_fps(), 2),
+            "fps_avg": round(self.get_fps(), 2)
+        }
+        snapshot.update(self.get_stage_stats())
+        return snapshot
+    
+    def dump_json(self, path: Optional[str] = None):
+        path = path or self.snapshot_path
+        if not path:
+            return
+        self._last_snapshot = time.time()
+        # Escritura atomica: quien lea el fichero nunca ve una instantanea a medias
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir el snapshot de métricas en {path}: {e}")
+    
+    def render_prometheus(self) -> str:
+        prefix = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {prefix}_frames_total Frames procesados",
+            f"# TYPE {prefix}_frames_total counter",
+            f"{prefix}_frames_total {self.frame_count}",
+            f"# HELP {prefix}_fps FPS en la ventana deslizante",
+            f"# TYPE {prefix}_fps gauge",
+            f"{prefix}_fps {self.get_rolling_fps():.3f}",
+        ]
+        
+        with self._lock:
+            if self.timings:
+                lines.append(f"# HELP {prefix}_latency_seconds Latencia por etapa")
+                lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+            for name, stat in sorted(self.timings.items()):
+                label = f'name="{name}"'
+                cumulative = 0
+                for bound, count in zip(stat.histogram.buckets_ms, stat.histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{prefix}_latency_seconds_bucket{{{label},le="+Inf"}} {stat.count}')
+                lines.append(f'{prefix}_latency_seconds_sum{{{label}}} {stat.total:.6f}')
+                lines.append(f'{prefix}_latency_seconds_count{{{label}}} {stat.count}')
+            
+            for name, value in sorted(self.gauges.items()):
+                metric = f"{prefix}_{_metric_name(name)}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value:g}")
+            
+            for name, value in sorted(self.counters.items()):
+                metric = f"{prefix}_{_metric_name(name)}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        
+        return "\n".join(lines) + "\n"
+    
     def reset(self):
         self.frame_count = 0
-        self.start_time = time.time()
\ No newline at end of file
+        self.start_time = time.time()
+        with self._lock:
+            self._frame_times.clear()
+            self.timings.clear()
+            self.gauges.clear()
+            self.counters.clear()
+
+
+# Envuelve al detector para medir su tiempo como etapa "stage.detect" (incluida en
+# "stage.track"). Con DetectorPool se mide lo que paga el loop al enviar y recoger
+# detecciones, no la inferencia de los workers.
+class TimedDetector:
+    
+    def __init__(self, detector, metrics: MetricsManager, name: str = "stage.detect"):
+        self.detector = detector
+        self.metrics = metrics
+        self.name = name
+        self.is_async = getattr(detector, "is_async", False)
+    
+    def _timed(self, work, *args):
+        start = time.perf_counter()
+        try:
+            return work(*args)
+        finally:
+            self.metrics.record_timing(self.name, time.perf_counter() - start)
+    
+    def detect_with_scores(self, frame):
+        return self._timed(self.detector.detect_with_scores, frame)
+    
+    def detect(self, frame):
+        return self._timed(self.detector.detect, frame)
+    
+    def submit(self, frame, source: str = "default"):
+        return self._timed(self.detector.submit, frame, source)
+    
+    def poll(self, job_id: int):
+        return self._timed(self.detector.poll, job_id)
+    
+    def __getattr__(self, name):
+        return getattr(self.detector, name)
@@ -0,0 +1,69 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from core.metrics_manager import MetricsManager
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Servidor HTTP local de metricas, en un hilo aparte del loop:
+#   GET /metrics       texto Prometheus (histogramas, gauges y contadores)
+#   GET /metrics.json  instantanea JSON (MetricsManager.snapshot)
+class MetricsHTTPServer:
+
+    def __init__(self, metrics: MetricsManager, host: str = "127.0.0.1", port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _make_handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = metrics.render_prometheus().encode("utf-8")
+                    content_type = PROMETHEUS_CONTENT_TYPE
+                elif path == "/metrics.json":
+                    body = json.dumps(metrics.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"[METRICS] {self.address_string()} {format % args}")
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        # Puerto real (port=0 elige uno libre)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        logger.info(f"Métricas en http://{self.host}:{self.port}/metrics")
+
+    def close(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+import pstats
+import signal
+import logging
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sized
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLE = "sample"
+PROFILE_MEMORY = "memory"
+PROFILE_KINDS = (PROFILE_CPROFILE, PROFILE_SAMPLE, PROFILE_MEMORY)
+
+# Senal -> perfil que dispara (solo en sistemas con SIGUSR1/SIGUSR2)
+DEFAULT_SIGNALS = {"SIGUSR1": PROFILE_CPROFILE, "SIGUSR2": PROFILE_SAMPLE}
+
+
+# ProfilerHooks permite perfilar el proceso en marcha sin reiniciarlo. Se dispara
+# por senal (kill -USR1 <pid>) o por el socket de control ("profile cprofile 300"):
+#   cprofile  cProfile de los proximos N frames del hilo del loop (.prof + resumen .txt)
+#   sample    muestreo periodico de las pilas de todos los hilos durante S segundos
+#             (.folded, formato de flamegraph, + funciones mas vistas .txt)
+#   memory    snapshot de tracemalloc; desde el segundo, diff contra el anterior y
+#             tamano de los contenedores vigilados (watch) para localizar fugas
+# Los resultados van a output_dir con marca de tiempo. Desactivado solo cuesta una
+# comprobacion por frame en on_frame(). El handler de senal solo anota la peticion
+# (no toma locks); el trabajo se hace en on_frame(), en el hilo del loop.
+class ProfilerHooks:
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        cprofile_frames: int = 300,
+        sample_interval: float = 0.005,
+        sample_seconds: float = 10.0,
+        memory_top: int = 30,
+        memory_frames: int = 25
+    ):
+        self.output_dir = output_dir
+        self.cprofile_frames = cprofile_frames
+        self.sample_interval = sample_interval
+        self.sample_seconds = sample_seconds
+        self.memory_top = memory_top
+        self.memory_frames = memory_frames
+
+        self._requests: List[tuple] = []
+        self._profile: Optional[cProfile.Profile] = None
+        self._profile_left = 0
+        self._profile_started = 0.0
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+        self._memory_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._watch: Dict[str, Callable[[], Sized]] = {}
+        self._watch_sizes: Dict[str, int] = {}
+        self.outputs: List[str] = []
+
+    def install_signal_handlers(self, signals: Optional[Dict[str, str]] = None) -> List[str]:
+        installed = []
+        for signal_name, kind in (signals or DEFAULT_SIGNALS).items():
+            signum = getattr(signal, signal_name, None)
+            if signum is None or kind not in PROFILE_KINDS:
+                continue
+            try:
+                signal.signal(signum, lambda *_, kind=kind: self._requests.append((kind, None)))
+                installed.append(f"{signal_name}={kind}")
+            except ValueError:
+                # signal.signal solo funciona desde el hilo principal
+                logger.warning(f"No se pudo instalar el handler de {signal_name}")
+        if installed:
+            logger.info(f"Perfilado bajo demanda (pid {os.getpid()}): {', '.join(installed)}")
+        return installed
+
+    def request(self, kind: str, amount: Optional[float] = None) -> Dict[str, Any]:
+        if kind not in PROFILE_KINDS:
+            return {"ok": False, "error": f"perfil desconocido: {kind} ({', '.join(PROFILE_KINDS)})"}
+        if kind == PROFILE_CPROFILE and self._profile is not None:
+            return {"ok": False, "error": f"cProfile en curso ({self._profile_left} frames restantes)"}
+        if kind == PROFILE_SAMPLE and self._sampler is not None and self._sampler.is_alive():
+            return {"ok": False, "error": "muestreo de pilas en curso"}
+        self._requests.append((kind, amount))
+        return {"ok": True, "kind": kind, "output_dir": self.output_dir}
+
+    def watch(self, name: str, container: Callable[[], Sized]):
+        # Contenedores cuyo tamano se incluye en cada informe de memoria
+        self._watch[name] = container
+
+    @property
+    def active(self) -> bool:
+        return self._profile is not None or (self._sampler is not None and self._sampler.is_alive())
+
+    def on_frame(self):
+        if not self._requests and self._profile is None:
+            return
+
+        if self._profile is not None:
+            self._profile_left -= 1
+            if self._profile_left <= 0:
+                self._finish_cprofile()
+
+        while self._requests:
+            kind, amount = self._requests.pop(0)
+            try:
+                self._start(kind, amount)
+            except Exception as e:
+                logger.error(f"[PROFILE] Error iniciando '{kind}': {e}", exc_info=True)
+
+    def _start(self, kind: str, amount: Optional[float]):
+        if kind == PROFILE_CPROFILE:
+            if self._profile is not None:
+                return
+            self._profile_left = int(amount or self.cprofile_frames)
+            self._profile_started = time.perf_counter()
+            self._profile = cProfile.Profile()
+            # cProfile solo ve el hilo que lo activa: el del loop (en modo pipelined, el de render)
+            self._profile.enable()
+            logger.info(f"[PROFILE] cProfile de los próximos {self._profile_left} frames")
+        elif kind == PROFILE_SAMPLE:
+            if self._sampler is not None and self._sampler.is_alive():
+                return
+            seconds = float(amount or self.sample_seconds)
+            self._sampler_stop.clear()
+            self._sampler = threading.Thread(
+                target=self._sample_stacks, args=(seconds,),
+                name="profiler-sampler", daemon=True
+            )
+            self._sampler.start()
+            logger.info(f"[PROFILE] Muestreo de pilas durante {seconds:.0f} s cada {self.sample_interval * 1000:.0f} ms")
+        elif kind == PROFILE_MEMORY:
+            self._memory_report()
+
+    def _finish_cprofile(self):
+        profile, self._profile = self._profile, None
+        profile.disable()
+        elapsed = time.perf_counter() - self._profile_started
+
+        base = self._output_path(PROFILE_CPROFILE)
+        profile.dump_stats(f"{base}.prof")
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"# {elapsed:.2f} s perfilados\n")
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats("cumulative").print_stats(40)
+            stats.sort_stats("tottime").print_stats(25)
+        self._written(f"{base}.prof", f"{base}.txt")
+
+    def _sample_stacks(self, seconds: float):
+        stacks: Counter = Counter()
+        functions: Counter = Counter()
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        samples = 0
+        deadline = time.perf_counter() + seconds
+
+        while time.perf_counter() < deadline and not self._sampler_stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                functions[stack[0]] += 1
+                thread_name = names.get(thread_id) or str(thread_id)
+                stacks[";".join([thread_name] + stack[::-1])] += 1
+            samples += 1
+            time.sleep(self.sample_interval)
+
+        base = self._output_path(PROFILE_SAMPLE)
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        total = sum(functions.values()) or 1
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"# {samples} muestras en {seconds:.1f} s (cada {self.sample_interval * 1000:.1f} ms)\n")
+            f.write("# Funcion en la cima de la pila, % de muestras\n")
+            for function, count in functions.most_common(40):
+                f.write(f"{count / total * 100:6.1f}%  {function}\n")
+        self._written(f"{base}.folded", f"{base}.txt")
+
+    def _memory_report(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._memory_snapshot = None
+            logger.info("[PROFILE] tracemalloc iniciado; el próximo 'memory' escribirá el diff")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            # Sin las asignaciones del propio perfilado
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        sizes = {}
+        for name, container in self._watch.items():
+            try:
+                sizes[name] = len(container())
+            except Exception:
+                continue
+
+        base = self._output_path(PROFILE_MEMORY)
+        current, peak = tracemalloc.get_traced_memory()
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(f"# Memoria trazada: {current / 1e6:.1f} MB (pico {peak / 1e6:.1f} MB)\n")
+            if sizes:
+                f.write("\n# Contenedores vigilados (tamaño, cambio desde el informe anterior)\n")
+                for name, size in sorted(sizes.items()):
+                    delta = size - self._watch_sizes.get(name, size)
+                    f.write(f"{size:8d} {delta:+8d}  {name}\n")
+            if self._memory_snapshot is None:
+                f.write("\n# Primer snapshot: mayores asignaciones por linea\n")
+                for stat in snapshot.statistics("lineno")[:self.memory_top]:
+                    f.write(f"{stat}\n")
+            else:
+                f.write("\n# Diff contra el snapshot anterior (mayor crecimiento por linea)\n")
+                for stat in snapshot.compare_to(self._memory_snapshot, "lineno")[:self.memory_top]:
+                    f.write(f"{stat}\n")
+                top = snapshot.compare_to(self._memory_snapshot, "traceback")[:3]
+                for stat in top:
+                    f.write(f"\n# {stat.size_diff / 1024:+.1f} KiB en {stat.count_diff:+d} bloques:\n")
+                    for line in stat.traceback.format():
+                        f.write(f"{line}\n")
+
+        self._memory_snapshot = snapshot
+        self._watch_sizes = sizes
+        self._written(f"{base}.txt")
+
+    def _output_path(self, kind: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.output_dir, f"{stamp}-{os.getpid()}-{kind}")
+
+    def _written(self, *paths: str):
+        self.outputs.extend(paths)
+        logger.info(f"[PROFILE] Escrito: {', '.join(paths)}")
+
+    def close(self):
+        if self._profile is not None:
+            self._finish_cprofile()
+        if self._sampler is not None and self._sampler.is_alive():
+            self._sampler_stop.set()
+            self._sampler.join(timeout=2.0)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
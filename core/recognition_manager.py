@@ -1,7 +1,9 @@
-import time
 import logging
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+from dataclasses import dataclass, field
+
+from core import clock
+from core.appearance_cache import AppearanceCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,23 @@ class RecognizedIdentity:
     confidence: float
     timestamp: float
 
+@dataclass
+class TrackEvidence:
+    votes: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    names: Dict[str, str] = field(default_factory=dict)
+    results: int = 0
+    # Peso de los resultados debiles y de los desconocidos: solo cuentan en el
+    # denominador de la fusion, nunca como voto ni como confianza de un candidato
+    weak_votes: float = 0.0
+    unknown_votes: float = 0.0
+    unknown_streak: int = 0
+    stable: bool = False
+    # Identidad asignada por apariencia: se envia una sola request de confirmacion y,
+    # salvo que el backend la contradiga, se trata como estable
+    provisional: bool = False
+    confirm_sent: bool = False
+
 class RecognitionManager:
     def __init__(
         self,
@@ -19,17 +38,31 @@ class RecognitionManager:
         send_interval: float = 1.0,
         confidence_threshold: float = 0.7,
         position_match_threshold: int = 50,
-        position_cache_timeout: float = 10.0
+        position_cache_timeout: float = 10.0,
+        fusion_min_results: int = 2,
+        fusion_vote_ratio: float = 0.6,
+        instant_accept_confidence: float = 0.9,
+        unknown_backoff: float = 2.0,
+        max_send_interval: float = 8.0,
+        appearance_cache: Optional[AppearanceCache] = None
     ):
         self.identities: Dict[int, RecognizedIdentity] = {}
         self.last_send_time: Dict[int, float] = {}
         self.position_cache: Dict[Tuple[int, int], RecognizedIdentity] = {}
+        self.evidence: Dict[int, TrackEvidence] = {}
+        self.appearance_cache = appearance_cache
         
         self.recognition_timeout = recognition_timeout
         self.send_interval = send_interval
         self.confidence_threshold = confidence_threshold
         self.position_match_threshold = position_match_threshold
         self.position_cache_timeout = position_cache_timeout
+        
+        self.fusion_min_results = fusion_min_results
+        self.fusion_vote_ratio = fusion_vote_ratio
+        self.instant_accept_confidence = instant_accept_confidence
+        self.unknown_backoff = unknown_backoff
+        self.max_send_interval = max_send_interval
     
     def _get_center(self, bbox: Tuple[int, int, int, int]) -> Tuple[int, int]:
         x, y, w, h = bbox
@@ -40,7 +73,7 @@ class RecognitionManager:
     
     def find_match_by_position(self, bbox: Tuple[int, int, int, int]) -> Optional[RecognizedIdentity]:
         center = self._get_center(bbox)
-        now = time.time()
+        now = clock.now()
         
         best_match = None
         best_distance = float('inf')
@@ -63,7 +96,7 @@ class RecognitionManager:
             person_id=identity.person_id,
             person_name=identity.person_name,
             confidence=identity.confidence,
-            timestamp=time.time()
+            timestamp=clock.now()
         )
         self.position_cache[center] = new_identity
         logger.debug(f"Posición cacheada: {center} → {identity.person_name}")
@@ -75,14 +108,60 @@ class RecognitionManager:
                 person_id=matched.person_id,
                 person_name=matched.person_name,
                 confidence=matched.confidence,
-                timestamp=time.time()
+                timestamp=clock.now()
             )
+            self.evidence.setdefault(face_id, TrackEvidence()).stable = True
             logger.info(f"Cara {face_id} identificada por posición: {matched.person_name}")
             return True
         return False
     
+    def remember_appearance(self, face_id: int, face_crop) -> bool:
+        if self.appearance_cache is None or not self.is_stable(face_id):
+            return False
+        
+        identity = self.identities.get(face_id)
+        if identity is None:
+            return False
+        
+        return self.appearance_cache.remember(
+            face_id,
+            face_crop,
+            identity.person_id,
+            identity.person_name,
+            identity.confidence
+        )
+    
+    def assign_identity_from_appearance(
+        self,
+        face_id: int,
+        face_crop,
+        active_face_ids: Iterable[int] = ()
+    ) -> bool:
+        if self.appearance_cache is None:
+            return False
+        
+        # Si el backend ya respondio para este track, su evidencia manda
+        evidence = self.evidence.get(face_id)
+        if evidence is not None and evidence.results > 0:
+            return False
+        
+        matched = self.appearance_cache.match(face_crop, exclude_ids=active_face_ids)
+        if matched:
+            self.identities[face_id] = RecognizedIdentity(
+                person_id=matched.person_id,
+                person_name=matched.person_name,
+                confidence=matched.confidence,
+                timestamp=clock.now()
+            )
+            # Provisional: el histograma de color no basta para fijar la identidad;
+            # una request la confirma y solo un resultado que la contradiga la anula
+            self.evidence.setdefault(face_id, TrackEvidence()).provisional = True
+            logger.info(f"Cara {face_id} identificada por apariencia (provisional): {matched.person_name}")
+            return True
+        return False
+    
     def cleanup_position_cache(self):
-        now = time.time()
+        now = clock.now()
         expired = [
             pos for pos, identity in self.position_cache.items()
             if now - identity.timestamp > self.position_cache_timeout
@@ -91,14 +170,36 @@ class RecognitionManager:
             del self.position_cache[pos]
     
     def should_send(self, face_id: int) -> bool:
-        now = time.time()
+        evidence = self.evidence.get(face_id)
+        if evidence and (evidence.stable or (evidence.provisional and evidence.confirm_sent)):
+            return False
+        
+        # Backoff exponencial para tracks que el backend no logra identificar
+        interval = self.send_interval
+        if evidence and evidence.unknown_streak > 0:
+            interval = min(
+                self.send_interval * self.unknown_backoff ** evidence.unknown_streak,
+                self.max_send_interval
+            )
+        
+        now = clock.now()
         last_send = self.last_send_time.get(face_id, 0)
-        if now - last_send >= self.send_interval:
+        if now - last_send >= interval:
             return True
         return False
     
     def mark_sent(self, face_id: int):
-        self.last_send_time[face_id] = time.time()
+        self.last_send_time[face_id] = clock.now()
+        evidence = self.evidence.get(face_id)
+        if evidence and evidence.provisional:
+            evidence.confirm_sent = True
+    
+    def mark_send_failed(self, face_id: int):
+        # El envio no llego a salir: la cara vuelve a poder enviarse en el proximo frame
+        self.last_send_time.pop(face_id, None)
+        evidence = self.evidence.get(face_id)
+        if evidence:
+            evidence.confirm_sent = False
     
     def update_identity(
         self,
@@ -108,27 +209,149 @@ class RecognitionManager:
         confidence: float,
         bbox: Optional[Tuple[int, int, int, int]] = None
     ):
-        if confidence >= self.confidence_threshold:
-            identity = RecognizedIdentity(
-                person_id=person_id,
-                person_name=person_name,
-                confidence=confidence,
-                timestamp=time.time()
+        evidence = self.evidence.get(face_id)
+        if evidence is None:
+            evidence = TrackEvidence()
+            self.evidence[face_id] = evidence
+        
+        if evidence.stable:
+            logger.debug(f"Resultado tardío para face {face_id} ya estable, ignorando")
+            return
+        
+        evidence.results += 1
+        
+        if evidence.provisional and self._resolve_provisional(face_id, evidence, person_id, confidence, bbox):
+            return
+        
+        if person_id and confidence >= self.confidence_threshold:
+            evidence.votes[person_id] = evidence.votes.get(person_id, 0.0) + confidence
+            evidence.counts[person_id] = evidence.counts.get(person_id, 0) + 1
+            evidence.names[person_id] = person_name
+            evidence.unknown_streak = 0
+        else:
+            evidence.unknown_streak += 1
+            logger.debug(
+                f"Confianza baja ({confidence:.2%}) para face {face_id}, "
+                f"desconocido {evidence.unknown_streak} veces seguidas"
+            )
+            if person_id and confidence > 0:
+                # Un resultado debil diluye la cuota de todos los candidatos
+                evidence.weak_votes += confidence * 0.5
+            else:
+                # Sin candidato: pesa como el voto aceptado mas flojo, para que
+                # fusion_vote_ratio mida la consistencia de todos los resultados
+                evidence.unknown_votes += self.confidence_threshold
+        
+        self._fuse_evidence(face_id, evidence, confidence, bbox)
+    
+    def _resolve_provisional(
+        self,
+        face_id: int,
+        evidence: TrackEvidence,
+        person_id: str,
+        confidence: float,
+        bbox: Optional[Tuple[int, int, int, int]]
+    ) -> bool:
+        # True si el resultado queda resuelto contra la identidad por apariencia
+        provisional = self.identities.get(face_id)
+        accepted = bool(person_id) and confidence >= self.confidence_threshold
+        
+        if provisional is not None and accepted and person_id == provisional.person_id:
+            evidence.provisional = False
+            evidence.stable = True
+            provisional.confidence = confidence
+            provisional.timestamp = clock.now()
+            logger.info(f"Identidad por apariencia confirmada: Face {face_id} = {provisional.person_name}")
+            if bbox:
+                self.cache_position(bbox, provisional)
+            return True
+        
+        if provisional is not None and not accepted:
+            # Un desconocido o un resultado debil no contradicen la apariencia
+            logger.debug(f"Resultado no concluyente para face {face_id}, se mantiene la identidad por apariencia")
+            return True
+        
+        # Contradicha: decide el backend y la apariencia no cuenta como voto
+        evidence.provisional = False
+        self.identities.pop(face_id, None)
+        logger.info(f"Identidad por apariencia de la cara {face_id} descartada por el backend")
+        return False
+    
+    def _fuse_evidence(
+        self,
+        face_id: int,
+        evidence: TrackEvidence,
+        last_confidence: float,
+        bbox: Optional[Tuple[int, int, int, int]]
+    ):
+        accepted = {pid: votes for pid, votes in evidence.votes.items() if evidence.counts.get(pid, 0) > 0}
+        if not accepted:
+            return
+        
+        top_id = max(accepted, key=accepted.get)
+        top_votes = accepted[top_id]
+        top_count = evidence.counts[top_id]
+        total_votes = sum(evidence.votes.values()) + evidence.weak_votes + evidence.unknown_votes
+        
+        # Solo resultados aceptados: votes y counts se acumulan juntos
+        mean_confidence = min(top_votes / top_count, 1.0)
+        vote_share = top_votes / total_votes if total_votes > 0 else 0.0
+        
+        identity = RecognizedIdentity(
+            person_id=top_id,
+            person_name=evidence.names[top_id],
+            confidence=mean_confidence,
+            timestamp=clock.now()
+        )
+        
+        previous = self.identities.get(face_id)
+        self.identities[face_id] = identity
+        if previous is None or previous.person_id != top_id:
+            logger.info(f"Reconocimiento: Face {face_id} = {identity.person_name} ({mean_confidence:.2%})")
+        
+        instant = evidence.results == 1 and last_confidence >= self.instant_accept_confidence
+        if instant or (top_count >= self.fusion_min_results and vote_share >= self.fusion_vote_ratio):
+            evidence.stable = True
+            logger.info(
+                f"Identidad estable: Face {face_id} = {identity.person_name} "
+                f"({top_count}/{evidence.results} votos, {vote_share:.0%})"
             )
-            self.identities[face_id] = identity
-            logger.info(f"Reconocimiento: Face {face_id} = {person_name} ({confidence:.2%})")
             
             if bbox:
                 self.cache_position(bbox, identity)
-        else:
-            logger.debug(f"Confianza baja ({confidence:.2%}) para face {face_id}, ignorando")
+    
+    def apply_results(
+        self,
+        results: List[Any],
+        bboxes: Optional[Dict[int, Tuple[int, int, int, int]]] = None
+    ) -> int:
+        applied = 0
+        for result in results:
+            if result.face_id < 0:
+                logger.debug(f"Resultado sin face_id válido ({result.person_name}), ignorando")
+                continue
+            
+            bbox = bboxes.pop(result.face_id, None) if bboxes is not None else None
+            self.update_identity(
+                face_id=result.face_id,
+                person_id=result.person_id,
+                person_name=result.person_name,
+                confidence=result.confidence,
+                bbox=bbox
+            )
+            applied += 1
+        return applied
+    
+    def is_stable(self, face_id: int) -> bool:
+        evidence = self.evidence.get(face_id)
+        return evidence is not None and evidence.stable
     
     def refresh_identity(self, face_id: int):
         if face_id in self.identities:
-            self.identities[face_id].timestamp = time.time()
+            self.identities[face_id].timestamp = clock.now()
     
     def refresh_active_faces(self, active_face_ids: List[int]):
-        now = time.time()
+        now = clock.now()
         for face_id in active_face_ids:
             if face_id in self.identities:
                 self.identities[face_id].timestamp = now
@@ -149,6 +372,13 @@ class RecognitionManager:
         for face_id in old_sends:
             del self.last_send_time[face_id]
         
+        old_evidence = [
+            face_id for face_id in list(self.evidence.keys())
+            if face_id not in active_face_ids
+        ]
+        for face_id in old_evidence:
+            del self.evidence[face_id]
+        
         self.cleanup_position_cache()
     
     def get_identity(self, face_id: int) -> Optional[RecognizedIdentity]:
@@ -167,4 +397,7 @@ class RecognitionManager:
         self.identities.clear()
         self.last_send_time.clear()
         self.position_cache.clear()
+        self.evidence.clear()
+        if self.appearance_cache is not None:
+            self.appearance_cache.clear()
         logger.debug("Reconocimientos y cache de posiciones limpiados")
@@ -1,8 +1,9 @@
-import time
 import logging
 from typing import Dict, List, Tuple, Any, Set
 from dataclasses import dataclass
 
+from core import clock
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -35,7 +36,7 @@ class RegisterManager:
     def lock_face(self, face_id: int, bbox: Tuple[int, int, int, int]):
         self.locked_faces[face_id] = LockedFace(
             bbox=bbox,
-            last_seen=time.time(),
+            last_seen=clock.now(),
             selected=True
         )
         logger.info(f"Cara {face_id} bloqueada para registro")
@@ -54,7 +55,7 @@ class RegisterManager:
     def update_locked_position(self, face_id: int, bbox: Tuple[int, int, int, int]):
         if face_id in self.locked_faces:
             self.locked_faces[face_id].bbox = bbox
-            self.locked_faces[face_id].last_seen = time.time()
+            self.locked_faces[face_id].last_seen = clock.now()
     
     def process_faces(
         self,
@@ -81,7 +82,7 @@ class RegisterManager:
         return processed_faces
     
     def _cleanup_expired(self):
-        current_time = time.time()
+        current_time = clock.now()
         expired_ids = [
             face_id for face_id, locked_face in self.locked_faces.items()
             if current_time - locked_face.last_seen > self.id_timeout
@@ -20,6 +20,8 @@ class RenderContext:
     current_name: str
     zmq_register_enabled: bool
     zmq_recognition_enabled: bool
+    zmq_register_health: Optional[Dict[str, Any]] = None
+    zmq_recognition_health: Optional[Dict[str, Any]] = None
     
     @classmethod
     def from_state(
@@ -32,16 +34,20 @@ class RenderContext:
         register_client: Optional["RegisterClient"],
         recognition_client: Optional["RecognitionClient"]
     ):
+        # Copias de los contenedores: en modo pipeline el render dibuja mientras
+        # la etapa de reconocimiento sigue modificando los originales
         return cls(
             frame=frame,
-            faces=faces,
+            faces=list(faces),
             mode=app_state.mode,
             register_state=app_state.register_state,
-            selected_face_ids=app_state.selected_face_ids,
-            locked_faces=register_manager.locked_faces,
-            recognized_identities=recognition_manager.identities,
+            selected_face_ids=list(app_state.selected_face_ids),
+            locked_faces=dict(register_manager.locked_faces),
+            recognized_identities=dict(recognition_manager.identities),
             current_face_index=app_state.current_face_index,
             current_name=app_state.current_name,
             zmq_register_enabled=register_client is not None and register_client.is_connected,
-            zmq_recognition_enabled=recognition_client is not None and recognition_client.is_connected
+            zmq_recognition_enabled=recognition_client is not None and recognition_client.is_connected,
+            zmq_register_health=register_client.get_health() if register_client is not None else None,
+            zmq_recognition_health=recognition_client.get_health() if recognition_client is not None else None
         )
@@ -0,0 +1,196 @@
+import os
+import json
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core import clock
+
+logger = logging.getLogger(__name__)
+
+FRAME_FORMAT_RAW = "raw"
+FRAME_FORMAT_JPEG = "jpeg"
+
+SESSION_META = "meta.json"
+SESSION_EVENTS = "events.jsonl"
+SESSION_FRAMES = "frames.bin"
+
+# SessionRecorder graba una sesion para reproducirla despues (core.session_replay):
+#   frames.bin   frames crudos consecutivos (legibles con np.memmap) o JPEG concatenados
+#   events.jsonl un evento por linea con timestamp: frame, detections, request, result
+#   meta.json    formato, forma de los frames y parametros necesarios para el replay
+# La escritura se hace en un hilo aparte; si el disco no da abasto se descartan
+# frames (y se cuentan) en lugar de frenar el loop.
+class SessionRecorder:
+
+    def __init__(
+        self,
+        path: str,
+        frame_format: str = FRAME_FORMAT_RAW,
+        jpeg_quality: int = 90,
+        queue_size: int = 64,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        if frame_format not in (FRAME_FORMAT_RAW, FRAME_FORMAT_JPEG):
+            raise ValueError(f"Formato de frames desconocido: {frame_format}")
+
+        self.path = path
+        self.frame_format = frame_format
+        self.jpeg_quality = jpeg_quality
+        self.metadata = dict(metadata or {})
+        os.makedirs(path, exist_ok=True)
+
+        self._frames_file = open(os.path.join(path, SESSION_FRAMES), "wb")
+        self._events_file = open(os.path.join(path, SESSION_EVENTS), "w", encoding="utf-8")
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Any]]]" = queue.Queue(maxsize=queue_size)
+
+        self.current_seq = -1
+        self.frames = 0
+        self.dropped = 0
+        self.started = clock.now()
+        self._shape: Optional[Tuple[int, ...]] = None
+        self._dtype: Optional[str] = None
+        self._offset = 0
+
+        self._writer = threading.Thread(target=self._write_loop, name="session-recorder", daemon=True)
+        self._writer.start()
+        logger.info(f"Grabando sesión en {path} (frames {frame_format})")
+
+    def record_frame(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        self.current_seq += 1
+        event = {"type": "frame", "seq": self.current_seq, "t": timestamp or clock.now()}
+        self._put(event, frame)
+        return self.current_seq
+
+    def record_detections(self, seq: int, scored_boxes: List[Tuple[Tuple[int, int, int, int], float]]):
+        self._put({
+            "type": "detections",
+            "seq": seq,
+            "t": clock.now(),
+            "boxes": [[int(v) for v in box] + [round(float(score), 4)] for box, score in scored_boxes]
+        })
+
+    def record_request(self, face_id: int, request_id: Optional[str], bbox: Tuple[int, int, int, int], quality: Optional[float]):
+        self._put({
+            "type": "request",
+            "t": clock.now(),
+            "face_id": face_id,
+            "request_id": request_id,
+            "bbox": [int(v) for v in bbox],
+            "quality": round(float(quality), 4) if quality is not None else None
+        })
+
+    def record_result(self, result: Any):
+        self._put({
+            "type": "result",
+            "t": clock.now(),
+            "face_id": result.face_id,
+            "request_id": result.request_id,
+            "person_id": result.person_id,
+            "person_name": result.person_name,
+            "confidence": result.confidence
+        })
+
+    def _put(self, event: Dict[str, Any], frame: Any = None):
+        try:
+            self._queue.put_nowait((event, frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            event, frame = item
+            try:
+                if frame is not None and not self._write_frame(event, frame):
+                    continue
+                self._events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            except Exception as e:
+                logger.error(f"Error grabando sesión: {e}")
+
+    def _write_frame(self, event: Dict[str, Any], frame: np.ndarray) -> bool:
+        if self._shape is None:
+            self._shape = tuple(frame.shape)
+            self._dtype = frame.dtype.str
+        elif tuple(frame.shape) != self._shape:
+            logger.warning(f"Frame {event['seq']} con forma {frame.shape} distinta de {self._shape}: descartado")
+            self.dropped += 1
+            return False
+
+        if self.frame_format == FRAME_FORMAT_JPEG:
+            ok, encoded = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+            if not ok:
+                return False
+            data = encoded.tobytes()
+        else:
+            data = np.ascontiguousarray(frame).tobytes()
+
+        event["offset"] = self._offset
+        event["size"] = len(data)
+        self._frames_file.write(data)
+        self._offset += len(data)
+        self.frames += 1
+        return True
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join(timeout=10.0)
+        self._frames_file.close()
+        self._events_file.close()
+
+        meta = dict(self.metadata)
+        meta.update({
+            "version": 1,
+            "frame_format": self.frame_format,
+            "shape": list(self._shape) if self._shape else None,
+            "dtype": self._dtype,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "started": self.started,
+            "ended": clock.now()
+        })
+        with open(os.path.join(self.path, SESSION_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        logger.info(f"Sesión grabada: {self.frames} frames, {self.dropped} descartados ({self.path})")
+
+
+# Envuelve al detector para grabar sus salidas asociadas al frame en curso.
+# Con DetectorPool (asincrono) la deteccion se asocia al frame con el que se lanzo.
+class RecordingDetector:
+
+    def __init__(self, detector, recorder: SessionRecorder):
+        self.detector = detector
+        self.recorder = recorder
+        self.is_async = getattr(detector, "is_async", False)
+        self._job_seq: Dict[int, int] = {}
+
+    def detect_with_scores(self, frame):
+        scored_boxes = self.detector.detect_with_scores(frame)
+        self.recorder.record_detections(self.recorder.current_seq, scored_boxes)
+        return scored_boxes
+
+    def detect(self, frame):
+        return [box for box, _ in self.detect_with_scores(frame)]
+
+    def submit(self, frame, source: str = "default"):
+        job_id = self.detector.submit(frame, source)
+        if job_id is not None:
+            self._job_seq[job_id] = self.recorder.current_seq
+        return job_id
+
+    def poll(self, job_id: int):
+        scored_boxes = self.detector.poll(job_id)
+        if scored_boxes is not None:
+            self.recorder.record_detections(self._job_seq.pop(job_id, self.recorder.current_seq), scored_boxes)
+        elif not self.detector.is_pending(job_id):
+            self._job_seq.pop(job_id, None)
+        return scored_boxes
+
+    def __getattr__(self, name):
+        return getattr(self.detector, name)
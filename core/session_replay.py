@@ -0,0 +1,169 @@
+import os
+import json
+import bisect
+import heapq
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core import clock
+from core.session_recorder import FRAME_FORMAT_JPEG, SESSION_EVENTS, SESSION_FRAMES, SESSION_META
+from communication.recognition_client import RecognitionResult
+
+logger = logging.getLogger(__name__)
+
+
+class SessionReader:
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, SESSION_META), "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+
+        self.frames: List[Dict[str, Any]] = []
+        self.detections: Dict[int, List[Tuple[Tuple[int, int, int, int], float]]] = {}
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.results: List[Dict[str, Any]] = []
+
+        with open(os.path.join(path, SESSION_EVENTS), "r", encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                kind = event.get("type")
+                if kind == "frame":
+                    self.frames.append(event)
+                elif kind == "detections":
+                    self.detections[event["seq"]] = [
+                        ((box[0], box[1], box[2], box[3]), box[4]) for box in event["boxes"]
+                    ]
+                elif kind == "request" and event.get("request_id"):
+                    self.requests[event["request_id"]] = event
+                elif kind == "result":
+                    self.results.append(event)
+        self.frames.sort(key=lambda event: event["seq"])
+        self._detection_seqs = sorted(self.detections)
+
+        frames_path = os.path.join(path, SESSION_FRAMES)
+        self._data = np.memmap(frames_path, dtype=np.uint8, mode="r") if os.path.getsize(frames_path) else None
+        self.shape = tuple(self.meta["shape"]) if self.meta.get("shape") else None
+        self.dtype = np.dtype(self.meta.get("dtype") or "uint8")
+
+    def load_frame(self, event: Dict[str, Any]) -> np.ndarray:
+        raw = self._data[event["offset"]:event["offset"] + event["size"]]
+        if self.meta["frame_format"] == FRAME_FORMAT_JPEG:
+            return cv2.imdecode(np.asarray(raw), cv2.IMREAD_COLOR)
+        # Copia: el frame deja de depender del mapeo y se puede modificar
+        return np.array(raw).view(self.dtype).reshape(self.shape)
+
+    def detections_for(self, seq: int) -> List[Tuple[Tuple[int, int, int, int], float]]:
+        if seq in self.detections:
+            return self.detections[seq]
+        # El replay pidio deteccion en un frame sin grabacion: se usa la anterior mas cercana
+        index = bisect.bisect_right(self._detection_seqs, seq) - 1
+        return self.detections[self._detection_seqs[index]] if index >= 0 else []
+
+
+# Camara que entrega los frames grabados tan rapido como se pidan y adelanta el
+# reloj (core.clock) al timestamp de cada frame.
+class ReplayCamera:
+
+    def __init__(self, reader: SessionReader, replay_clock: clock.ManualClock):
+        self.reader = reader
+        self.clock = replay_clock
+        self.position = 0
+        self.current_seq = -1
+        self.exhausted = False
+
+    def read(self) -> Optional[np.ndarray]:
+        if self.position >= len(self.reader.frames):
+            self.exhausted = True
+            return None
+        event = self.reader.frames[self.position]
+        self.position += 1
+        self.current_seq = event["seq"]
+        self.clock.set(event["t"])
+        return self.reader.load_frame(event)
+
+    def release(self):
+        pass
+
+
+class ReplayDetector:
+
+    def __init__(self, reader: SessionReader, camera: ReplayCamera):
+        self.reader = reader
+        self.camera = camera
+        self.calls = 0
+
+    def detect_with_scores(self, frame) -> List[Tuple[Tuple[int, int, int, int], float]]:
+        self.calls += 1
+        return list(self.reader.detections_for(self.camera.current_seq))
+
+    def detect(self, frame) -> List[Tuple[int, int, int, int]]:
+        return [box for box, _ in self.detect_with_scores(frame)]
+
+
+# Sustituye al RecognitionClient reproduciendo el trafico grabado: cada request
+# recibe la respuesta grabada de la misma cara mas cercana en el tiempo, con su
+# misma latencia, medida con el reloj de la grabacion. Deterministico.
+class RecordedRecognitionClient:
+
+    def __init__(self, reader: SessionReader):
+        self.exchanges: Dict[int, List[Tuple[float, float, Dict[str, Any]]]] = {}
+        for result in reader.results:
+            request = reader.requests.get(result.get("request_id"))
+            sent = request["t"] if request else result["t"]
+            self.exchanges.setdefault(result["face_id"], []).append((sent, result["t"] - sent, result))
+        for exchanges in self.exchanges.values():
+            exchanges.sort(key=lambda exchange: exchange[0])
+
+        self._scheduled: List[Tuple[float, int, RecognitionResult]] = []
+        self._counter = 0
+        self.sent = 0
+        self.unanswered = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return True
+
+    def get_health(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def send_recognition_request(self, frame, face_id: int, bbox, face_crop=None, quality=None, request_id=None) -> bool:
+        self.sent += 1
+        exchanges = self.exchanges.get(face_id)
+        if not exchanges:
+            self.unanswered += 1
+            return True
+
+        now = clock.now()
+        sent, latency, result = min(exchanges, key=lambda exchange: abs(exchange[0] - now))
+        self._counter += 1
+        heapq.heappush(self._scheduled, (now + latency, self._counter, RecognitionResult(
+            face_id=face_id,
+            person_id=result.get("person_id", ""),
+            person_name=result.get("person_name", ""),
+            confidence=result.get("confidence", 0.0),
+            request_id=request_id
+        )))
+        return True
+
+    def send_recognition_batch(self, frame, faces) -> List[int]:
+        return [
+            face.face_id for face in faces
+            if self.send_recognition_request(frame, face.face_id, face.bbox, face.face_crop, face.quality, face.request_id)
+        ]
+
+    def take_failed_requests(self) -> List[Tuple[int, Optional[str]]]:
+        return []
+
+    def drain_results(self, max_messages: int = 256) -> List[RecognitionResult]:
+        now = clock.now()
+        results = []
+        while self._scheduled and self._scheduled[0][0] <= now and len(results) < max_messages:
+            results.append(heapq.heappop(self._scheduled)[2])
+        return results
+
+    def close(self):
+        pass
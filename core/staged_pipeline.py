@@ -0,0 +1,102 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, List, Optional
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Cola acotada entre etapas: si la etapa siguiente va mas lenta, se descarta el
+# elemento mas antiguo en lugar de bloquear a la anterior. Asi cada etapa trabaja
+# siempre con el frame mas reciente y la latencia no crece con el tiempo.
+class DropOldestQueue:
+
+    def __init__(self, name: str, maxsize: int = 2):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self._items: deque = deque(maxlen=self.maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item: Any):
+        with self._cond:
+            if len(self._items) == self.maxsize:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = 0.1) -> Optional[Any]:
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Etapa del pipeline en su propio hilo: toma un elemento de la cola de entrada
+# (o lo produce si no tiene entrada, como la captura), lo procesa con `work` y
+# deja el resultado en la cola de salida. `work` devuelve None para no emitir nada.
+class PipelineStage(threading.Thread):
+
+    def __init__(
+        self,
+        name: str,
+        work: Callable[[Any], Any],
+        stop_event: threading.Event,
+        metrics,
+        input_queue: Optional[DropOldestQueue] = None,
+        output_queue: Optional[DropOldestQueue] = None
+    ):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.work = work
+        self.stop_event = stop_event
+        self.metrics = metrics
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+
+    def run(self):
+        logger.debug(f"Etapa '{self.stage_name}' iniciada")
+        while not self.stop_event.is_set():
+            item = None
+            if self.input_queue is not None:
+                item = self.input_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+                self.metrics.set_gauge(f"queue.{self.input_queue.name}", len(self.input_queue))
+
+            start = time.perf_counter()
+            try:
+                result = self.work(item)
+            except Exception as e:
+                logger.error(f"Error en etapa '{self.stage_name}': {e}", exc_info=True)
+                continue
+            self.metrics.record_timing(f"stage.{self.stage_name}", time.perf_counter() - start)
+
+            if result is not None and self.output_queue is not None:
+                self.output_queue.put(result)
+                self.metrics.set_gauge(f"queue.{self.output_queue.name}", len(self.output_queue))
+                self.metrics.set_gauge(f"dropped.{self.output_queue.name}", self.output_queue.dropped)
+        logger.debug(f"Etapa '{self.stage_name}' detenida")
+
+
+# Lo que viaja entre etapas: el frame capturado y lo que cada etapa le va añadiendo
+@dataclass
+class FramePacket:
+    frame: Any
+    capture_ts: float
+    faces: List[tuple] = field(default_factory=list)
+    mode: str = "recognize"
+    display_frame: Any = None
+    display_faces: List[tuple] = field(default_factory=list)
+    deadline: Any = None
+    started: float = field(default_factory=time.perf_counter)
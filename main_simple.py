@@ -1,11 +1,14 @@
 import logging
+import argparse
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 import yaml
 
 from pipeline.camera import Camera
 from pipeline.detector import FaceDetector
+from pipeline.detector_pool import DetectorPool
 from pipeline.tracker import FaceTracker
 from UI.renderer import UIRenderer
 from UI.input_handler import InputHandler, AppState
@@ -13,22 +16,33 @@ from core.frame_manager import FrameManager
 from core.app_orchestrator import ApplicationOrchestrator
 from communication.register_client import RegisterClient
 from communication.recognition_client import RecognitionClient
+from communication.zmq_transport import SocketOptions
+from communication.sharded_recognition_client import ShardedRecognitionClient
+from communication.control_server import ControlServer
+from core.session_recorder import SessionRecorder
+from core.metrics_server import MetricsHTTPServer
+from core.profiler_hooks import ProfilerHooks
 
 logger = logging.getLogger(__name__)
 
 class FaceRecognizerSimple:
-    def __init__(self, config_path: str = "config_simple.yaml"):
+    def __init__(self, config_path: str = "config_simple.yaml", headless: Optional[bool] = None):
         self.config_path = Path(config_path)
         self.config = None
+        self.headless = headless
         
         self.camera: Optional[Camera] = None
-        self.detector: Optional[FaceDetector] = None
+        self.detector: Optional[Union[FaceDetector, DetectorPool]] = None
         self.tracker: Optional[FaceTracker] = None
         self.register_client: Optional[RegisterClient] = None
-        self.recognition_client: Optional[RecognitionClient] = None
+        self.recognition_client: Optional[Union[RecognitionClient, ShardedRecognitionClient]] = None
         self.renderer: Optional[UIRenderer] = None
         self.input_handler: Optional[InputHandler] = None
         self.frame_manager: Optional[FrameManager] = None
+        self.control_server: Optional[ControlServer] = None
+        self.recorder: Optional[SessionRecorder] = None
+        self.metrics_server: Optional[MetricsHTTPServer] = None
+        self.profiler: Optional[ProfilerHooks] = None
         
         self.orchestrator: Optional[ApplicationOrchestrator] = None
         
@@ -71,29 +85,75 @@ class FaceRecognizerSimple:
         else:
             selected_device = 'cpu'
             
-        self.detector = FaceDetector(
-            model_path=det_config['model_path'],
-            confidence=det_config['confidence'],
-            device=selected_device 
-        )
+        if det_config.get('workers', 0) > 0:
+            # Deteccion en procesos aparte; el modelo se carga en cada worker
+            self.detector = DetectorPool(
+                model_path=det_config['model_path'],
+                confidence=det_config['confidence'],
+                device=selected_device,
+                workers=det_config['workers'],
+                slots=det_config.get('pool_slots'),
+                max_frame_shape=(cam_config['resolution'][1], cam_config['resolution'][0], 3)
+            )
+        else:
+            self.detector = FaceDetector(
+                model_path=det_config['model_path'],
+                confidence=det_config['confidence'],
+                device=selected_device 
+            )
         # ----------------------------
 
         self.tracker = FaceTracker(
-            interval=det_config['detection_interval']
+            interval=det_config['detection_interval'],
+            tracker_type=det_config.get('tracker_type', 'auto')
         )
         
         zmq_config = self.config.get('zmq', {})
         if zmq_config.get('enabled', False):
+            # Opciones comunes: ambos clientes comparten un unico contexto ZMQ
+            transport_options = {
+                'wire_format': zmq_config.get('wire_format', 'legacy'),
+                'header_codec': zmq_config.get('header_codec', 'json'),
+                'io_thread': zmq_config.get('io_thread', False),
+                'io_threads': zmq_config.get('io_threads', 1),
+                'socket_options': SocketOptions.from_config(zmq_config.get('socket', {})),
+                'image_transport': zmq_config.get('image_transport', 'jpeg'),
+                'shm_slots': zmq_config.get('shm_slots', 128),
+                'crop_codec': zmq_config.get('crop_codec', 'jpeg'),
+                'crop_quality': zmq_config.get('crop_quality'),
+                'encode_workers': zmq_config.get('encode_workers', 0),
+                'health_options': zmq_config.get('health', {})
+            }
+            
             self.register_client = RegisterClient(
                 send_endpoint=zmq_config.get('register_send_endpoint', 'tcp://127.0.0.1:5555'),
-                recv_endpoint=zmq_config.get('register_recv_endpoint', 'tcp://127.0.0.1:5556')
+                recv_endpoint=zmq_config.get('register_recv_endpoint', 'tcp://127.0.0.1:5556'),
+                **transport_options
             )
             self.register_client.connect()
             
-            self.recognition_client = RecognitionClient(
-                send_endpoint=zmq_config.get('recognition_send_endpoint', 'tcp://127.0.0.1:5557'),
-                recv_endpoint=zmq_config.get('recognition_recv_endpoint', 'tcp://127.0.0.1:5558')
+            # Control de flujo por creditos, solo para reconocimiento (el registro es puntual)
+            recognition_options = dict(
+                transport_options,
+                flow_window=zmq_config.get('flow_window', 0),
+                flow_max_window=zmq_config.get('flow_max_window', 32),
+                flow_credit_timeout=zmq_config.get('flow_credit_timeout', 3.0)
             )
+            
+            recognition_endpoints = zmq_config.get('recognition_endpoints')
+            if recognition_endpoints:
+                self.recognition_client = ShardedRecognitionClient(
+                    endpoints=recognition_endpoints,
+                    routing=zmq_config.get('recognition_routing', 'round_robin'),
+                    result_timeout=self.config.get('recognition', {}).get('result_timeout', 10.0),
+                    **recognition_options
+                )
+            else:
+                self.recognition_client = RecognitionClient(
+                    send_endpoint=zmq_config.get('recognition_send_endpoint', 'tcp://127.0.0.1:5557'),
+                    recv_endpoint=zmq_config.get('recognition_recv_endpoint', 'tcp://127.0.0.1:5558'),
+                    **recognition_options
+                )
             self.recognition_client.connect()
         
         register_config = {
@@ -103,10 +163,47 @@ class FaceRecognizerSimple:
         
         recognition_config = self.config.get('recognition', {})
         
-        self.renderer = UIRenderer()
-        self.input_handler = InputHandler()
+        recording_config = self.config.get('recording', {})
+        if recording_config.get('enabled', False):
+            session_path = Path(recording_config.get('path', 'sessions')) / datetime.now().strftime("%Y%m%d-%H%M%S")
+            # Lo necesario para reproducir la sesion con la misma configuracion
+            self.recorder = SessionRecorder(
+                path=str(session_path),
+                frame_format=recording_config.get('frame_format', 'raw'),
+                jpeg_quality=recording_config.get('jpeg_quality', 90),
+                metadata={
+                    'detection_interval': self.config['detection']['detection_interval'],
+                    'recognition': recognition_config
+                }
+            )
+        
+        ui_config = self.config.get('ui', {})
+        if self.headless is None:
+            self.headless = ui_config.get('headless', False)
+        
+        if self.headless:
+            # Sin ventana ni teclado: ordenes por socket de control y/o stdin
+            self.control_server = ControlServer(
+                endpoint=ui_config.get('control_endpoint', 'tcp://127.0.0.1:5560'),
+                stdin=ui_config.get('control_stdin', False)
+            )
+            logger.info("Modo headless: sin ventana")
+        else:
+            self.renderer = UIRenderer()
+            self.input_handler = InputHandler()
         self.frame_manager = FrameManager()
         
+        profiling_config = self.config.get('profiling', {})
+        if profiling_config.get('enabled', True):
+            self.profiler = ProfilerHooks(
+                output_dir=profiling_config.get('output_dir', 'profiles'),
+                cprofile_frames=profiling_config.get('cprofile_frames', 300),
+                sample_interval=profiling_config.get('sample_interval', 0.005),
+                sample_seconds=profiling_config.get('sample_seconds', 10.0),
+                memory_top=profiling_config.get('memory_top', 30)
+            )
+            self.profiler.install_signal_handlers()
+        
         self.orchestrator = ApplicationOrchestrator(
             camera=self.camera,
             detector=self.detector,
@@ -117,9 +214,24 @@ class FaceRecognizerSimple:
             register_client=self.register_client,
             recognition_client=self.recognition_client,
             register_config=register_config,
-            recognition_config=recognition_config
+            recognition_config=recognition_config,
+            pipeline_config=self.config.get('pipeline', {}),
+            control_server=self.control_server,
+            headless=self.headless,
+            recorder=self.recorder,
+            metrics_config=self.config.get('metrics', {}),
+            profiler=self.profiler
         )
         
+        metrics_config = self.config.get('metrics', {})
+        if metrics_config.get('http_port', 0):
+            self.metrics_server = MetricsHTTPServer(
+                self.orchestrator.metrics,
+                host=metrics_config.get('http_host', '127.0.0.1'),
+                port=metrics_config['http_port']
+            )
+            self.metrics_server.start()
+        
         logger.info("Sistema inicializado correctamente")
     
     def run(self):
@@ -131,9 +243,21 @@ class FaceRecognizerSimple:
         if self.orchestrator:
             self.orchestrator.stop()
         
+        if self.recorder:
+            self.recorder.close()
+        
+        if self.metrics_server:
+            self.metrics_server.close()
+        
+        if self.profiler:
+            self.profiler.close()
+        
         if self.camera:
             self.camera.release()
         
+        if self.detector and hasattr(self.detector, 'close'):
+            self.detector.close()
+        
         if self.register_client:
             self.register_client.close()
         
@@ -152,9 +276,15 @@ def main():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
+    parser = argparse.ArgumentParser(description="FaceRecognizer")
+    parser.add_argument("--config", default="config_simple.yaml")
+    parser.add_argument("--headless", action="store_true", default=None,
+                        help="Ejecutar sin ventana (ignora ui.headless del YAML)")
+    args = parser.parse_args()
+    
     app = None
     try:
-        app = FaceRecognizerSimple()
+        app = FaceRecognizerSimple(config_path=args.config, headless=args.headless)
         app.initialize()
         app.run()
     except KeyboardInterrupt:
@@ -32,6 +32,9 @@ class FaceDetector:
         logger.info("Modelo YOLO cargado correctamente")
     
     def detect(self, frame) -> List[Tuple[int, int, int, int]]:
+        return [box for box, _ in self.detect_with_scores(frame)]
+    
+    def detect_with_scores(self, frame) -> List[Tuple[Tuple[int, int, int, int], float]]:
         logger.info(f"[DETECTOR] YOLO detectando con device={self.device}, conf={self.confidence}")
         
         # Pasamos el argumento 'device' explícitamente en cada inferencia
@@ -54,12 +57,12 @@ class FaceDetector:
             if num_boxes == 0:
                 continue
             
-            for box in r.boxes.xyxy:
+            for box, score in zip(r.boxes.xyxy, r.boxes.conf):
                 x1, y1, x2, y2 = map(int, box)
                 
                 if x2 > x1 and y2 > y1:
-                    boxes.append((x1, y1, x2, y2))
-                    logger.info(f"[DETECTOR] Box válido: ({x1}, {y1}, {x2}, {y2})")
+                    boxes.append(((x1, y1, x2, y2), float(score)))
+                    logger.info(f"[DETECTOR] Box válido: ({x1}, {y1}, {x2}, {y2}) conf={float(score):.2f}")
         
         logger.info(f"[DETECTOR] Total boxes retornados: {len(boxes)}")
-        return boxes
\ No newline at end of file
+        return boxes
@@ -0,0 +1,242 @@
+import time
+import queue
+import logging
+import multiprocessing as mp
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from communication.shm_ring import SharedMemoryRing
+
+logger = logging.getLogger(__name__)
+
+ScoredBoxes = List[Tuple[Tuple[int, int, int, int], float]]
+
+
+def _load_face_detector(model_path: str, confidence: float, device: Any):
+    # Import diferido: el proceso principal no necesita torch ni el modelo
+    from pipeline.detector import FaceDetector
+    return FaceDetector(model_path=model_path, confidence=confidence, device=device)
+
+
+def _worker_main(
+    index: int,
+    factory: Callable[..., Any],
+    factory_args: Tuple[Any, ...],
+    ring_descriptor: Dict[str, Any],
+    tasks,
+    results
+):
+    detector = factory(*factory_args)
+    ring = SharedMemoryRing.attach(ring_descriptor)
+    logger.info(f"[DETECTOR-POOL] Worker {index} listo")
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        job_id, slot, generation, shape, dtype = task
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        # Vista directa sobre el slot: el frame no se copia ni se serializa
+        frame = ring.data[slot][:nbytes].view(dtype).reshape(shape)
+
+        boxes = None
+        if int(ring.generations[slot]) == generation:
+            try:
+                scored = detector.detect_with_scores(frame)
+            except Exception as e:
+                logger.error(f"[DETECTOR-POOL] Error en worker {index}: {e}")
+                scored = []
+            # Si el slot se reutilizo durante la inferencia el resultado no es fiable
+            if int(ring.generations[slot]) == generation:
+                boxes = np.array(
+                    [[x1, y1, x2, y2, score] for (x1, y1, x2, y2), score in scored],
+                    dtype=np.float32
+                ).reshape(-1, 5)
+        del frame
+        results.put((job_id, boxes))
+
+    ring.close()
+
+
+@dataclass
+class PendingDetection:
+    slot: int
+    source: str
+    submitted: float = field(default_factory=time.time)
+
+# DetectorPool ejecuta FaceDetector en procesos separados, cada uno con su modelo,
+# para que la inferencia no compita por el GIL con el tracker y el resto del loop.
+# Los frames viajan por un anillo de memoria compartida (un slot por deteccion en
+# vuelo) y solo vuelven las cajas. submit/poll nunca bloquean: sin slots libres el
+# frame simplemente no se detecta y el tracker sigue con los trackers actuales.
+# Un mismo pool puede atender varias camaras; cada FaceTracker sigue su propio job.
+class DetectorPool:
+
+    is_async = True
+
+    def __init__(
+        self,
+        model_path: str = "",
+        confidence: float = 0.5,
+        device: Any = "cpu",
+        workers: int = 1,
+        slots: Optional[int] = None,
+        max_frame_shape: Tuple[int, int, int] = (1080, 1920, 3),
+        job_timeout: float = 5.0,
+        detector_factory: Optional[Callable[..., Any]] = None,
+        factory_args: Optional[Tuple[Any, ...]] = None
+    ):
+        self.workers = max(1, workers)
+        self.slots = slots or self.workers * 2
+        self.job_timeout = job_timeout
+
+        self.ring = SharedMemoryRing(
+            slots=self.slots,
+            slot_shape=(int(np.prod(max_frame_shape)),),
+            dtype=np.uint8
+        )
+        self._free = deque(range(self.slots))
+        self._jobs: Dict[int, PendingDetection] = {}
+        self._done: Dict[int, Tuple[float, ScoredBoxes]] = {}
+        self._next_job = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.discarded = 0
+        self._latency_total = 0.0
+
+        if detector_factory is None:
+            detector_factory = _load_face_detector
+            factory_args = (model_path, confidence, device)
+
+        # spawn: torch/CUDA no son seguros tras un fork
+        ctx = mp.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        descriptor = self.ring.descriptor(0, 0)
+        self.processes = [
+            ctx.Process(
+                target=_worker_main,
+                args=(index, detector_factory, factory_args or (), descriptor, self._tasks, self._results),
+                name=f"detector-{index}",
+                daemon=True
+            )
+            for index in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+        logger.info(f"Pool de detección iniciado: {self.workers} procesos, {self.slots} slots")
+
+    def submit(self, frame: np.ndarray, source: str = "default") -> Optional[int]:
+        if frame.nbytes > self.ring.slot_bytes:
+            logger.warning(f"[DETECTOR-POOL] Frame {frame.shape} mayor que el slot ({self.ring.slot_bytes} bytes)")
+            self.rejected += 1
+            return None
+
+        self._collect()
+        if not self._free:
+            self.rejected += 1
+            return None
+
+        slot = self._free.popleft()
+        # Invalida el slot mientras se copia: un worker con un job antiguo de este slot lo descarta
+        self.ring.generations[slot] = 0
+        np.copyto(self.ring.data[slot][:frame.nbytes], np.ascontiguousarray(frame).reshape(-1).view(np.uint8))
+        generation = self.ring.publish(slot)
+
+        job_id = self._next_job
+        self._next_job += 1
+        self._jobs[job_id] = PendingDetection(slot=slot, source=source)
+        self._tasks.put((job_id, slot, generation, frame.shape, frame.dtype.str))
+        self.submitted += 1
+        return job_id
+
+    def poll(self, job_id: int) -> Optional[ScoredBoxes]:
+        # Cajas de la deteccion si ya termino; None si sigue en curso o se perdio
+        self._collect()
+        done = self._done.pop(job_id, None)
+        return done[1] if done is not None else None
+
+    def is_pending(self, job_id: int) -> bool:
+        return job_id in self._jobs
+
+    def detect_with_scores(self, frame: np.ndarray) -> ScoredBoxes:
+        # Version bloqueante para quien use el pool como un FaceDetector normal
+        job_id = self.submit(frame)
+        if job_id is None:
+            return []
+        while self.is_pending(job_id):
+            time.sleep(0.001)
+            self._collect()
+        return self.poll(job_id) or []
+
+    def detect(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        return [box for box, _ in self.detect_with_scores(frame)]
+
+    def _collect(self):
+        now = time.time()
+        while True:
+            try:
+                job_id, boxes = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                # Resultado de un job ya expirado: su slot se libero entonces
+                continue
+            self._free.append(job.slot)
+            if boxes is None:
+                self.discarded += 1
+                continue
+
+            self.completed += 1
+            self._latency_total += now - job.submitted
+            self._done[job_id] = (now, [
+                ((int(x1), int(y1), int(x2), int(y2)), float(score))
+                for x1, y1, x2, y2, score in boxes
+            ])
+
+        for job_id, job in list(self._jobs.items()):
+            if now - job.submitted > self.job_timeout:
+                del self._jobs[job_id]
+                self._free.append(job.slot)
+                self.expired += 1
+                logger.warning(f"[DETECTOR-POOL] Detección {job_id} ({job.source}) expirada")
+
+        # Resultados que nadie recogio (p.ej. tras un reset del tracker)
+        for job_id in [jid for jid, (ts, _) in self._done.items() if now - ts > self.job_timeout]:
+            del self._done[job_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for process in self.processes if process.is_alive()),
+            "in_flight": len(self._jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "discarded": self.discarded,
+            "mean_latency_ms": round(self._latency_total / self.completed * 1000, 1) if self.completed else None
+        }
+
+    def close(self):
+        for _ in self.processes:
+            self._tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        for q in (self._tasks, self._results):
+            q.cancel_join_thread()
+            q.close()
+        self.ring.close()
+        logger.info(f"Pool de detección cerrado: {self.completed} detecciones, {self.rejected} rechazadas")
@@ -1,6 +1,7 @@
 from .camera import Camera
 from .detector import FaceDetector
+from .detector_pool import DetectorPool
 from .tracker import FaceTracker
 from .sender import ZMQSender
 
-__all__ = ['Camera', 'FaceDetector', 'FaceTracker', 'ZMQSender']
\ No newline at end of file
+__all__ = ['Camera', 'FaceDetector', 'DetectorPool', 'FaceTracker', 'ZMQSender']
\ No newline at end of file
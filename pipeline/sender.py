@@ -1,24 +1,30 @@
-import zmq
-import cv2
-import struct
 import time
-import json
+import struct
 import logging
 from typing import Optional, Dict, Any, Tuple
 
+import zmq
+
+from communication.zmq_transport import ZMQTransport, build_face_header
+from communication.header_codec import encode_header
+
 logger = logging.getLogger(__name__)
 
 
-class ZMQSender:
+# Adaptador de solo envio sobre ZMQTransport (comparte contexto, opciones de socket
+# y esquema de cabecera con RegisterClient/RecognitionClient)
+class ZMQSender(ZMQTransport):
+
+    LOG_TAG = "SENDER"
+    ACTION_LABEL = "envío"
     
-    def __init__(self, endpoint: str):
+    def __init__(self, endpoint: str, **transport_options):
+        super().__init__(endpoint, None, **transport_options)
         self.endpoint = endpoint
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.PUSH)
         
         logger.info(f"Conectando a ZMQ endpoint: {endpoint}")
-        self.socket.connect(endpoint)
-        logger.info("Conexión ZMQ establecida")
+        if self.connect():
+            logger.info("Conexión ZMQ establecida")
     
     def send_face(
         self,
@@ -34,67 +40,32 @@ class ZMQSender:
         detection_index: int = 0,
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
-
-        try:
-            face_resized = cv2.resize(face_img, (112, 112))
-
-            success, buffer = cv2.imencode(
-                '.jpg', 
-                face_resized,
-                [cv2.IMWRITE_JPEG_QUALITY, 95]
-            )
-            
-            if not success:
-                logger.error("Error codificando imagen a JPEG")
-                return False
-            
-            img_bytes = buffer.tobytes()
-            
-            header = {
-                "camera_id": camera_id,
-                "face_track_id": face_track_id,
-                "frame_number": frame_number,
-                "timestamp": int(time.time()),
-                "mode": mode,
-                "camera_name": camera_name,
-                "bbox": {
-                    "x": int(bbox[0]),
-                    "y": int(bbox[1]),
-                    "w": int(bbox[2]),
-                    "h": int(bbox[3])
-                },
-                "detection_index": detection_index,
-                "image_size": len(img_bytes),
-            }
-            
-            if person_name:
-                header["person_name"] = person_name
-            
-            if person_id:
-                header["person_id"] = person_id
-            
-            if metadata:
-                header.update(metadata)
-            
-            header_json = json.dumps(header).encode('utf-8')
-            
-            header_len = struct.pack('!I', len(header_json))
-            message = header_len + header_json + img_bytes
-            
-            self.socket.send(message, flags=zmq.NOBLOCK)
-            
-            logger.debug(
-                f"Enviado: {camera_id} | mode={mode} | "
-                f"face_track_id={face_track_id} | size={len(img_bytes)} bytes"
-            )
-            return True
-            
-        except zmq.Again:
-            logger.warning("ZMQ socket buffer lleno, mensaje descartado")
+        encoded = self._encode_image(None, bbox, face_img)
+        if encoded is None:
             return False
-        except Exception as e:
-            logger.error(f"Error enviando rostro: {e}")
+        image, image_fields = encoded
+        
+        header = build_face_header(
+            camera_id, face_track_id, mode, bbox,
+            frame_number=frame_number,
+            camera_name=camera_name or None,
+            detection_index=detection_index,
+            person_name=person_name,
+            person_id=person_id,
+            **image_fields
+        )
+        
+        if metadata:
+            header.update(metadata)
+        
+        if not self._send_face(header, image):
             return False
+        
+        logger.debug(
+            f"Enviado: {camera_id} | mode={mode} | "
+            f"face_id={face_track_id} | size={header['image_size']} bytes"
+        )
+        return True
     
     def send_control_message(
         self,
@@ -103,21 +74,22 @@ class ZMQSender:
         params: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Envía un mensaje de control (no incluye imagen)"""
+        if not self.enabled or not self.send_socket:
+            return False
+        
         try:
             header = {
                 "camera_id": camera_id,
                 "command": command,
-                "timestamp": int(time.time()),
+                "timestamp": time.time(),
                 "control_message": True
             }
             
             if params:
                 header.update(params)
             
-            header_json = json.dumps(header).encode('utf-8')
-            header_len = struct.pack('!I', len(header_json))
-            
-            self.socket.send(header_len + header_json)
+            header_bytes = encode_header(header, self.header_codec)
+            self.send_socket.send(struct.pack('!I', len(header_bytes)) + header_bytes, zmq.NOBLOCK)
             
             logger.debug(f"Control enviado: {command}")
             return True
@@ -125,8 +97,3 @@ class ZMQSender:
         except Exception as e:
             logger.error(f"Error enviando control: {e}")
             return False
-    
-    def close(self):
-        logger.info("Cerrando conexión ZMQ")
-        self.socket.close()
-        self.context.term()
@@ -1,15 +1,32 @@
 import cv2
-import time
 import logging
-from typing import List, Tuple, Any, Dict
+from typing import List, Tuple, Any, Dict, Optional, Union, Callable
+
+from core import clock
 from pipeline.detector import FaceDetector
 
 logger = logging.getLogger(__name__)
 
+# Algoritmo de seguimiento de OpenCV por nombre (tracker_type). "auto" usa el
+# primero disponible en el orden de _create_tracker.
+TRACKER_TYPES = {
+    'mil': 'TrackerMIL_create',
+    'kcf': 'TrackerKCF_create',
+    'csrt': 'TrackerCSRT_create',
+    'mosse': 'TrackerMOSSE_create',
+    'medianflow': 'TrackerMedianFlow_create',
+    'tld': 'TrackerTLD_create',
+}
+
 
 class FaceTracker:
-    def __init__(self, interval: float = 0.5):
+    def __init__(self, interval: float = 0.5, tracker_type: str = "auto"):
         self.interval = interval
+        
+        if tracker_type != "auto" and tracker_type not in TRACKER_TYPES:
+            logger.warning(f"Tipo de tracker desconocido '{tracker_type}', usando 'auto'")
+            tracker_type = "auto"
+        self.tracker_type = tracker_type
         self.last_detection = 0
         self.trackers: List[Any] = []
         self.ids: List[int] = []
@@ -19,7 +36,17 @@ class FaceTracker:
         self.last_boxes: Dict[int, Tuple[Tuple[int, int, int, int], float]] = {}
         self.memory_timeout = 2.0  # Segundos que recordamos una cara perdida
         
-        logger.info(f"Tracker inicializado: interval={interval}s")
+        # Confianza del detector en la ultima re-deteccion de cada ID
+        self.scores: Dict[int, float] = {}
+        
+        # Se incrementa en cada reset: los IDs anteriores dejan de ser validos
+        self.generation = 0
+        
+        # Detector asincrono (DetectorPool): job en curso y frame sobre el que se lanzo
+        self._pending_job: Optional[int] = None
+        self._pending_frame = None
+        
+        logger.info(f"Tracker inicializado: interval={interval}s, tipo={tracker_type}")
     
     def _create_tracker(self):
         creator_paths = [
@@ -33,6 +60,10 @@ class FaceTracker:
             ('cv2.legacy', 'TrackerTLD_create'),
         ]
         
+        if self.tracker_type != "auto":
+            attr = TRACKER_TYPES[self.tracker_type]
+            creator_paths = [('cv2', attr), ('cv2.legacy', attr)]
+        
         for module_path, attr_name in creator_paths:
             try:
                 if module_path == 'cv2.legacy':
@@ -49,7 +80,7 @@ class FaceTracker:
                 continue
         
         raise RuntimeError(
-            "No se pudo crear el tracker. "
+            f"No se pudo crear el tracker ({self.tracker_type}). "
             "Instala opencv-contrib-python. "
             f"OpenCV version: {cv2.__version__}"
         )
@@ -74,14 +105,19 @@ class FaceTracker:
     def process(
         self, 
         frame, 
-        detector: FaceDetector
+        detector: FaceDetector,
+        allow_redetect: Union[bool, Callable[[], bool]] = True
     ) -> List[Tuple[int, Any, Tuple[int, int, int, int]]]:
-        now = time.time()
+        # allow_redetect puede ser un callable: solo se consulta cuando toca detectar
+        # (p.ej. el presupuesto del frame, que cuenta cada consulta denegada)
+        now = clock.now()
         faces: List[Tuple[int, Any, Tuple[int, int, int, int]]] = []
         
         logger.info(f"[TRACKER] process llamado. Tiempo desde última detección: {now - self.last_detection:.2f}s, interval: {self.interval}s")
         
-        if now - self.last_detection >= self.interval:
+        if getattr(detector, 'is_async', False):
+            self._detect_async(frame, detector, now, allow_redetect)
+        elif now - self.last_detection >= self.interval and self._redetect_allowed(allow_redetect):
             logger.info("[TRACKER] Llamando a _redetect...")
             self._redetect(frame, detector)
             self.last_detection = now
@@ -143,21 +179,63 @@ class FaceTracker:
     
     def _redetect(self, frame, detector: FaceDetector):
         logger.info("=== [_REDETECT] Iniciando re-deteccion ===")
-        boxes = detector.detect(frame)
-        logger.info(f"=== [_REDETECT] Boxes recibidos del detector: {len(boxes)} ===")
+        if hasattr(detector, 'detect_with_scores'):
+            scored_boxes = detector.detect_with_scores(frame)
+        else:
+            scored_boxes = [(box, 1.0) for box in detector.detect(frame)]
+        self._apply_detections(frame, scored_boxes)
+    
+    @staticmethod
+    def _redetect_allowed(allow_redetect: Union[bool, Callable[[], bool]]) -> bool:
+        return allow_redetect() if callable(allow_redetect) else bool(allow_redetect)
+    
+    def _detect_async(
+        self,
+        frame,
+        detector,
+        now: float,
+        allow_submit: Union[bool, Callable[[], bool]] = True
+    ):
+        if self._pending_job is not None:
+            scored_boxes = detector.poll(self._pending_job)
+            if scored_boxes is not None:
+                # Los trackers se inicializan sobre el frame detectado; el update
+                # posterior de process() los lleva hasta el frame actual
+                self._apply_detections(self._pending_frame, scored_boxes)
+                self._pending_job = None
+                self._pending_frame = None
+            elif not detector.is_pending(self._pending_job):
+                logger.warning("[TRACKER] Detección asíncrona perdida, se mantienen los trackers actuales")
+                self._pending_job = None
+                self._pending_frame = None
+        
+        if (
+            self._pending_job is None
+            and now - self.last_detection >= self.interval
+            and self._redetect_allowed(allow_submit)
+        ):
+            job_id = detector.submit(frame)
+            if job_id is not None:
+                self._pending_job = job_id
+                self._pending_frame = frame
+                self.last_detection = now
+    
+    def _apply_detections(self, frame, scored_boxes):
+        logger.info(f"=== [_REDETECT] Boxes recibidos del detector: {len(scored_boxes)} ===")
         new_boxes_xywh = []
         
-        for (x1, y1, x2, y2) in boxes:
+        for (x1, y1, x2, y2), score in scored_boxes:
             w = x2 - x1
             h = y2 - y1
             if w > 0 and h > 0:
-                new_boxes_xywh.append((x1, y1, w, h))
+                new_boxes_xywh.append(((x1, y1, w, h), score))
         
         new_trackers = []
         new_ids = []
+        new_scores: Dict[int, float] = {}
         matched_old_ids = set()
         
-        for new_box in new_boxes_xywh:
+        for new_box, score in new_boxes_xywh:
             best_iou = 0.0
             best_id = -1
             
@@ -190,6 +268,7 @@ class FaceTracker:
                 if success is not False:
                     new_trackers.append(tracker)
                     new_ids.append(assigned_id)
+                    new_scores[assigned_id] = score
                     logger.info(f"=== [_REDETECT] Tracker agregado con ID {assigned_id} ===")
             except Exception as e:
                 logger.error(f"Error creando tracker: {e}")
@@ -197,11 +276,19 @@ class FaceTracker:
         
         self.trackers = new_trackers
         self.ids = new_ids
+        self.scores = new_scores
         logger.info(f"=== [_REDETECT] Finalizado. Total trackers activos: {len(self.trackers)} ===")
     
+    def get_score(self, face_id: int) -> float:
+        return self.scores.get(face_id, 1.0)
+    
     def reset(self):
         self.trackers.clear()
         self.ids.clear()
         self.last_boxes.clear()
+        self.scores.clear()
         self.next_id = 0
+        self.generation += 1
+        self._pending_job = None
+        self._pending_frame = None
         logger.info("Trackers reseteados")
@@ -0,0 +1,194 @@
+"""
+Driver de carga para el camino de reconocimiento: envia requests sinteticas por
+RecognitionClient a tasas crecientes y reporta, por escalon, throughput, latencias
+(p50/p95/p99) y perdidas, y la maxima tasa sostenible.
+
+Uso (desde la raiz del repo):
+    python -m tools.load_driver [--rates 10,25,50,100,200] [--step-seconds 5] [--standin]
+                                [--wire-format multipart] [--header-codec binary] [--crop-codec jpeg]
+
+Con --standin arranca en el mismo proceso el backend de reemplazo (tools.standin_backend)
+sobre los endpoints indicados.
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from communication.recognition_client import RecognitionClient
+from communication.request_tracker import RequestTracker
+from tools.standin_backend import StandinBackend, StandinConfig, _bind_address
+
+
+def _synthetic_faces(count: int, rng: np.random.Generator) -> List[np.ndarray]:
+    crops = []
+    for _ in range(count):
+        size = int(rng.integers(80, 160))
+        crop = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+        crops.append(crop)
+    return crops
+
+
+def _cancel_discarded(client: RecognitionClient, tracker: RequestTracker) -> int:
+    # Requests que el control de flujo reemplazo o dejo caducar en cola: no son perdidas
+    discarded = client.take_failed_requests()
+    for _, request_id in discarded:
+        tracker.cancel(request_id)
+    return len(discarded)
+
+
+def run_step(
+    client: RecognitionClient,
+    rate: float,
+    duration: float,
+    faces: int,
+    crops: List[np.ndarray],
+    timeout: float
+) -> Dict[str, Any]:
+    tracker = RequestTracker(timeout=timeout)
+    interval = 1.0 / rate
+    sent = 0
+    rejected = 0
+    discarded = 0
+
+    start = time.time()
+    next_send = start
+    face_id = 0
+    while time.time() - start < duration:
+        now = time.time()
+        if now >= next_send:
+            crop = crops[face_id % len(crops)]
+            request_id = tracker.new_request_id()
+            if client.send_recognition_request(
+                None, face_id, (0, 0, crop.shape[1], crop.shape[0]),
+                face_crop=crop, quality=0.8, request_id=request_id
+            ):
+                tracker.register(request_id, face_id, (0, 0, crop.shape[1], crop.shape[0]), now)
+                sent += 1
+            else:
+                rejected += 1
+            face_id = (face_id + 1) % faces
+            next_send += interval
+
+        for result in client.drain_results():
+            tracker.resolve(result)
+        discarded += _cancel_discarded(client, tracker)
+        tracker.expire()
+        time.sleep(min(0.001, max(0.0, next_send - time.time())))
+
+    # Margen para recoger las respuestas de las ultimas requests
+    drain_until = time.time() + min(timeout, 2.0)
+    while tracker.pending and time.time() < drain_until:
+        for result in client.drain_results():
+            tracker.resolve(result)
+        discarded += _cancel_discarded(client, tracker)
+        time.sleep(0.005)
+    tracker.expire()
+
+    elapsed = time.time() - start
+    stats = tracker.get_stats()
+    rtt = stats["round_trip"]
+    return {
+        "rate": rate,
+        "sent": sent,
+        "rejected": rejected,
+        "discarded": discarded,
+        "completed": stats["completed"],
+        "lost": sent - discarded - stats["completed"],
+        "throughput": stats["completed"] / elapsed,
+        "p50_ms": rtt["p50_ms"],
+        "p95_ms": rtt["p95_ms"],
+        "p99_ms": rtt["p99_ms"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Driver de carga del camino de reconocimiento")
+    parser.add_argument("--send", default="tcp://127.0.0.1:5557")
+    parser.add_argument("--recv", default="tcp://127.0.0.1:5558")
+    parser.add_argument("--rates", default="10,25,50,100,200,400", help="Requests/s por escalón")
+    parser.add_argument("--step-seconds", type=float, default=5.0)
+    parser.add_argument("--faces", type=int, default=16, help="face_id distintos en rotación")
+    parser.add_argument("--timeout", type=float, default=3.0, help="Segundos antes de dar una request por perdida")
+    parser.add_argument("--slo-ms", type=float, default=200.0, help="p95 máximo para considerar sostenible la tasa")
+    parser.add_argument("--min-completion", type=float, default=0.99)
+    parser.add_argument("--wire-format", default="legacy")
+    parser.add_argument("--header-codec", default="json")
+    parser.add_argument("--crop-codec", default="jpeg")
+    parser.add_argument("--image-transport", default="jpeg")
+    parser.add_argument("--io-thread", action="store_true")
+    parser.add_argument("--flow-window", type=int, default=0)
+    parser.add_argument("--standin", action="store_true", help="Arrancar el backend de reemplazo en proceso")
+    parser.add_argument("--standin-latency", default="lognormal:20:8")
+    parser.add_argument("--standin-max-rate", type=float, default=150.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    backend = None
+    if args.standin:
+        config = StandinConfig(
+            recognition_pull=_bind_address(args.send),
+            recognition_push=_bind_address(args.recv),
+            register_pull="inproc://standin-register-pull",
+            register_push="inproc://standin-register-push",
+            latency=args.standin_latency,
+            max_rate=args.standin_max_rate
+        )
+        backend = StandinBackend(config)
+        backend.bind()
+        backend.start_in_thread()
+
+    client = RecognitionClient(
+        send_endpoint=args.send,
+        recv_endpoint=args.recv,
+        wire_format=args.wire_format,
+        header_codec=args.header_codec,
+        crop_codec=args.crop_codec,
+        image_transport=args.image_transport,
+        io_thread=args.io_thread,
+        flow_window=args.flow_window,
+        health_options={"ping_interval": 0}
+    )
+    client.connect()
+
+    deadline = time.time() + 3.0
+    while not client.is_connected and time.time() < deadline:
+        time.sleep(0.05)
+    if not client.is_connected:
+        print(f"No se pudo conectar a {args.send}")
+
+    crops = _synthetic_faces(args.faces, np.random.default_rng(0))
+    rows = []
+    try:
+        for rate in [float(value) for value in args.rates.split(",")]:
+            row = run_step(client, rate, args.step_seconds, args.faces, crops, args.timeout)
+            rows.append(row)
+            print(
+                f"tasa {row['rate']:>7.1f}/s | enviadas {row['sent']:>6} | completadas {row['completed']:>6} | "
+                f"coalescidas {row['discarded']:>5} | perdidas {row['lost']:>5} | {row['throughput']:>7.1f} res/s | "
+                f"p50 {row['p50_ms']} p95 {row['p95_ms']} p99 {row['p99_ms']} ms"
+            )
+    finally:
+        client.close()
+        if backend is not None:
+            backend.stop()
+            time.sleep(0.1)
+            backend.close()
+
+    sustainable = [
+        row for row in rows
+        if row["sent"] and row["completed"] / row["sent"] >= args.min_completion
+        and row["p95_ms"] is not None and row["p95_ms"] <= args.slo_ms
+    ]
+    if sustainable:
+        best = max(sustainable, key=lambda row: row["rate"])
+        print(f"Máxima tasa sostenible: {best['rate']:.1f} req/s (p95 {best['p95_ms']} ms <= {args.slo_ms} ms)")
+    else:
+        print("Ninguna tasa cumple el objetivo de latencia/pérdidas")
+
+
+if __name__ == "__main__":
+    main()
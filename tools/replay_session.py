@@ -0,0 +1,176 @@
+"""
+Replay de una sesion grabada (recording.enabled en config_simple.yaml) a traves de
+FaceTracker, RecognitionManager y el resto del ApplicationOrchestrator, sin ventana
+y tan rapido como sea posible. El reloj de la logica (core.clock) sigue los
+timestamps grabados, por lo que con --backend recorded dos ejecuciones sobre la
+misma sesion producen exactamente el mismo resultado (ver "digest"); sirve para
+reproducir incidencias y comparar cambios de rendimiento sobre la misma entrada.
+
+Uso (desde la raiz del repo):
+    python -m tools.replay_session sessions/20250101-120000 [--backend recorded|standin]
+                                   [--interval 0.5] [--repeat 3] [--json resultado.json]
+
+Con --backend standin las requests viajan por ZMQ hasta el backend de reemplazo
+(tools.standin_backend) arrancado en el mismo proceso; ejercita el transporte real
+pero deja de ser deterministico.
+"""
+import json
+import time
+import hashlib
+import argparse
+import logging
+import multiprocessing as mp
+from typing import Any, Dict
+
+import cv2
+
+from core import clock
+from core.app_orchestrator import ApplicationOrchestrator
+from core.frame_manager import FrameManager
+from core.session_replay import SessionReader, ReplayCamera, ReplayDetector, RecordedRecognitionClient
+from pipeline.tracker import FaceTracker
+from UI.input_handler import AppState
+
+
+class DigestTracker:
+    # Envuelve al tracker y acumula un hash de las caras (id + bbox) de cada frame
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.digest = hashlib.sha1()
+        self.faces = 0
+
+    def process(self, frame, detector, **kwargs):
+        faces = self.tracker.process(frame, detector, **kwargs)
+        self.faces += len(faces)
+        self.digest.update(repr([(face_id, bbox) for face_id, _, bbox in faces]).encode())
+        return faces
+
+    def __getattr__(self, name):
+        return getattr(self.tracker, name)
+
+
+def _standin_client(args):
+    from communication.recognition_client import RecognitionClient
+    from tools.standin_backend import StandinBackend, StandinConfig, _bind_address
+
+    send, recv = "tcp://127.0.0.1:15557", "tcp://127.0.0.1:15558"
+    backend = StandinBackend(StandinConfig(
+        recognition_pull=_bind_address(send),
+        recognition_push=_bind_address(recv),
+        register_pull="inproc://replay-register-pull",
+        register_push="inproc://replay-register-push",
+        latency=args.standin_latency,
+        seed=0
+    ))
+    backend.bind()
+    backend.start_in_thread()
+
+    client = RecognitionClient(send_endpoint=send, recv_endpoint=recv, health_options={"ping_interval": 0})
+    client.connect()
+    deadline = time.time() + 3.0
+    while not client.is_connected and time.time() < deadline:
+        time.sleep(0.05)
+    return client, backend
+
+
+def replay(args) -> Dict[str, Any]:
+    reader = SessionReader(args.session)
+    replay_clock = clock.ManualClock(reader.frames[0]["t"] if reader.frames else 0.0)
+    clock.set_source(replay_clock)
+    cv2.setRNGSeed(0)
+
+    camera = ReplayCamera(reader, replay_clock)
+    detector = ReplayDetector(reader, camera)
+    interval = args.interval if args.interval is not None else reader.meta.get("detection_interval", 0.5)
+    tracker = DigestTracker(FaceTracker(interval=interval))
+
+    backend = None
+    if args.backend == "standin":
+        client, backend = _standin_client(args)
+    else:
+        client = RecordedRecognitionClient(reader)
+
+    orchestrator = ApplicationOrchestrator(
+        camera=camera,
+        detector=detector,
+        tracker=tracker,
+        frame_manager=FrameManager(),
+        renderer=None,
+        input_handler=None,
+        recognition_client=client,
+        recognition_config=reader.meta.get("recognition", {}),
+        headless=True
+    )
+
+    start = time.perf_counter()
+    try:
+        orchestrator.start(AppState())
+    finally:
+        elapsed = time.perf_counter() - start
+        orchestrator.stop()
+        client.close()
+        if backend is not None:
+            backend.stop()
+            time.sleep(0.1)
+            backend.close()
+        clock.reset()
+
+    identities = sorted(
+        (face_id, identity.person_name)
+        for face_id, identity in orchestrator.recognition_manager.identities.items()
+    )
+    tracker.digest.update(repr(identities).encode())
+    frames = orchestrator.metrics.frame_count
+
+    return {
+        "session": args.session,
+        "backend": args.backend,
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 1) if elapsed > 0 else None,
+        "recorded_seconds": round(reader.frames[-1]["t"] - reader.frames[0]["t"], 3) if reader.frames else 0.0,
+        "detector_calls": detector.calls,
+        "faces": tracker.faces,
+        "identities": len(identities),
+        "requests": orchestrator.request_tracker.get_stats(),
+        "stages": orchestrator.metrics.get_stage_stats()["timings_ms"],
+        "digest": tracker.digest.hexdigest()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de una sesion grabada")
+    parser.add_argument("session", help="Carpeta de la sesion grabada")
+    parser.add_argument("--backend", choices=("recorded", "standin"), default="recorded")
+    parser.add_argument("--interval", type=float, default=None, help="Intervalo de re-deteccion (por defecto el grabado)")
+    parser.add_argument("--repeat", type=int, default=1, help="Ejecuciones; el digest debe coincidir entre ellas")
+    parser.add_argument("--standin-latency", default="fixed:20")
+    parser.add_argument("--json", default=None, help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    runs = []
+    # Cada ejecucion en un proceso nuevo: algunos trackers de OpenCV guardan estado
+    # aleatorio a nivel de proceso y la segunda ejecucion no partiria del mismo punto
+    ctx = mp.get_context("spawn")
+    for _ in range(max(1, args.repeat)):
+        with ctx.Pool(1) as pool:
+            run = pool.apply(replay, (args,))
+        runs.append(run)
+        print(
+            f"{run['frames']} frames en {run['seconds']:.2f} s ({run['fps']} FPS, grabados {run['recorded_seconds']:.1f} s) | "
+            f"caras {run['faces']} | identidades {run['identities']} | digest {run['digest'][:12]}"
+        )
+
+    if len({run["digest"] for run in runs}) > 1:
+        print("AVISO: las ejecuciones no son idénticas")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
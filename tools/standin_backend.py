@@ -0,0 +1,362 @@
+"""
+Backend de reconocimiento/registro de reemplazo para pruebas de carga sin el servidor C++.
+
+Hace bind de los mismos cuatro endpoints que usa config_simple.yaml (PULL de requests,
+PUSH de respuestas), entiende todos los formatos del cliente (legacy, multipart, lotes,
+memoria compartida, cabeceras json/binary/msgpack, crops jpeg/raw/png/webp), responde
+pings y devuelve resultados configurables con latencia, errores y throughput simulados.
+
+Uso (desde la raiz del repo):
+    python -m tools.standin_backend [--config config_simple.yaml] [--latency lognormal:40:15]
+                                    [--max-rate 50] [--drop-rate 0.01] [--decode]
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import random
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+import zmq
+
+from communication.header_codec import (
+    HEADER_CODEC_BINARY,
+    HEADER_CODEC_JSON,
+    HEADER_CODEC_MSGPACK,
+    MAGIC_BINARY,
+    MAGIC_MSGPACK,
+    decode_header,
+    encode_results
+)
+from communication.shm_ring import SharedMemoryRing
+
+logger = logging.getLogger("standin_backend")
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+@dataclass
+class StandinConfig:
+    register_pull: str = "tcp://*:5555"
+    register_push: str = "tcp://*:5556"
+    recognition_pull: str = "tcp://*:5557"
+    recognition_push: str = "tcp://*:5558"
+    # Latencia de servicio por cara: distribucion:media_ms[:desviacion_ms]
+    latency: str = "fixed:20"
+    # Requests por segundo que el backend puede procesar (0 = sin limite)
+    max_rate: float = 0.0
+    drop_rate: float = 0.0
+    unknown_rate: float = 0.2
+    register_fail_rate: float = 0.0
+    # Creditos anunciados en cada resultado (0 = no anunciar)
+    credits: int = 0
+    decode: bool = False
+    identities: List[str] = field(default_factory=lambda: ["Ana", "Luis", "Maria", "Jorge", "Sofia"])
+    seed: Optional[int] = None
+
+
+def _bind_address(endpoint: str) -> str:
+    # tcp://192.168.18.4:5555 -> tcp://*:5555 ; ipc:// se usa tal cual
+    if endpoint.startswith("tcp://"):
+        return f"tcp://*:{endpoint.rsplit(':', 1)[1]}"
+    return endpoint
+
+
+def config_from_yaml(path: str) -> StandinConfig:
+    with open(path, 'r', encoding='utf-8') as f:
+        zmq_config = (yaml.safe_load(f) or {}).get('zmq', {})
+    return StandinConfig(
+        register_pull=_bind_address(zmq_config.get('register_send_endpoint', 'tcp://127.0.0.1:5555')),
+        register_push=_bind_address(zmq_config.get('register_recv_endpoint', 'tcp://127.0.0.1:5556')),
+        recognition_pull=_bind_address(zmq_config.get('recognition_send_endpoint', 'tcp://127.0.0.1:5557')),
+        recognition_push=_bind_address(zmq_config.get('recognition_recv_endpoint', 'tcp://127.0.0.1:5558'))
+    )
+
+
+class LatencyModel:
+
+    def __init__(self, spec: str, rng: random.Random):
+        parts = spec.split(":")
+        self.kind = parts[0]
+        if self.kind not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia desconocida: {self.kind}")
+        self.mean = float(parts[1]) if len(parts) > 1 else 20.0
+        self.spread = float(parts[2]) if len(parts) > 2 else self.mean / 4
+        self.rng = rng
+
+    def sample_ms(self) -> float:
+        if self.kind == "uniform":
+            return self.rng.uniform(max(0.0, self.mean - self.spread), self.mean + self.spread)
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(self.mean, self.spread))
+        if self.kind == "lognormal":
+            # Parametros de la normal subyacente a partir de media y desviacion deseadas
+            variance = np.log(1 + (self.spread / self.mean) ** 2)
+            mu = np.log(self.mean) - variance / 2
+            return self.rng.lognormvariate(mu, variance ** 0.5)
+        return self.mean
+
+
+def _reply_codec(header_bytes) -> str:
+    first = bytes(header_bytes[:1])
+    if first == bytes((MAGIC_BINARY,)):
+        return HEADER_CODEC_BINARY
+    if first == bytes((MAGIC_MSGPACK,)):
+        return HEADER_CODEC_MSGPACK
+    return HEADER_CODEC_JSON
+
+
+@dataclass
+class Job:
+    channel: str
+    codec: str
+    faces: List[Dict[str, Any]]
+    batch: bool = False
+
+
+class StandinBackend:
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.latency = LatencyModel(config.latency, self.rng)
+
+        self.context = zmq.Context()
+        self.sockets: Dict[str, Tuple[zmq.Socket, zmq.Socket]] = {}
+
+        # (instante de respuesta, orden, job)
+        self._scheduled: List[Tuple[float, int, Job]] = []
+        self._sequence = itertools.count()
+        self._next_service_slot = 0.0
+        self._rings: Dict[str, SharedMemoryRing] = {}
+
+        self.stats = {"received": 0, "replied": 0, "dropped": 0, "pings": 0, "errors": 0}
+        self._stop_event = threading.Event()
+
+    def bind(self):
+        for channel, pull_addr, push_addr in (
+            ("register", self.config.register_pull, self.config.register_push),
+            ("recognition", self.config.recognition_pull, self.config.recognition_push)
+        ):
+            pull = self.context.socket(zmq.PULL)
+            pull.bind(pull_addr)
+            push = self.context.socket(zmq.PUSH)
+            push.setsockopt(zmq.LINGER, 0)
+            push.bind(push_addr)
+            self.sockets[channel] = (pull, push)
+            logger.info(f"[{channel}] PULL {pull_addr} -> PUSH {push_addr}")
+
+    def _split_frames(self, frames: List[zmq.Frame]) -> Tuple[Any, List[Tuple[Dict[str, Any], Any]], bool]:
+        # Devuelve (bytes de la primera cabecera, [(cabecera, imagen)], es_lote)
+        if len(frames) == 1 and frames[0].buffer[0] not in (ord('{'), MAGIC_BINARY, MAGIC_MSGPACK):
+            # Legacy: [len !I][cabecera][imagen] en un solo frame
+            data = frames[0].buffer
+            (length,) = struct.unpack_from('!I', data, 0)
+            header_bytes = data[4:4 + length]
+            return header_bytes, [(decode_header(header_bytes), data[4 + length:])], False
+
+        header_bytes = frames[0].buffer
+        header = decode_header(header_bytes)
+        if header.get("mode") == "recognize_batch":
+            faces = []
+            for index in range(1, len(frames) - 1, 2):
+                faces.append((decode_header(frames[index].buffer), frames[index + 1].buffer))
+            return header_bytes, faces, True
+
+        image = frames[1].buffer if len(frames) > 1 else b''
+        return header_bytes, [(header, image)], False
+
+    def _load_image(self, header: Dict[str, Any], image) -> Optional[np.ndarray]:
+        if header.get("image_transport") == "shm":
+            name = header["shm_name"]
+            ring = self._rings.get(name)
+            if ring is None:
+                ring = SharedMemoryRing.attach(header)
+                self._rings[name] = ring
+            return ring.read(int(header["slot"]), int(header["generation"]))
+
+        if header.get("image_format") == "raw":
+            return np.frombuffer(image, dtype=header.get("dtype", "uint8")).reshape(header["shape"])
+
+        return cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def _handle(self, channel: str, frames: List[zmq.Frame]):
+        header_bytes, faces, batch = self._split_frames(frames)
+        codec = _reply_codec(header_bytes)
+
+        first = faces[0][0] if faces else {}
+        if first.get("mode") == "ping":
+            self.stats["pings"] += 1
+            self._send(channel, codec, [{"face_id": -1, "mode": "pong", "seq": first.get("seq")}], False)
+            return
+
+        accepted = []
+        for header, image in faces:
+            self.stats["received"] += 1
+            if self.rng.random() < self.config.drop_rate:
+                self.stats["dropped"] += 1
+                continue
+            if self.config.decode or header.get("image_transport") == "shm":
+                if self._load_image(header, image) is None:
+                    self.stats["errors"] += 1
+                    logger.warning(f"Imagen inválida o sobrescrita (face {header.get('face_id')})")
+                    continue
+            accepted.append(header)
+
+        if not accepted:
+            return
+
+        # Cola de servicio: con max_rate cada cara ocupa 1/max_rate segundos del backend
+        now = time.time()
+        start = now
+        if self.config.max_rate > 0:
+            start = max(now, self._next_service_slot)
+            self._next_service_slot = start + len(accepted) / self.config.max_rate
+        ready_at = start + self.latency.sample_ms() / 1000.0
+
+        job = Job(channel, codec, accepted, batch)
+        heapq.heappush(self._scheduled, (ready_at, next(self._sequence), job))
+
+    def _result_for(self, channel: str, header: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"face_id": int(header.get("face_id", -1))}
+        if header.get("request_id"):
+            result["request_id"] = header["request_id"]
+
+        if channel == "register":
+            success = self.rng.random() >= self.config.register_fail_rate
+            result.update({
+                "person_id": f"standin-{self.rng.getrandbits(32):08x}" if success else "",
+                "person_name": header.get("person_name", ""),
+                "success": success
+            })
+            if not success:
+                result["error"] = "Registro rechazado (simulado)"
+            return result
+
+        if self.rng.random() < self.config.unknown_rate:
+            result.update({"person_id": "", "person_name": "Desconocido", "confidence": self.rng.uniform(0.1, 0.5)})
+        else:
+            # Identidad estable por cara para que la fusion de votos converja
+            index = result["face_id"] % len(self.config.identities)
+            name = self.config.identities[index]
+            result.update({
+                "person_id": f"standin-{index:04d}",
+                "person_name": name,
+                "confidence": self.rng.uniform(0.75, 0.98)
+            })
+        if self.config.credits > 0:
+            result["credits"] = self.config.credits
+        return result
+
+    def _send(self, channel: str, codec: str, results: List[Dict[str, Any]], batch: bool):
+        _, push = self.sockets[channel]
+        try:
+            push.send(encode_results(results, codec, batch=batch), zmq.NOBLOCK)
+        except zmq.Again:
+            self.stats["errors"] += 1
+
+    def _flush_due(self):
+        now = time.time()
+        while self._scheduled and self._scheduled[0][0] <= now:
+            _, _, job = heapq.heappop(self._scheduled)
+            results = [self._result_for(job.channel, header) for header in job.faces]
+            if job.batch:
+                self._send(job.channel, job.codec, results, True)
+            else:
+                for result in results:
+                    self._send(job.channel, job.codec, [result], False)
+            self.stats["replied"] += len(results)
+
+    def run(self, stats_interval: float = 5.0):
+        poller = zmq.Poller()
+        channels = {}
+        for channel, (pull, _) in self.sockets.items():
+            poller.register(pull, zmq.POLLIN)
+            channels[pull] = channel
+
+        last_stats = time.time()
+        while not self._stop_event.is_set():
+            timeout_ms = 50
+            if self._scheduled:
+                timeout_ms = max(0, min(50, int((self._scheduled[0][0] - time.time()) * 1000)))
+
+            for socket, _ in poller.poll(timeout_ms):
+                while True:
+                    try:
+                        frames = socket.recv_multipart(zmq.NOBLOCK, copy=False)
+                    except zmq.Again:
+                        break
+                    try:
+                        self._handle(channels[socket], frames)
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        logger.warning(f"Mensaje no válido: {e}")
+
+            self._flush_due()
+
+            if stats_interval and time.time() - last_stats >= stats_interval:
+                last_stats = time.time()
+                logger.info(f"{self.stats} | en cola: {len(self._scheduled)}")
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, kwargs={"stats_interval": 0}, name="standin-backend", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop_event.set()
+
+    def close(self):
+        for pull, push in self.sockets.values():
+            pull.close(0)
+            push.close(0)
+        for ring in self._rings.values():
+            ring.close()
+        self.context.term()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend de reemplazo para pruebas de carga")
+    parser.add_argument("--config", default="config_simple.yaml", help="Toma los puertos de la seccion zmq")
+    parser.add_argument("--latency", default="fixed:20", help="fixed|uniform|normal|lognormal:media_ms[:desv_ms]")
+    parser.add_argument("--max-rate", type=float, default=0.0, help="Caras por segundo (0 = sin límite)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fracción de requests sin respuesta")
+    parser.add_argument("--unknown-rate", type=float, default=0.2, help="Fracción de resultados 'Desconocido'")
+    parser.add_argument("--register-fail-rate", type=float, default=0.0)
+    parser.add_argument("--credits", type=int, default=0, help="Créditos anunciados en cada resultado")
+    parser.add_argument("--decode", action="store_true", help="Decodificar cada imagen (CPU realista)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = config_from_yaml(args.config)
+    config.latency = args.latency
+    config.max_rate = args.max_rate
+    config.drop_rate = args.drop_rate
+    config.unknown_rate = args.unknown_rate
+    config.register_fail_rate = args.register_fail_rate
+    config.credits = args.credits
+    config.decode = args.decode
+    config.seed = args.seed
+
+    backend = StandinBackend(config)
+    backend.bind()
+    try:
+        backend.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
+        logger.info(f"Detenido: {backend.stats}")
+
+
+if __name__ == "__main__":
+    main()